@@ -0,0 +1,217 @@
+# benchmarks/hot_paths.py
+
+"""
+Timing harness for the simulation hot paths, run from the repository root:
+
+    python -m benchmarks.hot_paths --devices 1000 10000 100000 1000000 --uavs 3 30
+
+Every case uses the same simulation seed and timed as the best and mean of several repeats.
+Results are written as JSON under results/data/benchmarks so runs can be compared
+with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+from simulation.iot_simulation import IoTSimulation
+from simulation.uav_simulation import UAVSimulation
+from simulation.energy_model import EnergyModel
+from simulation.communication_model import CommunicationModel
+from simulation.task_offloading import TaskOffloading
+from simulation.path_planning import PathPlanning
+from simulation.simulation_manager import SimulationManager
+from simulation.config import load_config
+from simulation.seeding import RandomStreams
+
+SEED = 1234
+OUTPUT_DIR = 'results/data/benchmarks'
+
+def build_config(device_count, uav_count, time_slots):
+    return load_config('config.json').override({
+        'iot.device_count': device_count,
+        'uav.count': uav_count,
+        'simulation.time_slots': time_slots,
+        'simulation.seed': SEED,
+        'recording.directory': None,
+        'instrumentation.directory': None,
+        'checkpoint.directory': None,
+        'logging.quiet': True,
+        'log_file': os.devnull
+    })
+
+def build_models(config):
+    streams = RandomStreams.from_config(config)
+    energy_model = EnergyModel(config)
+    communication_model = CommunicationModel(config)
+    path_planning = PathPlanning(config, streams)
+    return {
+        'energy_model': energy_model,
+        'task_offloading': TaskOffloading(config, energy_model, communication_model),
+        'path_planning': path_planning,
+        'uav_simulation': UAVSimulation(config, path_planning, streams),
+        'iot_simulation': IoTSimulation(config, streams)
+    }
+
+# Each case takes a config and returns a zero-argument callable to time
+
+def case_update_positions(config):
+    iot_simulation = IoTSimulation(config)
+    return lambda: iot_simulation.update_positions(0)
+
+def case_generate_tasks(config):
+    iot_simulation = IoTSimulation(config)
+    return lambda: iot_simulation.generate_tasks(0)
+
+def case_task_dicts(config):
+    tasks = IoTSimulation(config).generate_tasks(0)
+    return lambda: list(tasks)
+
+def case_decide_offloading(config):
+    models = build_models(config)
+    tasks = list(models['iot_simulation'].generate_tasks(0))
+    uavs = models['uav_simulation'].uavs
+    return lambda: models['task_offloading'].decide_offloading(tasks, uavs, 0)
+
+def case_decide_offloading_batch(config):
+    models = build_models(config)
+    tasks = models['iot_simulation'].generate_tasks(0)
+    uav_positions = models['uav_simulation'].positions
+    return lambda: models['task_offloading'].decide_offloading_batch(tasks, uav_positions, 0)
+
+def case_update_energy_consumption(config):
+    models = build_models(config)
+    tasks = list(models['iot_simulation'].generate_tasks(0))
+    decisions = models['task_offloading'].decide_offloading(tasks, models['uav_simulation'].uavs, 0)
+    return lambda: models['energy_model'].update_energy_consumption(decisions, 0)
+
+def case_update_energy_consumption_batch(config):
+    models = build_models(config)
+    tasks = models['iot_simulation'].generate_tasks(0)
+    decisions = models['task_offloading'].decide_offloading_batch(tasks, models['uav_simulation'].positions, 0)
+    return lambda: models['energy_model'].update_energy_consumption(decisions, 0)
+
+def case_calculate_next_position(config):
+    models = build_models(config)
+    tasks = models['iot_simulation'].generate_tasks(0)
+    models['task_offloading'].decide_offloading_batch(tasks, models['uav_simulation'].positions, 0)
+    uavs = models['uav_simulation'].uavs
+    iot_positions = models['iot_simulation'].positions
+    efficiency = models['task_offloading'].task_energy_efficiency
+    path_planning = models['path_planning']
+    change_ids, change_values = efficiency.end_slot()
+
+    def plan():
+        # Re-apply the slot's changes so that every repeat pays for the top-k selection, as each slot does
+        efficiency.assign(change_ids, change_values)
+        efficiency.end_slot()
+        return [path_planning.calculate_next_position(uav, 0, iot_positions, efficiency) for uav in uavs]
+    return plan
+
+def case_run_simulation(config):
+    def run():
+        SimulationManager(config).run_simulation()
+    return run
+
+# (name, case, uses per-task Python dicts)
+CASES = [
+    ('IoTSimulation.update_positions', case_update_positions, False),
+    ('IoTSimulation.generate_tasks', case_generate_tasks, False),
+    ('TaskBatch.__iter__', case_task_dicts, True),
+    ('TaskOffloading.decide_offloading', case_decide_offloading, True),
+    ('TaskOffloading.decide_offloading_batch', case_decide_offloading_batch, False),
+    ('EnergyModel.update_energy_consumption', case_update_energy_consumption, True),
+    ('EnergyModel.update_energy_consumption[batch]', case_update_energy_consumption_batch, False),
+    ('PathPlanning.calculate_next_position', case_calculate_next_position, False),
+    ('SimulationManager.run_simulation', case_run_simulation, False),
+]
+
+def time_case(case, config, repeats):
+    fn = case(config)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def get_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'seed': SEED
+    }
+
+def run_benchmarks(device_counts, uav_counts, repeats=5, time_slots=5, legacy_limit=100000, selected=None):
+    results = []
+    for device_count in device_counts:
+        for uav_count in uav_counts:
+            config = build_config(device_count, uav_count, time_slots)
+            for name, case, legacy in CASES:
+                if selected and not any(pattern in name for pattern in selected):
+                    continue
+                if legacy and device_count > legacy_limit:
+                    continue
+                # The full run is timed once per point; it already spans several slots
+                timings = time_case(case, config, 1 if case is case_run_simulation else repeats)
+                result = {
+                    'case': name,
+                    'devices': device_count,
+                    'uavs': uav_count,
+                    'best': min(timings),
+                    'mean': sum(timings) / len(timings),
+                    'repeats': len(timings)
+                }
+                if case is case_run_simulation:
+                    result['time_slots'] = time_slots
+                results.append(result)
+                print(f"{name:48s} devices={device_count:<8d} uavs={uav_count:<4d} best={result['best']:.6f}s")
+    return results
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['case'], r['devices'], r['uavs']): r for r in json.load(f)['results']}
+    for result in results:
+        previous = baseline.get((result['case'], result['devices'], result['uavs']))
+        if previous:
+            ratio = result['best'] / previous['best'] if previous['best'] > 0 else float('inf')
+            print(f"{result['case']:48s} devices={result['devices']:<8d} uavs={result['uavs']:<4d} {ratio:6.2f}x baseline")
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the simulation hot paths.')
+    parser.add_argument('--devices', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--uavs', type=int, nargs='+', default=[3, 30])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--time-slots', type=int, default=5, help='time slots for the full run')
+    parser.add_argument('--legacy-limit', type=int, default=100000,
+                        help='skip the per-task dict code paths above this many devices')
+    parser.add_argument('--case', nargs='*', help='only run cases whose name contains one of these')
+    parser.add_argument('--output', default=None, help='JSON output path')
+    parser.add_argument('--compare', default=None, help='earlier JSON output to compare against')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.devices, args.uavs, args.repeats, args.time_slots, args.legacy_limit, args.case)
+    output = args.output or os.path.join(OUTPUT_DIR, time.strftime('hot_paths_%Y%m%d_%H%M%S.json'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'metadata': get_metadata(), 'results': results}, f, indent=2)
+    print(f"Wrote {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
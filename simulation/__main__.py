@@ -0,0 +1,199 @@
+# simulation/__main__.py
+
+"""
+Command line entry point, run from the repository root:
+
+    python -m simulation run --set iot.device_count=1000 --set replicas.count=16 \
+        --set recording.directory=null --set checkpoint.interval=0
+    python -m simulation sweep --grid iot.device_count=300,400,500 --seeds 0 1 --plot
+    python -m simulation render --set iot.device_count=500
+    python -m simulation startup
+    python -m simulation cache --clear
+
+Output is headless: matplotlib uses the Agg backend and figures are written to files,
+unless `sweep --show` asks for the plots to be shown.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from simulation.config import load_config
+
+def parse_value(text):
+    # JSON where it parses (numbers, true/false, null, lists), the plain string otherwise
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_assignments(assignments):
+    overrides = {}
+    for assignment in assignments:
+        key, separator, value = assignment.partition('=')
+        if not separator:
+            raise SystemExit(f"expected key=value, got '{assignment}'")
+        overrides[key] = parse_value(value)
+    return overrides
+
+def parse_grid(assignments):
+    return {key: [parse_value(value) for value in values.split(',')]
+            for key, values in (assignment.partition('=')[::2] for assignment in assignments)}
+
+def load(args):
+    config = load_config(args.config)
+    return config.override(parse_assignments(args.set)) if args.set else config
+
+def run(args):
+    from simulation.sweep import create_simulation
+    from simulation.simulation_manager import SimulationManager
+
+    config = load(args)
+    if args.resume:
+        simulation = SimulationManager(config, resume=args.resume)
+    else:
+        simulation = create_simulation(config)
+    simulation.run_simulation()
+    result = {
+        'energy_efficiency': simulation.calculate_energy_efficiency(),
+        'energy_consumption': simulation.calculate_total_energy_consumption(),
+        'system_utility': simulation.calculate_system_utility()
+    }
+    if hasattr(simulation, 'summary'):
+        result['replicas'] = simulation.summary()
+    print(json.dumps(result, indent=2, default=float))
+
+def sweep(args):
+    from simulation.sweep import run_sweep, render_sweep, write_results_table
+
+    config = load(args)
+    grid = parse_grid(args.grid)
+    seeds = args.seeds if args.seeds else [config['simulation'].get('seed', 0)]
+    rows = run_sweep(config, grid, seeds=seeds, processes=args.processes)
+    write_results_table(rows, args.output)
+    print(f"Wrote {len(rows)} rows to {args.output}")
+    if args.render:
+        rendered = render_sweep(config, rows, name_key=next(iter(grid)), processes=args.processes)
+        if None in rendered:
+            print(f"Skipped rendering {rendered.count(None)} sharded or replica points: they record no flight paths",
+                  file=sys.stderr)
+    if args.plot:
+        from simulation.plots import plot_results
+        x = [row['iot.device_count'] if 'iot.device_count' in row else row['point'] for row in rows]
+        bands = {metric: [row.get(f'{metric}_ci') for row in rows]
+                 for metric in ('energy_efficiency', 'energy_consumption', 'system_utility')}
+        plot_results(x, [row['energy_efficiency'] for row in rows], [row['energy_consumption'] for row in rows],
+                     [row['system_utility'] for row in rows], bands, directory=args.plot_directory, show=args.show)
+
+def render(args):
+    from simulation.sweep import render_point, render_run
+
+    config = load(args)
+    name = args.name if args.name is not None else config['iot']['device_count']
+    if args.point is None:
+        # The trajectories that `run` recorded with the same config
+        rendered = render_run(config, name)
+    else:
+        rendered = render_point(config, args.point, {}, name)
+    if rendered is None:
+        print("Nothing to render: sharded and replica runs record no flight paths", file=sys.stderr)
+        return 1
+    print(f"Rendered flight paths for '{name}'")
+
+def cache(args):
+    from simulation.result_cache import OUTPUT_ONLY, ResultCache, result_key
+
+    # A --config, or a --set of a key that changes results, picks the entry of that config;
+    # otherwise the whole cache. Output-only keys such as cache.directory pick the cache itself.
+    output_only = tuple(OUTPUT_ONLY) + tuple(f'{key}.' for key in OUTPUT_ONLY)
+    single = args.config is not None or any(
+        not (key in OUTPUT_ONLY or key.startswith(output_only)) for key in parse_assignments(args.set))
+    args.config = args.config or 'config.json'
+    config = load(args)
+    cache_config = config.get('cache', {})
+    result_cache = ResultCache(cache_config.get('directory', 'results/data/cache'), cache_config.get('max_bytes', 1 << 30))
+    if single:
+        key = result_key(config)
+        cached = os.path.isdir(result_cache.entry_path(key))
+        if args.clear and cached:
+            result_cache.invalidate(key)
+            print(f"Removed cache entry {key}")
+        else:
+            print(f"Cache entry {key} is {'present' if cached else 'not cached'}")
+        return 0
+    entries = result_cache.entries()
+    size = sum(size for _, size, _ in entries)
+    if args.clear:
+        result_cache.invalidate()
+        print(f"Removed {len(entries)} cache entries ({size / 1e6:.1f} MB) from {result_cache.directory}")
+    else:
+        print(f"{len(entries)} cache entries ({size / 1e6:.1f} MB) in {result_cache.directory}")
+    return 0
+
+def startup(args):
+    from simulation.startup import measure_startup, check_headless
+
+    report = measure_startup(args.repeats)
+    print(json.dumps(report, indent=2))
+    not_headless = check_headless(report)
+    if not_headless:
+        print(f"Core modules that import heavy dependencies: {', '.join(not_headless)}", file=sys.stderr)
+        return 1
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m simulation', description='UAV-assisted IoT offloading simulation')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_config_arguments(command):
+        command.add_argument('--config', default='config.json', help='config file (default: config.json)')
+        command.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                             help='override a dotted config key, e.g. iot.device_count=1000; repeatable')
+
+    run_command = commands.add_parser('run', help='run one simulation and print its metrics as JSON')
+    add_config_arguments(run_command)
+    run_command.add_argument('--resume', help='checkpoint file or directory to resume from')
+    run_command.set_defaults(handler=run)
+
+    sweep_command = commands.add_parser('sweep', help='run a parameter sweep and write the results table')
+    add_config_arguments(sweep_command)
+    sweep_command.add_argument('--grid', action='append', required=True, metavar='KEY=V1,V2,...',
+                               help='values of a dotted config key to sweep over; repeatable')
+    sweep_command.add_argument('--seeds', type=int, nargs='+', help='seeds per point (default: simulation.seed)')
+    sweep_command.add_argument('--processes', type=int, help='pool size; 1 runs the points in this process')
+    sweep_command.add_argument('--output', default='results/data/sweep_results.csv', help='results table path')
+    sweep_command.add_argument('--render', action='store_true', help='render flight path animations of every point')
+    sweep_command.add_argument('--plot', action='store_true', help='write the metric plots')
+    sweep_command.add_argument('--plot-directory', default='results/plots', help='directory for the metric plots')
+    sweep_command.add_argument('--show', action='store_true', help='also show the plots in a window (blocks)')
+    sweep_command.set_defaults(handler=sweep)
+
+    render_command = commands.add_parser('render', help='render the flight path animation of one run')
+    add_config_arguments(render_command)
+    render_command.add_argument('--point', type=int,
+                                help="sweep point index whose recording to use (default: the recording of 'run')")
+    render_command.add_argument('--name', help='output name (default: the device count)')
+    render_command.set_defaults(handler=render)
+
+    cache_command = commands.add_parser('cache', help='report or clear the sweep result cache')
+    cache_command.add_argument('--config', help='config whose entry to report or clear (default: the whole cache)')
+    cache_command.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                               help='override a dotted config key of that config; repeatable')
+    cache_command.add_argument('--clear', action='store_true', help='remove the entries instead of reporting them')
+    cache_command.set_defaults(handler=cache)
+
+    startup_command = commands.add_parser('startup', help='measure import and startup times in fresh processes')
+    startup_command.add_argument('--repeats', type=int, default=5)
+    startup_command.set_defaults(handler=startup)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not getattr(args, 'show', False):
+        # Set before matplotlib is first imported; pool workers inherit it
+        os.environ['MPLBACKEND'] = 'Agg'
+    return args.handler(args) or 0
+
+if __name__ == '__main__':
+    sys.exit(main())
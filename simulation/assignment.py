@@ -0,0 +1,198 @@
+# simulation/assignment.py
+
+import time
+import numpy as np
+from utils.constants import BITS_PER_MEGABIT
+
+class CapacityAssignment:
+    """
+    Slot-wide task-to-UAV assignment under per-UAV capacities: `compute_capacity` CPU cycles
+    and `airtime_capacity` seconds of uplink per slot. It maximizes the offloaded data
+    volume over the sparse coverage graph (the covered task-UAV pairs only).
+
+    The solver is a price auction, i.e. Lagrangian relaxation of the two capacities. Every
+    task bids for the covering UAV with the highest value net of that UAV's cycle and
+    airtime prices, or stays local when no bid is positive. Overloaded UAVs raise their
+    prices and underloaded ones lower them. Every round is made feasible by keeping each
+    UAV's bids in order of value per unit of capacity, and the best feasible round is kept.
+
+    The greedy baseline is the uncapacitated decision (each task to its most efficient UAV)
+    made feasible the same way. It is the fallback when no round beats it, so the result
+    is never below the baseline. Prices carry over from slot
+    to slot as a warm start. Rounds stop at `max_iterations`, or earlier at the optional
+    `time_budget` in seconds; a budget makes the results depend on machine speed, so runs
+    with one are not deterministic and are never cached.
+    """
+    def __init__(self, config):
+        offloading_config = config.get('offloading', {})
+        slot_duration = config['simulation']['slot_duration']
+        uav_count = config['uav']['count']
+        self.compute_capacity = offloading_config.get('compute_capacity') or config['uav']['energy']['cpu_frequency'] * slot_duration
+        self.airtime_capacity = offloading_config.get('airtime_capacity') or slot_duration
+        self.time_budget = offloading_config.get('assignment_time_budget')  # None: no wall clock limit
+        self.max_iterations = offloading_config.get('assignment_iterations', 50)
+
+        # Prices in units of the mean task value per mean task usage of the resource
+        self.compute_price = np.zeros(uav_count)
+        self.airtime_price = np.zeros(uav_count)
+
+        # Run totals
+        self.slots = 0
+        self.iterations = 0
+        self.fallbacks = 0
+        self.offloaded_volume = 0.0  # Megabits offloaded by the assignment
+        self.greedy_volume = 0.0  # Megabits the greedy baseline would have offloaded
+        self.last_slot = {'offloaded_volume': 0.0, 'greedy_volume': 0.0, 'iterations': 0, 'fallback': False}
+
+    def assign(self, data_size, cycles, pairs):
+        """
+        Choose at most one pair per task. `pairs` holds the covered task-UAV pairs as
+        'task', 'uav', 'data_rate' and 'energy_efficiency' arrays, grouped by task.
+        Returns the chosen pair index for every task, -1 for tasks that stay local.
+        """
+        start = time.perf_counter()
+        task_count = len(data_size)
+        pair_task = pairs['task']
+        pair_uav = pairs['uav']
+        pair_cycles = cycles[pair_task]
+        pair_airtime = data_size[pair_task] * BITS_PER_MEGABIT / pairs['data_rate']
+        pair_value = data_size[pair_task]
+
+        # Greedy baseline: the most efficient UAV of every task, first UAV on ties
+        greedy = self.first_per_task(task_count, pair_task, np.lexsort((pair_uav, -pairs['energy_efficiency'], pair_task)))
+        best = self.enforce_capacity(greedy, pair_uav, pair_cycles, pair_airtime, pair_value)
+        greedy_volume = best_volume = float(data_size[best >= 0].sum())
+        fallback = True
+
+        iterations = 0
+        if len(pair_task):
+            value_scale = pair_value.mean()
+            compute_scale = value_scale / pair_cycles.mean()
+            airtime_scale = value_scale / pair_airtime.mean()
+            while iterations < self.max_iterations and not self.over_budget(start):
+                iterations += 1
+                net = (pair_value - self.compute_price[pair_uav] * compute_scale * pair_cycles
+                       - self.airtime_price[pair_uav] * airtime_scale * pair_airtime)
+                order = np.lexsort((pair_uav, -pairs['energy_efficiency'], -net, pair_task))
+                bids = self.first_per_task(task_count, pair_task, order)
+                bidding = bids >= 0
+                bidding[bidding] = net[bids[bidding]] > 0
+                bids[~bidding] = -1
+
+                feasible = self.enforce_capacity(bids, pair_uav, pair_cycles, pair_airtime, pair_value)
+                feasible = self.repair(feasible, pairs, pair_cycles, pair_airtime, pair_value)
+                volume = float(data_size[feasible >= 0].sum())
+                if volume > best_volume:
+                    best, best_volume, fallback = feasible, volume, False
+
+                # Subgradient step on the prices, with a decaying step size
+                bid_pairs = bids[bids >= 0]
+                compute_load = np.bincount(pair_uav[bid_pairs], weights=pair_cycles[bid_pairs], minlength=len(self.compute_price))
+                airtime_load = np.bincount(pair_uav[bid_pairs], weights=pair_airtime[bid_pairs], minlength=len(self.airtime_price))
+                compute_excess = compute_load / self.compute_capacity - 1
+                airtime_excess = airtime_load / self.airtime_capacity - 1
+                if (compute_excess <= 0).all() and (airtime_excess <= 0).all() and not self.compute_price.any() and not self.airtime_price.any():
+                    # Every task got its first choice at zero prices; nothing left to improve
+                    break
+                step = 0.5 / np.sqrt(iterations)
+                np.maximum(self.compute_price + step * compute_excess, 0, out=self.compute_price)
+                np.maximum(self.airtime_price + step * airtime_excess, 0, out=self.airtime_price)
+
+        self.slots += 1
+        self.iterations += iterations
+        self.fallbacks += fallback
+        self.offloaded_volume += best_volume
+        self.greedy_volume += greedy_volume
+        self.last_slot = {'offloaded_volume': best_volume, 'greedy_volume': greedy_volume,
+                          'iterations': iterations, 'fallback': fallback}
+        return best
+
+    def over_budget(self, start):
+        return self.time_budget is not None and time.perf_counter() - start >= self.time_budget
+
+    @staticmethod
+    def first_per_task(task_count, pair_task, order):
+        # Pair index of the first pair of every task in `order`, -1 for tasks without pairs
+        chosen = np.full(task_count, -1, dtype=np.int64)
+        sorted_tasks = pair_task[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sorted_tasks[1:] != sorted_tasks[:-1]
+        chosen[sorted_tasks[first]] = order[first]
+        return chosen
+
+    def repair(self, feasible, pairs, pair_cycles, pair_airtime, pair_value):
+        """
+        Move tasks that lost their bid to another covering UAV with capacity left, most
+        efficient first, until no more tasks fit.
+        """
+        pair_task = pairs['task']
+        pair_uav = pairs['uav']
+        uav_count = len(self.compute_price)
+        while True:
+            assigned = feasible[feasible >= 0]
+            compute_used = np.bincount(pair_uav[assigned], weights=pair_cycles[assigned], minlength=uav_count)
+            airtime_used = np.bincount(pair_uav[assigned], weights=pair_airtime[assigned], minlength=uav_count)
+            open_pairs = np.flatnonzero((feasible[pair_task] < 0)
+                                        & (pair_cycles <= self.compute_capacity - compute_used[pair_uav])
+                                        & (pair_airtime <= self.airtime_capacity - airtime_used[pair_uav]))
+            if len(open_pairs) == 0:
+                return feasible
+            order = open_pairs[np.lexsort((pair_uav[open_pairs], -pairs['energy_efficiency'][open_pairs], pair_task[open_pairs]))]
+            choice = self.first_per_task(len(feasible), pair_task, order)
+            added = self.enforce_capacity(choice, pair_uav, pair_cycles, pair_airtime, pair_value,
+                                          compute_used, airtime_used)
+            feasible = np.where(added >= 0, added, feasible)
+
+    def enforce_capacity(self, choice, pair_uav, pair_cycles, pair_airtime, pair_value,
+                         compute_used=None, airtime_used=None):
+        """
+        Keep, per UAV, the longest run of its chosen pairs in order of decreasing value per
+        unit of capacity that fits both capacities, less any capacity already used; the
+        other tasks stay local.
+        """
+        feasible = np.full(len(choice), -1, dtype=np.int64)
+        tasks = np.flatnonzero(choice >= 0)
+        if len(tasks) == 0:
+            return feasible
+        chosen = choice[tasks]
+        uav = pair_uav[chosen]
+        usage = pair_cycles[chosen] / self.compute_capacity + pair_airtime[chosen] / self.airtime_capacity
+        order = np.lexsort((-pair_value[chosen] / usage, uav))
+        uav = uav[order]
+        group_start = np.ones(len(order), dtype=bool)
+        group_start[1:] = uav[1:] != uav[:-1]
+        kept = np.ones(len(order), dtype=bool)
+        for load, capacity, used in ((pair_cycles[chosen][order], self.compute_capacity, compute_used),
+                                     (pair_airtime[chosen][order], self.airtime_capacity, airtime_used)):
+            if used is not None:
+                capacity = capacity - used[uav]
+            cumulative = np.cumsum(load)
+            # Subtract everything before the UAV's first pair, giving per-UAV running sums
+            offset = np.maximum.accumulate(np.where(group_start, cumulative - load, 0))
+            kept &= cumulative - offset <= capacity
+        feasible[tasks[order[kept]]] = chosen[order[kept]]
+        return feasible
+
+    def summary(self):
+        return {
+            'slots': self.slots,
+            'iterations': self.iterations,
+            'fallbacks': self.fallbacks,
+            'offloaded_volume': self.offloaded_volume,
+            'greedy_volume': self.greedy_volume,
+            'gain': self.offloaded_volume / self.greedy_volume - 1 if self.greedy_volume > 0 else 0.0
+        }
+
+    def state_dict(self):
+        return {
+            'compute_price': self.compute_price.copy(),
+            'airtime_price': self.airtime_price.copy(),
+            'totals': np.array([self.slots, self.iterations, self.fallbacks]),
+            'volumes': np.array([self.offloaded_volume, self.greedy_volume])
+        }
+
+    def load_state_dict(self, state):
+        self.compute_price = np.array(state['compute_price'], dtype=float)
+        self.airtime_price = np.array(state['airtime_price'], dtype=float)
+        self.slots, self.iterations, self.fallbacks = (int(value) for value in state['totals'])
+        self.offloaded_volume, self.greedy_volume = (float(value) for value in state['volumes'])
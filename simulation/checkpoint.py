@@ -0,0 +1,112 @@
+# simulation/checkpoint.py
+
+import glob
+import os
+import queue
+import threading
+import numpy as np
+
+CHECKPOINT_PATTERN = 'checkpoint_*.npz'
+
+def checkpoint_path(directory, slot):
+    return os.path.join(directory, f'checkpoint_{slot:06d}.npz')
+
+def list_checkpoints(directory):
+    # Zero-padded slot numbers sort in slot order
+    return sorted(glob.glob(os.path.join(directory, CHECKPOINT_PATTERN)))
+
+def latest_checkpoint(directory):
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1] if checkpoints else None
+
+def prefixed(prefix, state):
+    return {f'{prefix}/{name}': value for name, value in state.items()}
+
+def unprefixed(prefix, state):
+    start = len(prefix) + 1
+    return {name[start:]: value for name, value in state.items() if name.startswith(prefix + '/')}
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint into a {name: array} dict. `path` may also be a directory, in which
+    case its most recent checkpoint is used.
+    """
+    if os.path.isdir(path):
+        checkpoint = latest_checkpoint(path)
+        if checkpoint is None:
+            raise FileNotFoundError(f'no checkpoints in {path}')
+        path = checkpoint
+    with np.load(path) as checkpoint:
+        return {name: checkpoint[name] for name in checkpoint.files}
+
+class CheckpointWriter:
+    """
+    Writes checkpoints from a background thread so the slot loop does not wait on disk.
+    Each checkpoint is a single .npz of flat arrays, written to a temporary file and
+    renamed into place, so a crash mid-write never leaves a truncated checkpoint behind.
+    Only the `keep` most recent checkpoints are kept.
+
+    Callers hand over arrays they will not modify again, i.e. copies of live state.
+    At most `max_pending` checkpoints wait in the queue before submit blocks.
+    """
+    def __init__(self, directory, keep=2, compress=False, max_pending=1):
+        self.directory = directory
+        self.keep = keep
+        self.compress = compress
+        self.written = []  # Paths written by this writer, oldest first
+        self.error = None
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()  # flush() barrier
+                    continue
+                if self.error is None:
+                    self.write(*item)
+            except Exception as error:  # Re-raised in the simulation thread on the next call
+                self.error = error
+            finally:
+                self._queue.task_done()
+
+    def write(self, slot, state):
+        path = checkpoint_path(self.directory, slot)
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as f:
+            if self.compress:
+                np.savez_compressed(f, **state)
+            else:
+                np.savez(f, **state)
+        os.replace(temporary_path, path)
+        self.written.append(path)
+        while self.keep and len(self.written) > self.keep:
+            os.remove(self.written.pop(0))
+
+    def raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, slot, state):
+        self.raise_error()
+        self._queue.put((slot, state))
+
+    def flush(self):
+        barrier = threading.Event()
+        self._queue.put(barrier)
+        barrier.wait()
+        self.raise_error()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self.raise_error()
@@ -1,26 +1,85 @@
 # simulation/communication_model.py
 
 import math
-from utils.constants import NOISE_POWER, BANDWIDTH, PATH_LOSS_EXPONENT
+import numpy as np
+from simulation.config import as_config
+
+MIN_DISTANCE = 1  # meters; keeps the path loss finite when a UAV is directly at a device
 
 class CommunicationModel:
     def __init__(self, config):
-        self.bandwidth = BANDWIDTH
-        self.noise_power = NOISE_POWER
+        config = as_config(config)
+        communication_config = config['communication']
+        self.bandwidth = communication_config['bandwidth']
+        self.noise_power = communication_config['noise_power']
+        self.path_loss_exponent = communication_config['path_loss_exponent']
+        self.transmission_power = config['iot']['energy']['transmission_power']
+        self.fixed_data_rate = float(config['iot']['energy']['data_rate'])
+
+        # Distance-dependent Shannon rate per device-UAV pair, or the fixed IoT data rate
+        self.per_pair_rate = communication_config.get('per_pair_rate', True)
+        self.rate_table_distances = None
+        self.rate_table = None
+        if communication_config.get('rate_lookup', False):
+            # Rate-vs-distance table over every distance possible in the area, interpolated linearly
+            area_size = config['simulation']['area_size']
+            max_distance = math.sqrt(2 * area_size**2 + config['uav']['flying_height']**2)
+            self.rate_table_distances = np.linspace(0, max_distance, communication_config.get('lookup_points', 4096))
+            self.rate_table = self.calculate_shannon_rate(self.rate_table_distances)
+            self.rate_table_step = self.rate_table_distances[1]
 
     def calculate_data_rate(self, iot_device, uav):
-        distance = self.calculate_distance(iot_device.position, uav.position)
+        distance = max(self.calculate_distance(iot_device.position, uav.position), MIN_DISTANCE)
         path_loss = self.calculate_path_loss(distance)
-        snr = iot_device.transmission_power / (path_loss * self.noise_power)
+        transmission_power = getattr(iot_device, 'transmission_power', self.transmission_power)
+        snr = transmission_power / (path_loss * self.noise_power)
         data_rate = self.bandwidth * math.log2(1 + snr)
         return data_rate  # in bits per second
 
+    def calculate_shannon_rate(self, distances):
+        # Shannon rate at an array of distances, in bits per second
+        path_loss = self.calculate_path_loss(np.maximum(distances, MIN_DISTANCE))
+        snr = self.transmission_power / (path_loss * self.noise_power)
+        return self.bandwidth * np.log2(1 + snr)
+
+    def calculate_data_rates(self, distances):
+        """
+        Data rates for an array of device-UAV distances (e.g. the (N, K) output of
+        calculate_distances), read from the lookup table when it is enabled.
+        """
+        if not self.per_pair_rate:
+            return np.full(np.shape(distances), self.fixed_data_rate)
+        if self.rate_table is not None:
+            return self.interpolate_rate(distances)
+        return self.calculate_shannon_rate(distances)
+
+    def interpolate_rate(self, distances):
+        # The table is evenly spaced, so the bracketing entry is found by division rather than search
+        position = np.minimum(np.asarray(distances, dtype=float) / self.rate_table_step, len(self.rate_table) - 1)
+        index = np.minimum(position.astype(np.intp), len(self.rate_table) - 2)
+        weight = position - index
+        return self.rate_table[index] * (1 - weight) + self.rate_table[index + 1] * weight
+
     def calculate_distance(self, pos1, pos2):
         x1, y1, z1 = pos1
         x2, y2, z2 = pos2
         return math.sqrt((x1 - x2)**2 + (y1 - y2)**2 + (z1 - z2)**2)
 
+    def calculate_distances(self, positions, uav_positions):
+        """
+        Pairwise distances between (N, 3) positions and (K, 3) UAV positions, as an (N, K) array.
+        An (N, K, 3) array gives every position its own K UAVs, e.g. those of its replica.
+        """
+        positions = np.asarray(positions, dtype=float)
+        uav_positions = np.asarray(uav_positions, dtype=float)
+        if uav_positions.ndim == 2:
+            uav_positions = uav_positions[None]
+        dx = positions[:, None, 0] - uav_positions[..., 0]
+        dy = positions[:, None, 1] - uav_positions[..., 1]
+        dz = positions[:, None, 2] - uav_positions[..., 2]
+        return np.sqrt(dx**2 + dy**2 + dz**2)
+
     def calculate_path_loss(self, distance):
         # Free-space path loss model
-        path_loss = (distance ** PATH_LOSS_EXPONENT)
+        path_loss = (distance ** self.path_loss_exponent)
         return path_loss
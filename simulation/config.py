@@ -0,0 +1,301 @@
+# simulation/config.py
+
+import json
+from collections.abc import Mapping
+from functools import cached_property
+
+from utils.constants import (AREA_SIZE, SLOT_DURATION, UAV_MAX_SPEED, UAV_ENERGY_PARAMS, IOT_ENERGY_PARAMS,
+                             UAV_PROPULSION_PARAMS, NOISE_POWER, BANDWIDTH, PATH_LOSS_EXPONENT)
+
+# Physical parameters from utils.constants, used wherever config.json does not set them
+DEFAULTS = {
+    'simulation': {
+        'area_size': AREA_SIZE,
+        'slot_duration': SLOT_DURATION,
+        'seed': 0
+    },
+    'uav': {
+        'max_speed': UAV_MAX_SPEED,
+        'energy': dict(UAV_ENERGY_PARAMS),
+        'propulsion': dict(UAV_PROPULSION_PARAMS)
+    },
+    'iot': {
+        'energy': dict(IOT_ENERGY_PARAMS)
+    },
+    'communication': {
+        'noise_power': NOISE_POWER,
+        'bandwidth': BANDWIDTH,
+        'path_loss_exponent': PATH_LOSS_EXPONENT
+    }
+}
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def positive_int(value):
+    return None if _is_int(value) and value > 0 else 'a positive integer'
+
+def non_negative_int(value):
+    return None if _is_int(value) and value >= 0 else 'a non-negative integer'
+
+def positive_number(value):
+    return None if _is_number(value) and value > 0 else 'a positive number'
+
+def non_negative_number(value):
+    return None if _is_number(value) and value >= 0 else 'a non-negative number'
+
+def at_least(minimum):
+    def check(value):
+        return None if _is_int(value) and value >= minimum else f'an integer of at least {minimum}'
+    return check
+
+def fraction(value):
+    return None if _is_number(value) and 0 < value < 1 else 'a number between 0 and 1'
+
+def boolean(value):
+    return None if isinstance(value, bool) else 'true or false'
+
+def string(value):
+    return None if isinstance(value, str) else 'a string'
+
+def one_of(*choices):
+    def check(value):
+        return None if value in choices else 'one of ' + ', '.join(repr(choice) for choice in choices)
+    return check
+
+def optional(check):
+    def check_optional(value):
+        return None if value is None else check(value)
+    return check_optional
+
+# Checks for known fields; fields that are not listed here are passed through unchecked
+FIELDS = {
+    'simulation.time_slots': positive_int,
+    'simulation.area_size': positive_number,
+    'simulation.slot_duration': positive_number,
+    'simulation.seed': non_negative_int,
+    'uav.count': non_negative_int,
+    'uav.max_speed': non_negative_number,
+    'uav.coverage_radius': non_negative_number,
+    'uav.flying_height': non_negative_number,
+    'uav.energy.kappa': non_negative_number,
+    'uav.energy.cpu_frequency': positive_number,
+    'iot.device_count': non_negative_int,
+    'iot.energy.kappa': non_negative_number,
+    'iot.energy.cpu_frequency': positive_number,
+    'iot.energy.transmission_power': positive_number,
+    'iot.energy.data_rate': positive_number,
+    'communication.noise_power': positive_number,
+    'communication.bandwidth': positive_number,
+    'communication.path_loss_exponent': positive_number,
+    'communication.per_pair_rate': boolean,
+    'communication.rate_lookup': boolean,
+    'communication.lookup_points': at_least(2),  # The table step is the gap between the first two points
+    'offloading.spatial_index': boolean,
+    'offloading.batch': boolean,
+    'offloading.batch_pair_limit': positive_int,
+    'offloading.assignment': one_of('greedy', 'capacity'),
+    'offloading.compute_capacity': optional(positive_number),
+    'offloading.airtime_capacity': optional(positive_number),
+    'offloading.assignment_time_budget': optional(positive_number),
+    'offloading.assignment_iterations': positive_int,
+    'path_planning.mode': one_of('best', 'distinct', 'cluster'),
+    'path_planning.top_k': positive_int,
+    'path_planning.cluster_sample': positive_int,
+    'path_planning.cluster_iterations': positive_int,
+    'recording.directory': optional(string),
+    'recording.chunk_size': positive_int,
+    'recording.window': optional(positive_int),
+    'instrumentation.directory': optional(string),
+    'metrics.series_capacity': positive_int,
+    'metrics.relative_accuracy': fraction,
+    'queueing.enabled': boolean,
+    'sharding.workers': positive_int,
+    'replicas.count': positive_int,
+    'replicas.confidence': fraction,
+    'cache.enabled': boolean,
+    'cache.directory': optional(string),
+    'cache.max_bytes': positive_int,
+    'checkpoint.directory': optional(string),
+    'checkpoint.interval': non_negative_int,
+    'checkpoint.keep': non_negative_int,
+    'rendering.format': one_of('gif', 'mp4', 'png'),
+    'rendering.top_n': positive_int,
+    'rendering.processes': optional(positive_int),
+    'logging.level': one_of('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+    'logging.quiet': boolean,
+    'log_file': string
+}
+
+REQUIRED = ('simulation.time_slots', 'uav.count', 'uav.coverage_radius', 'uav.flying_height',
+            'iot.device_count', 'log_file')
+
+def _freeze(value):
+    # Lists become tuples so that nothing reachable from a Config can be changed in place
+    if isinstance(value, dict):
+        return {key: _freeze(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    if isinstance(value, dict):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+def _merge(base, overlay):
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def _lookup(data, dotted_key):
+    for key in dotted_key.split('.'):
+        if not isinstance(data, dict) or key not in data:
+            raise KeyError(dotted_key)
+        data = data[key]
+    return data
+
+def _validate(data, keys):
+    for key in keys:
+        try:
+            value = _lookup(data, key)
+        except KeyError:
+            if key in REQUIRED:
+                raise ValueError(f"Missing config value '{key}'")
+            continue
+        problem = FIELDS[key](value)
+        if problem:
+            raise ValueError(f"Invalid config value for '{key}': {value!r} (expected {problem})")
+
+def _validate_combinations(data):
+    # Checks that span more than one field, run after the field checks
+    offloading = data.get('offloading') or {}
+    if offloading.get('spatial_index') and not data['uav']['coverage_radius'] > 0:
+        raise ValueError("Invalid config: 'offloading.spatial_index' needs a positive 'uav.coverage_radius' "
+                         "(the grid cell size)")
+
+    # Sharded and replica runs implement only part of SimulationManager; reject what they would ignore
+    sharded = (data.get('sharding') or {}).get('workers', 1) > 1
+    replicated = (data.get('replicas') or {}).get('count', 1) > 1
+    if sharded and replicated:
+        raise ValueError("Invalid config: 'sharding.workers' > 1 cannot be combined with 'replicas.count' > 1")
+    if not (sharded or replicated):
+        return
+    mode = "'sharding.workers' > 1" if sharded else "'replicas.count' > 1"
+    checkpoint = data.get('checkpoint') or {}
+    conflicts = {
+        "'offloading.assignment' = 'capacity'": offloading.get('assignment', 'greedy') == 'capacity',
+        "'queueing.enabled'": (data.get('queueing') or {}).get('enabled', False),
+        "'recording.directory'": (data.get('recording') or {}).get('directory') is not None,
+        "'checkpoint.directory' with a positive 'checkpoint.interval'": bool(checkpoint.get('directory')
+                                                                             and checkpoint.get('interval', 0))
+    }
+    conflicting = [setting for setting, conflict in conflicts.items() if conflict]
+    if conflicting:
+        raise ValueError(f"Invalid config: {mode} does not support {', '.join(conflicting)}")
+
+class Config(Mapping):
+    """
+    Validated, read-only simulation config. Sections read like the nested dicts of
+    config.json (config['uav']['count'], config.get('recording', {})) without copying.
+    Values missing from the file fall back to DEFAULTS. override() returns a new Config
+    that shares every section it does not touch. Unpickling skips validation.
+    """
+    def __init__(self, data):
+        # Trusted, already frozen and validated data; use Config.from_dict for anything else
+        self._data = data
+        self._sections = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        merged = _freeze(_merge(DEFAULTS, data))
+        _validate(merged, FIELDS)
+        _validate_combinations(merged)
+        return cls(merged)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        if isinstance(value, dict):
+            section = self._sections.get(key)
+            if section is None:
+                section = self._sections[key] = Config(value)
+            return section
+        return value
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f'Config({self._data!r})'
+
+    def override(self, overrides):
+        """
+        New Config with dotted keys replaced, e.g. {'iot.device_count': 400}. Only the
+        sections along each key's path are copied, and only the replaced values are validated.
+        """
+        data = dict(self._data)
+        copied = set()
+        checked = []
+        for dotted_key, value in overrides.items():
+            section = data
+            *parents, key = dotted_key.split('.')
+            path = ''
+            for parent in parents:
+                path = f'{path}.{parent}' if path else parent
+                if path not in copied:
+                    section[parent] = dict(section.get(parent) or {})
+                    copied.add(path)
+                section = section[parent]
+            section[key] = _freeze(value)
+            checked.extend(field for field in FIELDS if field == dotted_key or field.startswith(dotted_key + '.'))
+        _validate(data, checked)
+        _validate_combinations(data)
+        return Config(data)
+
+    def to_dict(self):
+        return _thaw(self._data)
+
+    def to_json(self):
+        # Compact and key-sorted, so equal configs give equal strings
+        return json.dumps(self._data, separators=(',', ':'), sort_keys=True)
+
+    def __reduce__(self):
+        # Just the data; section views and derived values are rebuilt on demand
+        return (Config, (self._data,))
+
+    @cached_property
+    def derived(self):
+        """
+        Values computed from the config once and reused, e.g. the kappa * f^2 factors of
+        the computation energy equations.
+        """
+        uav_energy = self._data['uav']['energy']
+        iot_energy = self._data['iot']['energy']
+        return {
+            'uav_computation_coefficient': uav_energy['kappa'] * (uav_energy['cpu_frequency'] ** 2),
+            'iot_computation_coefficient': iot_energy['kappa'] * (iot_energy['cpu_frequency'] ** 2)
+        }
+
+def as_config(config):
+    # Accept either a Config or a plain dict as loaded from config.json
+    return config if isinstance(config, Config) else Config.from_dict(config)
+
+def load_config(path='config.json'):
+    with open(path, 'r') as config_file:
+        return Config.from_dict(json.load(config_file))
@@ -0,0 +1,136 @@
+# simulation/efficiency_tracker.py
+
+from collections.abc import Mapping
+import numpy as np
+
+class EfficiencyTracker(Mapping):
+    """
+    Latest energy efficiency per IoT device, stored densely by device_id (NaN until the
+    device generates its first task), plus the change set of the current time slot.
+    top_k selects the best devices on demand. Also reads like the {device_id: efficiency}
+    dict it replaces.
+    """
+    def __init__(self, device_count):
+        self.values = np.full(device_count, np.nan)
+        self.pending_ids = []
+        self.pending_values = []
+        self.top = None  # Last top_k selection, until the next assign
+        self.top_limit = 0  # The k it was selected for
+
+    def assign(self, device_ids, values):
+        device_ids = np.asarray(device_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        self.values[device_ids] = values
+        self.pending_ids.append(device_ids)
+        self.pending_values.append(values)
+        self.top = None
+
+    def __setitem__(self, device_id, value):
+        self.assign([device_id], [value])
+
+    def end_slot(self):
+        """
+        Return the changes made since the previous call as (device_ids, values) arrays.
+        """
+        if self.pending_ids:
+            changes = (np.concatenate(self.pending_ids), np.concatenate(self.pending_values))
+        else:
+            changes = (np.empty(0, dtype=np.int64), np.empty(0))
+        self.pending_ids = []
+        self.pending_values = []
+        return changes
+
+    def top_k(self, k):
+        """
+        Device ids of the k highest efficiencies, best first, lowest device id first on ties.
+        Selected with argpartition in O(N + k log k) and kept until the next assign, so the
+        planners' queries in one slot share a single pass.
+        """
+        if self.top is None or k > self.top_limit:
+            self.top = self.select_top(k)
+            self.top_limit = k
+        return self.top[:k]
+
+    def top_k_values(self, k):
+        # Efficiencies of the top_k devices, in the same order
+        return self.values[self.top_k(k)]
+
+    def select_top(self, k):
+        ids = np.flatnonzero(~np.isnan(self.values))
+        values = self.values[ids]
+        if 0 < k < len(ids):
+            # Everything above the k-th best value, then the lowest ids among those equal to it
+            threshold = -np.partition(-values, k - 1)[k - 1]
+            above = np.flatnonzero(values > threshold)
+            tied = np.flatnonzero(values == threshold)[:k - len(above)]
+            keep = np.concatenate((above, tied))
+            ids, values = ids[keep], values[keep]
+        elif k <= 0:
+            return ids[:0]
+        return ids[np.lexsort((ids, -values))]
+
+    def state_dict(self):
+        # Copies of the tracker state, for checkpoints; taken between slots, so nothing is pending
+        return {'values': self.values.copy()}
+
+    def load_state_dict(self, state):
+        self.values[:] = state['values']
+        self.pending_ids = []
+        self.pending_values = []
+        self.top = None
+
+    def view(self):
+        # Read-only view of the dense array; no copy
+        view = self.values.view()
+        view.flags.writeable = False
+        return view
+
+    def __getitem__(self, device_id):
+        value = self.values[device_id]
+        if np.isnan(value):
+            raise KeyError(device_id)
+        return float(value)
+
+    def __iter__(self):
+        return iter(np.flatnonzero(~np.isnan(self.values)).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+    def copy(self):
+        return dict(self)
+
+class EfficiencyHistory:
+    """
+    Per-slot efficiency arrays rebuilt by replaying recorded change sets.
+    Reading slots in increasing order replays each change set once.
+    """
+    def __init__(self, device_count, change_ids, change_values):
+        self.device_count = device_count
+        self.change_ids = change_ids
+        self.change_values = change_values
+        self.values = np.full(device_count, np.nan)
+        self.slot = -1
+
+    def __len__(self):
+        return len(self.change_ids)
+
+    def __getitem__(self, slot):
+        if slot < 0:
+            slot += len(self)
+        if not 0 <= slot < len(self):
+            raise IndexError(f'slot {slot} out of range')
+        if slot < self.slot:
+            # Going backwards; replay from the start
+            self.values = np.full(self.device_count, np.nan)
+            self.slot = -1
+        while self.slot < slot:
+            self.slot += 1
+            self.values[self.change_ids[self.slot]] = self.change_values[self.slot]
+        view = self.values.view()
+        view.flags.writeable = False
+        return view
+
+    def __iter__(self):
+        for slot in range(len(self)):
+            yield self[slot]
@@ -1,14 +1,99 @@
 # simulation/energy_model.py
 
-from utils.constants import UAV_ENERGY_PARAMS, IOT_ENERGY_PARAMS
+import numpy as np
+from simulation.config import as_config
+from utils.constants import BITS_PER_MEGABIT
 
 class EnergyModel:
+    """
+    Energy ledger indexed by uav_id and device_id, with running totals and per-slot time series.
+    """
     def __init__(self, config):
-        self.uav_energy_consumption = {}
-        self.iot_energy_consumption = {}
+        config = as_config(config)
         self.config = config
+        self.uav_energy_params = config['uav']['energy']
+        self.iot_energy_params = config['iot']['energy']
+        self.propulsion_params = config['uav']['propulsion']
+        self.slot_duration = config['simulation']['slot_duration']
+        self.uav_computation_coefficient = config.derived['uav_computation_coefficient']  # kappa * f^2
+        self.iot_computation_coefficient = config.derived['iot_computation_coefficient']
+        uav_count = config['uav']['count']
+        device_count = config['iot']['device_count']
+        time_slots = config['simulation']['time_slots']
+
+        # Cumulative energy per UAV and per device
+        self.uav_energy = np.zeros(uav_count)  # Computation
+        self.uav_propulsion_energy = np.zeros(uav_count)
+        self.iot_energy = np.zeros(device_count)
+
+        # Running totals, kept up to date on every update
+        self.total_uav_energy = 0.0
+        self.total_propulsion_energy = 0.0
+        self.total_iot_energy = 0.0
+
+        # Per-slot time series, preallocated for the configured number of slots
+        self.uav_energy_series = np.zeros((time_slots, uav_count))
+        self.propulsion_energy_series = np.zeros((time_slots, uav_count))
+        self.iot_energy_series = np.zeros(time_slots)
+        self.slot_count = 0
+
+    @property
+    def uav_energy_consumption(self):
+        # {uav_id: computation energy} for UAVs that have processed tasks
+        uav_ids = np.flatnonzero(self.uav_energy)
+        return dict(zip(uav_ids.tolist(), self.uav_energy[uav_ids].tolist()))
+
+    @property
+    def iot_energy_consumption(self):
+        # {device_id: energy} for devices that have generated tasks
+        device_ids = np.flatnonzero(self.iot_energy)
+        return dict(zip(device_ids.tolist(), self.iot_energy[device_ids].tolist()))
+
+    def reserve_slot(self, time_slot):
+        # Grow the time series if the run is longer than configured
+        if time_slot >= len(self.iot_energy_series):
+            extra = max(time_slot + 1, 2 * len(self.iot_energy_series)) - len(self.iot_energy_series)
+            self.uav_energy_series = np.concatenate([self.uav_energy_series, np.zeros((extra, len(self.uav_energy)))])
+            self.propulsion_energy_series = np.concatenate([self.propulsion_energy_series, np.zeros((extra, len(self.uav_energy)))])
+            self.iot_energy_series = np.concatenate([self.iot_energy_series, np.zeros(extra)])
+        self.slot_count = max(self.slot_count, time_slot + 1)
+
+    def state_dict(self):
+        # Copies of the ledger, for checkpoints
+        return {
+            'uav_energy': self.uav_energy.copy(),
+            'uav_propulsion_energy': self.uav_propulsion_energy.copy(),
+            'iot_energy': self.iot_energy.copy(),
+            'total_uav_energy': np.array(self.total_uav_energy),
+            'total_propulsion_energy': np.array(self.total_propulsion_energy),
+            'total_iot_energy': np.array(self.total_iot_energy),
+            'uav_energy_series': self.uav_energy_series[:self.slot_count].copy(),
+            'propulsion_energy_series': self.propulsion_energy_series[:self.slot_count].copy(),
+            'iot_energy_series': self.iot_energy_series[:self.slot_count].copy()
+        }
+
+    def load_state_dict(self, state):
+        self.uav_energy[:] = state['uav_energy']
+        self.uav_propulsion_energy[:] = state['uav_propulsion_energy']
+        self.iot_energy[:] = state['iot_energy']
+        self.total_uav_energy = state['total_uav_energy'][()]
+        self.total_propulsion_energy = state['total_propulsion_energy'][()]
+        self.total_iot_energy = state['total_iot_energy'][()]
+        self.slot_count = 0
+        slot_count = len(state['iot_energy_series'])
+        if slot_count:
+            self.reserve_slot(slot_count - 1)
+        self.uav_energy_series[:slot_count] = state['uav_energy_series']
+        self.propulsion_energy_series[:slot_count] = state['propulsion_energy_series']
+        self.iot_energy_series[:slot_count] = state['iot_energy_series']
 
     def update_energy_consumption(self, offloading_decisions, time_slot):
+        if hasattr(offloading_decisions, 'offloaded'):
+            # Array form from TaskOffloading.decide_offloading_batch
+            self.update_energy_consumption_batch(offloading_decisions, time_slot)
+            return
+
+        self.reserve_slot(time_slot)
         # Calculate energy consumption based on offloading decisions
         for decision in offloading_decisions:
             device_id = decision['device_id']
@@ -19,52 +104,112 @@ class EnergyModel:
             if offloaded:
                 # Energy consumed by UAV for computation
                 uav_energy = self.calculate_uav_computation_energy(task)
-                # Energy consumed by UAV for propulsion is calculated in path_planning
-                # Update UAV energy consumption
-                if uav_id not in self.uav_energy_consumption:
-                    self.uav_energy_consumption[uav_id] = 0
-                self.uav_energy_consumption[uav_id] += uav_energy
-
-                # Energy consumed by IoT device for transmission
-                iot_energy = self.calculate_iot_transmission_energy(task)
+                self.uav_energy[uav_id] += uav_energy
+                self.uav_energy_series[time_slot, uav_id] += uav_energy
+                self.total_uav_energy += uav_energy
+
+                # Energy consumed by IoT device for transmission at the pair's data rate
+                iot_energy = self.calculate_iot_transmission_energy(task, decision.get('data_rate'))
             else:
                 # Energy consumed by IoT device for local computation
                 iot_energy = self.calculate_iot_computation_energy(task)
 
             # Update IoT device energy consumption
-            if device_id not in self.iot_energy_consumption:
-                self.iot_energy_consumption[device_id] = 0
-            self.iot_energy_consumption[device_id] += iot_energy
+            self.iot_energy[device_id] += iot_energy
+            self.iot_energy_series[time_slot] += iot_energy
+            self.total_iot_energy += iot_energy
+
+    def update_energy_consumption_batch(self, batch, time_slot):
+        self.reserve_slot(time_slot)
+        tasks = batch.tasks
+        offloaded = batch.offloaded
+
+        # The energy equations below work element-wise on arrays of tasks
+        uav_energy = self.calculate_uav_computation_energy(tasks)[offloaded]
+        iot_energy = np.where(offloaded,
+                              self.calculate_iot_transmission_energy(tasks, batch.data_rate),
+                              self.calculate_iot_computation_energy(tasks))
+
+        # Scatter-add into the ledger; bincount is the fast form of np.add.at for the few UAVs
+        slot_uav_energy = np.bincount(batch.uav_id[offloaded], weights=uav_energy, minlength=len(self.uav_energy))
+        np.add.at(self.iot_energy, batch.device_id, iot_energy)
+        self.add_slot_energy(time_slot, slot_uav_energy, iot_energy.sum())
+
+    def add_slot_energy(self, time_slot, slot_uav_energy, slot_iot_energy):
+        """
+        Add one slot's per-UAV computation energy and total IoT energy to the UAV ledger,
+        the time series and the running totals. Per-device IoT energy is charged by the caller.
+        """
+        self.reserve_slot(time_slot)
+        self.uav_energy += slot_uav_energy
+        self.uav_energy_series[time_slot] += slot_uav_energy
+        self.iot_energy_series[time_slot] += slot_iot_energy
+        self.total_uav_energy += slot_uav_energy.sum()
+        self.total_iot_energy += slot_iot_energy
+
+    def update_propulsion_energy(self, distances, time_slot):
+        """
+        Charge each UAV the propulsion energy of flying `distances` (one per UAV) in one slot.
+        """
+        self.reserve_slot(time_slot)
+        speed = np.asarray(distances, dtype=float) / self.slot_duration
+        energy = self.calculate_uav_propulsion_power(speed) * self.slot_duration
+        self.uav_propulsion_energy += energy
+        self.propulsion_energy_series[time_slot] += energy
+        self.total_propulsion_energy += energy.sum()
+
+    def calculate_uav_propulsion_power(self, speed):
+        # Rotary-wing propulsion power at horizontal speed V:
+        # P(V) = P_0 (1 + 3V^2/U_tip^2) + P_i (sqrt(1 + V^4/(4 v_0^4)) - V^2/(2 v_0^2))^{1/2} + 1/2 d_0 rho s A V^3
+        params = self.propulsion_params
+        P_0 = params['blade_profile_power']
+        P_i = params['induced_power']
+        U_tip = params['tip_speed']
+        v_0 = params['mean_induced_velocity']
+        blade_profile = P_0 * (1 + 3 * speed**2 / U_tip**2)
+        induced = P_i * np.sqrt(np.sqrt(1 + speed**4 / (4 * v_0**4)) - speed**2 / (2 * v_0**2))
+        parasite = 0.5 * params['fuselage_drag_ratio'] * params['air_density'] * params['rotor_solidity'] * params['rotor_disc_area'] * speed**3
+        return blade_profile + induced + parasite
 
     def calculate_uav_computation_energy(self, task):
         # Implement Equation (8) from the paper
-        # U_j^{comp} = \kappa_j (f_j^{(k)})^2 D_k C_k
-        kappa = UAV_ENERGY_PARAMS['kappa']
-        f = UAV_ENERGY_PARAMS['cpu_frequency']
+        # U_j^{comp} = \kappa_j (f_j^{(k)})^2 D_k C_k, with \kappa_j (f_j^{(k)})^2 precomputed
         D_k = task['data_size']
         C_k = task['computation_intensity']
-        energy = kappa * (f ** 2) * D_k * C_k
+        energy = self.uav_computation_coefficient * D_k * C_k
         return energy
 
-    def calculate_iot_transmission_energy(self, task):
-        # Implement energy consumption for transmission
-        power = IOT_ENERGY_PARAMS['transmission_power']
-        duration = task['data_size'] / IOT_ENERGY_PARAMS['data_rate']
+    def calculate_iot_transmission_energy(self, task, data_rate=None):
+        # Implement energy consumption for transmission, at the fixed IoT data rate unless a rate is given
+        if data_rate is None:
+            data_rate = self.iot_energy_params['data_rate']
+        return self.calculate_transmission_energy(task['data_size'], data_rate)
+
+    def calculate_transmission_energy(self, data_size, data_rate):
+        # Data size in megabits and rate in bits per second; works on scalars and on
+        # broadcastable arrays, e.g. (T, 1) sizes against (T, K) rates
+        power = self.iot_energy_params['transmission_power']
+        duration = data_size * BITS_PER_MEGABIT / data_rate
         energy = power * duration
         return energy
 
     def calculate_iot_computation_energy(self, task):
         # Implement Equation (9) from the paper
-        # U_i = e_i (f_i)^2 D_k C_k
-        e_i = IOT_ENERGY_PARAMS['kappa']
-        f_i = IOT_ENERGY_PARAMS['cpu_frequency']
+        # U_i = e_i (f_i)^2 D_k C_k, with e_i (f_i)^2 precomputed
         D_k = task['data_size']
         C_k = task['computation_intensity']
-        energy = e_i * (f_i ** 2) * D_k * C_k
+        energy = self.iot_computation_coefficient * D_k * C_k
         return energy
 
     def get_total_energy_consumption(self):
-        total_uav_energy = sum(self.uav_energy_consumption.values())
-        total_iot_energy = sum(self.iot_energy_consumption.values())
-        total_energy = total_uav_energy + total_iot_energy
-        return total_energy
+        return self.total_uav_energy + self.total_propulsion_energy + self.total_iot_energy
+
+    def get_energy_time_series(self):
+        """
+        Per-slot energy as views into the ledger: UAV computation and propulsion per UAV, IoT total.
+        """
+        return {
+            'uav_computation': self.uav_energy_series[:self.slot_count],
+            'uav_propulsion': self.propulsion_energy_series[:self.slot_count],
+            'iot': self.iot_energy_series[:self.slot_count]
+        }
@@ -0,0 +1,170 @@
+# simulation/instrumentation.py
+
+import contextlib
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+
+class Instrumentation:
+    """
+    Per-phase wall-clock and CPU timers and per-slot counters for SimulationManager.run_simulation,
+    with optional cProfile and tracemalloc capture.
+
+    Observers passed to add_hook may implement any of:
+        on_run_start(instrumentation)
+        on_slot_start(slot)
+        on_phase_end(slot, phase, wall, cpu)
+        on_slot_end(slot, record)
+        on_run_end(summary)
+    """
+    def __init__(self, enabled=True, profile=False, trace_memory=False, directory=None):
+        self.enabled = enabled
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.directory = directory
+        self.hooks = []
+        self.slot = None
+        self.slot_records = []  # One dict per slot: '<phase>_wall', '<phase>_cpu' and counters
+        self.phase_totals = {}  # phase -> [wall, cpu]
+        self.counter_totals = {}
+        self.run_wall = 0.0
+        self.run_cpu = 0.0
+        self.profiler = None
+        self.memory = None
+
+    def add_hook(self, observer):
+        self.hooks.append(observer)
+
+    def notify(self, event, *args):
+        for observer in self.hooks:
+            callback = getattr(observer, event, None)
+            if callback:
+                callback(*args)
+
+    def start_run(self):
+        if not self.enabled:
+            return
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._run_start = (time.perf_counter(), time.process_time())
+        self.notify('on_run_start', self)
+
+    def end_run(self):
+        if not self.enabled:
+            return None
+        wall_start, cpu_start = self._run_start
+        self.run_wall = time.perf_counter() - wall_start
+        self.run_cpu = time.process_time() - cpu_start
+        if self.profiler:
+            self.profiler.disable()
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.memory = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_allocations': [
+                    {'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:20]
+                ]
+            }
+        summary = self.summary()
+        self.notify('on_run_end', summary)
+        if self.directory:
+            self.export(self.directory)
+        return summary
+
+    def start_slot(self, slot):
+        if not self.enabled:
+            return
+        self.slot = slot
+        self.slot_records.append({'slot': slot})
+        self.notify('on_slot_start', slot)
+
+    def end_slot(self):
+        if not self.enabled:
+            return
+        self.notify('on_slot_end', self.slot, self.slot_records[-1])
+
+    def phase(self, name):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timed_phase(name)
+
+    @contextlib.contextmanager
+    def _timed_phase(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            totals = self.phase_totals.setdefault(name, [0.0, 0.0])
+            totals[0] += wall
+            totals[1] += cpu
+            record = self.slot_records[-1]
+            record[f'{name}_wall'] = record.get(f'{name}_wall', 0.0) + wall
+            record[f'{name}_cpu'] = record.get(f'{name}_cpu', 0.0) + cpu
+            self.notify('on_phase_end', self.slot, name, wall, cpu)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        self.counter_totals[name] = self.counter_totals.get(name, 0) + value
+        record = self.slot_records[-1]
+        record[name] = record.get(name, 0) + value
+
+    def summary(self):
+        tasks = self.counter_totals.get('tasks_generated', 0)
+        summary = {
+            'slots': len(self.slot_records),
+            'run_wall': self.run_wall,
+            'run_cpu': self.run_cpu,
+            'phases': {
+                name: {
+                    'wall': wall,
+                    'cpu': cpu,
+                    'share': wall / self.run_wall if self.run_wall > 0 else 0
+                }
+                for name, (wall, cpu) in self.phase_totals.items()
+            },
+            'counters': dict(self.counter_totals),
+            'offload_ratio': self.counter_totals.get('tasks_offloaded', 0) / tasks if tasks else 0
+        }
+        if self.memory:
+            summary['memory'] = self.memory
+        return summary
+
+    def export(self, directory):
+        """
+        Write instrumentation.json (summary), slots.csv (per-slot timings and counters) and,
+        when profiling, profile.prof and profile.txt.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'instrumentation.json'), 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+        columns = []
+        for record in self.slot_records:
+            columns.extend(key for key in record if key not in columns)
+        with open(os.path.join(directory, 'slots.csv'), 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+            writer.writeheader()
+            writer.writerows(self.slot_records)
+
+        if self.profiler:
+            self.profiler.dump_stats(os.path.join(directory, 'profile.prof'))
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+            with open(os.path.join(directory, 'profile.txt'), 'w') as f:
+                f.write(stream.getvalue())
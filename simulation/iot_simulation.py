@@ -1,47 +1,137 @@
 # simulation/iot_simulation.py
 
-import random
-from utils.constants import AREA_SIZE
+import collections
+import numpy as np
+from simulation.recorder import history_window
+from simulation.task_batch import TaskBatch
+from simulation.seeding import RandomStreams
+
+def random_walk_step(xy, rng, area_size):
+    # One random walk step, in place, for an (N, 2) array of horizontal positions
+    xy += rng.uniform(-5, 5, size=xy.shape)
+    np.clip(xy, 0, area_size, out=xy)
+
+def draw_tasks(rng, device_count, time_slot):
+    """
+    One Bernoulli draw per device for whether it generates a task this slot, then uniform
+    samples for the devices that did. Returns the task mask and the task fields.
+    """
+    task_mask = rng.random(device_count) < 0.5
+    task_count = int(np.count_nonzero(task_mask))
+    data_size = rng.uniform(0.5, 5.2, task_count)  # in Megabits
+    computation_intensity = rng.uniform(500, 1000, task_count)  # cycles per bit
+    deadline = time_slot + rng.integers(1, 6, task_count)
+    return task_mask, data_size, computation_intensity, deadline
 
 class IoTDevice:
-    def __init__(self, device_id):
+    """
+    Object-style view onto one row of the IoTSimulation state arrays.
+    """
+    def __init__(self, simulation, device_id):
+        self._simulation = simulation
         self.device_id = device_id
-        self.position = (random.uniform(0, AREA_SIZE), random.uniform(0, AREA_SIZE), 0)
-        self.energy_consumed = 0
-        self.position_history = [self.position]  # Record initial position
-        # Additional IoT device attributes
+
+    @property
+    def position(self):
+        return tuple(self._simulation.positions[self.device_id].tolist())
+
+    @position.setter
+    def position(self, value):
+        self._simulation.positions[self.device_id] = value
+
+    @property
+    def energy_consumed(self):
+        return float(self._simulation.energy_consumed[self.device_id])
+
+    @energy_consumed.setter
+    def energy_consumed(self, value):
+        self._simulation.energy_consumed[self.device_id] = value
+
+    @property
+    def position_history(self):
+        return [tuple(positions[self.device_id].tolist()) for positions in self._simulation.position_history]
 
 class IoTSimulation:
-    def __init__(self, config):
+    def __init__(self, config, streams=None):
         self.device_count = config['iot']['device_count']
-        self.devices = [IoTDevice(device_id=i) for i in range(self.device_count)]
+        self.area_size = config['simulation']['area_size']
+
+        # Separate random streams for placement, mobility and task generation
+        streams = streams or RandomStreams.from_config(config)
+        self.mobility_rng = streams.generator('iot_mobility')
+        self.task_rng = streams.generator('tasks')
+
+        # Structure-of-arrays state, one row per device
+        self.positions = np.zeros((self.device_count, 3))
+        self.positions[:, :2] = streams.generator('iot_placement').uniform(0, self.area_size, size=(self.device_count, 2))
+        self.energy_consumed = np.zeros(self.device_count)
+        # Record initial positions; always bounded to the recording window
+        self.position_history = collections.deque([self.positions.copy()], maxlen=history_window(config))
+
+        # Task fields of the most recent time slot
+        self.task_mask = np.zeros(self.device_count, dtype=bool)
+        self.task_data_size = np.zeros(self.device_count)
+        self.task_computation_intensity = np.zeros(self.device_count)
+        self.task_deadline = np.zeros(self.device_count, dtype=np.int64)
+
+        self._devices = None
+
+    @property
+    def devices(self):
+        # Views are built on first access only; the arrays above are the source of truth
+        if self._devices is None:
+            self._devices = [IoTDevice(self, device_id=i) for i in range(self.device_count)]
+        return self._devices
+
+    def state_dict(self):
+        # Copies of the device state, for checkpoints; task fields are regenerated every slot
+        return {
+            'positions': self.positions.copy(),
+            'energy_consumed': self.energy_consumed.copy(),
+            'position_history': np.stack(self.position_history)
+        }
+
+    def load_state_dict(self, state):
+        self.positions[:] = state['positions']
+        self.energy_consumed[:] = state['energy_consumed']
+        self.position_history.clear()
+        self.position_history.extend(state['position_history'])
+
+    def get_positions(self):
+        return [tuple(position) for position in self.positions.tolist()]
 
     def update_positions(self, time_slot):
-        for device in self.devices:
-            # Update positions based on mobility model (e.g., random walk)
-            device.position = self.random_walk(device.position)
-            device.position_history.append(device.position)  # Record the new position
+        # Update positions based on mobility model (random walk), one batched step for all devices
+        random_walk_step(self.positions[:, :2], self.mobility_rng, self.area_size)
+        self.position_history.append(self.positions.copy())  # Record the new positions
 
     def random_walk(self, position):
-        # Simple random walk implementation
-        x, y, z = position
-        x += random.uniform(-5, 5)
-        y += random.uniform(-5, 5)
-        x = max(0, min(x, AREA_SIZE))
-        y = max(0, min(y, AREA_SIZE))
-        return (x, y, z)
+        # Simple random walk implementation for a single position or an (N, 3) array of positions
+        positions = np.array(position, dtype=float)
+        random_walk_step(positions[..., :2], self.mobility_rng, self.area_size)
+        if positions.ndim == 1:
+            return tuple(positions.tolist())
+        return positions
 
     def generate_tasks(self, time_slot):
-        tasks = []
-        for device in self.devices:
-            # Generate tasks based on some probability
-            if random.random() < 0.5:
-                task = {
-                    'device_id': device.device_id,
-                    'position': device.position,
-                    'data_size': random.uniform(0.5, 5.2),  # in Megabits
-                    'computation_intensity': random.uniform(500, 1000),  # cycles per bit
-                    'deadline': time_slot + random.randint(1, 5)
-                }
-                tasks.append(task)
-        return tasks
+        # Generate tasks based on some probability, drawn for all devices at once
+        self.task_mask, data_size, computation_intensity, deadline = draw_tasks(self.task_rng, self.device_count, time_slot)
+        task_ids = np.flatnonzero(self.task_mask)
+        self.task_data_size[:] = 0
+        self.task_computation_intensity[:] = 0
+        self.task_deadline[:] = 0
+        self.task_data_size[task_ids] = data_size
+        self.task_computation_intensity[task_ids] = computation_intensity
+        self.task_deadline[task_ids] = deadline
+        return self.get_tasks()
+
+    def get_tasks(self):
+        """
+        Tasks of the current time slot as a TaskBatch.
+        """
+        task_ids = np.flatnonzero(self.task_mask)
+        return TaskBatch(task_ids,
+                         self.positions[task_ids],
+                         self.task_data_size[task_ids],
+                         self.task_computation_intensity[task_ids],
+                         self.task_deadline[task_ids])
@@ -0,0 +1,310 @@
+# simulation/metrics.py
+
+import math
+from statistics import NormalDist
+import numpy as np
+
+def t_quantile(probability, degrees_of_freedom):
+    """
+    Student t quantile from the normal one, by the Cornish-Fisher expansion; within about
+    1% for 3 or more degrees of freedom and much closer from 10 on.
+    """
+    z = NormalDist().inv_cdf(probability)
+    v = degrees_of_freedom
+    return (z + (z**3 + z) / (4 * v)
+            + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3)
+            + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * v**4))
+
+def confidence_interval(values, confidence=0.95):
+    """
+    Mean of independent samples and the half width of its t confidence interval.
+    """
+    values = np.asarray(values, dtype=float)
+    mean = float(values.mean()) if len(values) else math.nan
+    if len(values) < 2:
+        return mean, math.nan
+    standard_error = values.std(ddof=1) / math.sqrt(len(values))
+    return mean, float(t_quantile(0.5 + confidence / 2, len(values) - 1) * standard_error)
+
+class RunningStats:
+    """
+    Count, sum, mean and variance (Welford, merged batch-wise with Chan's update), min and max.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        batch_mean = values.mean()
+        self.combine(len(values), float(values.sum()), float(batch_mean), float(((values - batch_mean) ** 2).sum()),
+                     float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        if other.count:
+            self.combine(other.count, other.total, other.mean, other.m2, other.min, other.max)
+
+    def combine(self, count, total, mean, m2, minimum, maximum):
+        combined = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / combined
+        self.m2 += m2 + delta * delta * self.count * count / combined
+        self.count = combined
+        self.total += total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    def state_dict(self):
+        return {'values': np.array([self.count, self.total, self.mean, self.m2, self.min, self.max])}
+
+    def load_state_dict(self, state):
+        count, self.total, self.mean, self.m2, self.min, self.max = state['values'].tolist()
+        self.count = int(count)
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with logarithmic buckets, so every quantile is within
+    `relative_accuracy` of the true value. Memory grows with the log of the value range,
+    not with the number of values, and batches are bucketed in one numpy pass.
+    """
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}  # bucket index -> count
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.zero_count += int(np.count_nonzero(values == 0))
+        for store, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if len(magnitudes):
+                buckets, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64), return_counts=True)
+                for bucket, count in zip(buckets.tolist(), counts.tolist()):
+                    store[bucket] = store.get(bucket, 0) + count
+
+    def merge(self, other):
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, count in other_store.items():
+                store[bucket] = store.get(bucket, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def bucket_value(self, bucket):
+        # Midpoint of the bucket (gamma^(i-1), gamma^i], relative to its bounds
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return -self.bucket_value(bucket)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return self.bucket_value(bucket)
+        return self.bucket_value(max(self.positive))
+
+    def state_dict(self):
+        state = {'counts': np.array([self.count, self.zero_count], dtype=np.int64)}
+        for name, store in (('positive', self.positive), ('negative', self.negative)):
+            state[f'{name}_buckets'] = np.array(list(store), dtype=np.int64)
+            state[f'{name}_counts'] = np.array(list(store.values()), dtype=np.int64)
+        return state
+
+    def load_state_dict(self, state):
+        self.count, self.zero_count = state['counts'].tolist()
+        self.positive = dict(zip(state['positive_buckets'].tolist(), state['positive_counts'].tolist()))
+        self.negative = dict(zip(state['negative_buckets'].tolist(), state['negative_counts'].tolist()))
+
+class Distribution:
+    """
+    RunningStats plus a QuantileSketch over the same values.
+    """
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, relative_accuracy=0.01):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, values):
+        self.stats.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def summary(self):
+        summary = self.stats.summary()
+        for q in self.QUANTILES:
+            summary[f'p{round(q * 100)}'] = self.sketch.quantile(q)
+        return summary
+
+    def state_dict(self):
+        state = {f'stats/{name}': value for name, value in self.stats.state_dict().items()}
+        state.update({f'sketch/{name}': value for name, value in self.sketch.state_dict().items()})
+        return state
+
+    def load_state_dict(self, state):
+        self.stats.load_state_dict({name[len('stats/'):]: value for name, value in state.items() if name.startswith('stats/')})
+        self.sketch.load_state_dict({name[len('sketch/'):]: value for name, value in state.items() if name.startswith('sketch/')})
+
+class SlotSeries:
+    """
+    Per-slot sums of a few fields in at most `capacity` rows. When the rows run out,
+    neighbouring rows are added together and each row covers twice as many slots as before.
+    """
+    def __init__(self, fields, capacity=1024):
+        self.fields = list(fields)
+        self.capacity = max(2, capacity - capacity % 2)  # Even, so rows always pair up
+        self.values = np.zeros((self.capacity, len(self.fields)))
+        self.rows = 0
+        self.slots_per_row = 1
+        self.slot_count = 0
+
+    def append(self, values):
+        if self.slot_count % self.slots_per_row == 0:
+            if self.rows == self.capacity:
+                self.values[:self.capacity // 2] = self.values[0::2] + self.values[1::2]
+                self.values[self.capacity // 2:] = 0
+                self.rows = self.capacity // 2
+                self.slots_per_row *= 2
+            self.rows += 1
+        self.values[self.rows - 1] += values
+        self.slot_count += 1
+
+    def arrays(self):
+        """
+        {'slot': first slot of each row, <field>: per-row sums}.
+        """
+        series = {'slot': np.arange(self.rows) * self.slots_per_row}
+        for index, field in enumerate(self.fields):
+            series[field] = self.values[:self.rows, index].copy()
+        return series
+
+    def state_dict(self):
+        return {
+            'values': self.values[:self.rows].copy(),
+            'counters': np.array([self.slots_per_row, self.slot_count], dtype=np.int64)
+        }
+
+    def load_state_dict(self, state):
+        self.rows = len(state['values'])
+        self.values[:] = 0
+        self.values[:self.rows] = state['values']
+        self.slots_per_row, self.slot_count = state['counters'].tolist()
+
+class MetricsAggregator:
+    """
+    Streaming run metrics at bounded memory: distributions of data volume and energy
+    efficiency over tasks, of the offload ratio over slots and of the tasks per UAV
+    per slot, plus per-slot series. Summaries read running totals and never revisit tasks.
+    """
+    TASK_METRICS = ('data_volume', 'energy_efficiency')
+    SLOT_METRICS = ('offload_ratio', 'uav_load')
+    SERIES_FIELDS = ('tasks', 'offloaded', 'data_volume')
+
+    def __init__(self, uav_count, series_capacity=1024, relative_accuracy=0.01):
+        self.uav_count = uav_count
+        self.distributions = {name: Distribution(relative_accuracy) for name in self.TASK_METRICS + self.SLOT_METRICS}
+        self.series = SlotSeries(self.SERIES_FIELDS, series_capacity)
+        self.reset_slot()
+
+    def reset_slot(self):
+        self.slot_tasks = 0
+        self.slot_offloaded = 0
+        self.slot_data_volume = 0.0
+        self.slot_uav_tasks = np.zeros(self.uav_count, dtype=np.int64)
+
+    def record_tasks(self, data_size, energy_efficiency, offloaded, uav_id):
+        """
+        Add a batch of decided tasks; uav_id is ignored where offloaded is False.
+        """
+        data_size = np.asarray(data_size, dtype=float)
+        offloaded = np.asarray(offloaded, dtype=bool)
+        self.distributions['data_volume'].update(data_size)
+        self.distributions['energy_efficiency'].update(energy_efficiency)
+        self.slot_tasks += len(data_size)
+        self.slot_offloaded += int(offloaded.sum())
+        self.slot_data_volume += float(data_size.sum())
+        self.slot_uav_tasks += np.bincount(np.asarray(uav_id, dtype=np.int64)[offloaded], minlength=self.uav_count)
+
+    def take_slot(self):
+        # The current slot's counts, handed over and reset; sharded workers report these
+        slot = (self.slot_tasks, self.slot_offloaded, self.slot_uav_tasks, self.slot_data_volume)
+        self.reset_slot()
+        return slot
+
+    def end_slot(self):
+        self.record_slot(*self.take_slot())
+
+    def record_slot(self, tasks, offloaded, uav_tasks, data_volume):
+        if tasks:
+            self.distributions['offload_ratio'].update([offloaded / tasks])
+        self.distributions['uav_load'].update(uav_tasks)
+        self.series.append([tasks, offloaded, data_volume])
+
+    def merge_tasks(self, other):
+        # Per-task distributions of another aggregator, e.g. from a shard worker
+        for name in self.TASK_METRICS:
+            self.distributions[name].merge(other.distributions[name])
+
+    @property
+    def data_volume(self):
+        # Total data volume of all recorded tasks, in O(1)
+        return self.distributions['data_volume'].stats.total
+
+    def summary(self):
+        return {name: distribution.summary() for name, distribution in self.distributions.items()}
+
+    def state_dict(self):
+        state = {}
+        for name, distribution in self.distributions.items():
+            state.update({f'{name}/{key}': value for key, value in distribution.state_dict().items()})
+        state.update({f'series/{key}': value for key, value in self.series.state_dict().items()})
+        return state
+
+    def load_state_dict(self, state):
+        for name, distribution in self.distributions.items():
+            distribution.load_state_dict({key[len(name) + 1:]: value for key, value in state.items() if key.startswith(name + '/')})
+        self.series.load_state_dict({key[len('series/'):]: value for key, value in state.items() if key.startswith('series/')})
+        self.reset_slot()
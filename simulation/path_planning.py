@@ -1,17 +1,101 @@
 # simulation/path_planning.py
 
 import math
-import random
+import numpy as np
+from simulation.seeding import RandomStreams
+
+def linear_assignment(cost):
+    """
+    Column for every row of an (n, m) cost matrix, minimizing the total cost; every row gets
+    a distinct column when n <= m, every column a distinct row otherwise (then -1 marks rows
+    left out). Hungarian algorithm with shortest augmenting paths, O(n^2 m), inner steps
+    vectorized over the columns.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.shape[0] > cost.shape[1]:
+        columns = linear_assignment(cost.T)
+        rows = np.full(cost.shape[0], -1, dtype=np.int64)
+        rows[columns] = np.arange(cost.shape[1])
+        return rows
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    row_of = np.zeros(m + 1, dtype=np.int64)  # 1-based row matched to each column, 0 for none
+    way = np.zeros(m + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        row_of[0] = row
+        column = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[column] = True
+            free = ~used[1:]
+            slack = cost[row_of[column] - 1] - u[row_of[column]] - v[1:]
+            improved = free & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            way[1:][improved] = column
+            free_slack = np.where(free, min_slack[1:], np.inf)
+            next_column = int(np.argmin(free_slack)) + 1
+            delta = free_slack[next_column - 1]
+            used_columns = np.flatnonzero(used)
+            u[row_of[used_columns]] += delta
+            v[used_columns] -= delta
+            min_slack[1:][free] -= delta
+            column = next_column
+            if row_of[column] == 0:
+                break
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            row_of[column] = row_of[previous]
+            column = previous
+    columns = np.full(n, -1, dtype=np.int64)
+    matched = np.flatnonzero(row_of[1:])
+    columns[row_of[matched + 1] - 1] = matched
+    return columns
 
 class PathPlanning:
-    def __init__(self, config):
+    def __init__(self, config, streams=None):
         self.config = config
+        self.rng = (streams or RandomStreams.from_config(config)).generator('path_planning')
+        planning_config = config.get('path_planning', {})
+        # 'best': every UAV heads for the most efficient device; 'distinct': each UAV gets its own target;
+        # 'cluster': each UAV heads for the centroid of its own efficiency-weighted cluster of devices
+        self.mode = planning_config.get('mode', 'best')
+        self.top_k = planning_config.get('top_k', 10)
+        self.cluster_sample = planning_config.get('cluster_sample', 4096)
+        self.cluster_iterations = planning_config.get('cluster_iterations', 3)
+        self.centroids = None  # (K, 2) cluster centroids of the previous slot, the next slot's warm start
+
+    def state_dict(self):
+        # The warm start, for checkpoints
+        return {'centroids': np.empty((0, 2)) if self.centroids is None else self.centroids.copy()}
+
+    def load_state_dict(self, state):
+        self.centroids = state['centroids'].copy() if len(state['centroids']) else None
+
+    def plan(self, uavs, time_slot, iot_positions, iot_energy_efficiency):
+        """
+        Next position of every UAV.
+        """
+        if self.mode == 'cluster' and hasattr(iot_energy_efficiency, 'top_k') and len(iot_positions):
+            return self.plan_clusters(np.array([uav.position for uav in uavs], dtype=float).reshape(-1, 3),
+                                      iot_positions, iot_energy_efficiency)
+        if self.mode == 'distinct' and hasattr(iot_energy_efficiency, 'top_k') and len(iot_positions):
+            uav_positions = [uav.position for uav in uavs]
+            targets = self.assign_targets(uav_positions, iot_positions, iot_energy_efficiency)
+            return [self.move_towards(position, target) for position, target in zip(uav_positions, targets)]
+        if len(iot_positions) == 0:
+            # No IoT devices; every UAV heads for a random position, drawn in one batch
+            targets = self.get_random_positions(len(uavs))
+            return [self.move_towards(uav.position, target) for uav, target in zip(uavs, targets)]
+        return [self.calculate_next_position(uav, time_slot, iot_positions, iot_energy_efficiency) for uav in uavs]
 
     def calculate_next_position(self, uav, time_slot, iot_positions, iot_energy_efficiency):
         """
         Move the UAV towards the IoT device with the highest energy efficiency.
         """
-        if not iot_positions:
+        if len(iot_positions) == 0:
             # No IoT devices have tasks; stay in place or move randomly
             target_position = self.get_random_position()
         else:
@@ -23,6 +107,19 @@ class PathPlanning:
         return new_position
 
     def find_best_iot(self, current_position, iot_positions, iot_energy_efficiency):
+        if hasattr(iot_energy_efficiency, 'top_k'):
+            # EfficiencyTracker selects the best devices without ranking them all
+            best = iot_energy_efficiency.top_k(1)
+            if len(best) == 0:
+                return current_position
+            return tuple(iot_positions[best[0]])
+
+        if isinstance(iot_energy_efficiency, np.ndarray):
+            # Dense efficiency indexed by device_id, NaN for devices without a task yet
+            if np.isnan(iot_energy_efficiency).all():
+                return current_position
+            return iot_positions[int(np.nanargmax(iot_energy_efficiency))]
+
         max_efficiency = -float('inf')
         best_position = current_position
         best_device_id = None
@@ -32,11 +129,115 @@ class PathPlanning:
                 best_position = pos
         return best_position
 
+    def assign_targets(self, uav_positions, iot_positions, iot_energy_efficiency):
+        """
+        Give each UAV a different target among the top-k devices, pairing the closest
+        UAV-device pairs first. UAVs left without a candidate keep their position.
+        """
+        candidates = iot_energy_efficiency.top_k(max(self.top_k, len(uav_positions)))
+        targets = list(uav_positions)
+        if len(candidates) == 0 or len(uav_positions) == 0:
+            return targets
+        candidate_positions = np.asarray(iot_positions)[candidates]
+        distances = np.linalg.norm(np.asarray(uav_positions)[:, None, :] - candidate_positions[None, :, :], axis=2)
+
+        assigned_uavs = set()
+        taken = set()
+        for flat_index in np.argsort(distances, axis=None, kind='stable').tolist():
+            uav_index, candidate_index = divmod(flat_index, len(candidates))
+            if uav_index in assigned_uavs or candidate_index in taken:
+                continue
+            targets[uav_index] = tuple(candidate_positions[candidate_index])
+            assigned_uavs.add(uav_index)
+            taken.add(candidate_index)
+            if len(assigned_uavs) == len(uav_positions):
+                break
+        return targets
+
+    def plan_clusters(self, uav_positions, iot_positions, iot_energy_efficiency):
+        """
+        Cluster the cluster_sample most efficient devices into one cluster per UAV with
+        efficiency-weighted k-means, warm-started from the previous slot's centroids, then
+        send the UAVs to the centroids by a linear assignment that minimizes the total
+        distance flown. Moves are capped by max_speed as in move_towards, and UAVs keep
+        their flying height. Returns a (K, 3) array.
+
+        The UAVs move before the slot's tasks are generated (see run_simulation), so there
+        are no pending task positions to cluster yet. The devices stand in for them, at their
+        current positions and weighted by the efficiency of their latest task, rather than by
+        a data size that is only drawn after the move.
+        """
+        uav_count = len(uav_positions)
+        device_ids = iot_energy_efficiency.top_k(self.cluster_sample)
+        if uav_count == 0 or len(device_ids) == 0:
+            return uav_positions.copy()
+        points = np.asarray(iot_positions, dtype=float)[device_ids, :2]
+        weights = np.maximum(np.asarray(iot_energy_efficiency.top_k_values(self.cluster_sample), dtype=float), 0)
+        if weights.max() > 0:
+            weights /= weights.max()
+        else:
+            weights[:] = 1
+
+        centroids = self.centroids
+        if centroids is None or len(centroids) != uav_count:
+            centroids = self.initial_centroids(points, weights, uav_count)
+        centroids = self.weighted_kmeans(points, weights, centroids)
+        self.centroids = centroids
+
+        # Euclidean distance from every UAV to every centroid, at flying height
+        distances = np.sqrt(((uav_positions[:, None, :2] - centroids[None, :, :]) ** 2).sum(axis=2))
+        assignment = linear_assignment(distances)
+        targets = np.empty_like(uav_positions)
+        targets[:, :2] = centroids[assignment]
+        targets[:, 2] = self.config['uav']['flying_height']
+        return self.move_towards_batch(uav_positions, targets)
+
+    def initial_centroids(self, points, weights, count):
+        # Weighted k-means++ seeding: each next centroid is drawn with probability weight * squared distance
+        centroids = np.empty((count, 2))
+        centroids[0] = points[self.rng.choice(len(points), p=weights / weights.sum())]
+        closest = ((points - centroids[0]) ** 2).sum(axis=1)
+        for index in range(1, count):
+            scores = weights * closest
+            total = scores.sum()
+            if total > 0:
+                choice = self.rng.choice(len(points), p=scores / total)
+            else:
+                # Fewer distinct points than UAVs; the rest start on top of the heaviest point
+                choice = int(np.argmax(weights))
+            centroids[index] = points[choice]
+            np.minimum(closest, ((points - centroids[index]) ** 2).sum(axis=1), out=closest)
+        return centroids
+
+    def weighted_kmeans(self, points, weights, centroids):
+        """
+        Up to cluster_iterations Lloyd steps with weighted means; an empty cluster keeps
+        its previous centroid. Each step is O(points * clusters), vectorized over both.
+        """
+        centroids = centroids.copy()
+        count = len(centroids)
+        for _ in range(self.cluster_iterations):
+            # Nearest centroid by |c|^2 - 2 p.c, the squared distance less the per-point |p|^2
+            labels = np.argmin((centroids ** 2).sum(axis=1) - 2 * (points @ centroids.T), axis=1)
+            mass = np.bincount(labels, weights=weights, minlength=count)
+            sums = np.stack([np.bincount(labels, weights=weights * points[:, axis], minlength=count) for axis in (0, 1)], axis=1)
+            has_mass = mass > 0
+            updated = centroids.copy()
+            updated[has_mass] = sums[has_mass] / mass[has_mass, None]
+            converged = np.allclose(updated, centroids)
+            centroids = updated
+            if converged:
+                break
+        return centroids
+
     def get_random_position(self):
-        x = random.uniform(0, self.config['simulation']['area_size'])
-        y = random.uniform(0, self.config['simulation']['area_size'])
+        return self.get_random_positions(1)[0]
+
+    def get_random_positions(self, count):
+        # Random positions at flying height, as a list of (x, y, z) tuples
+        xy = self.rng.uniform(0, self.config['simulation']['area_size'], size=(count, 2))
         z = self.config['uav']['flying_height']
-        return (x, y, z)
+        return [(x, y, z) for x, y in xy.tolist()]
 
     def move_towards(self, current_position, target_position):
         x1, y1, z1 = current_position
@@ -55,6 +256,17 @@ class PathPlanning:
         new_z = z1 + dz * scale
         return (new_x, new_y, new_z)
 
+    def move_towards_batch(self, positions, targets):
+        """
+        move_towards over arrays of (..., 3) positions and targets, with the same arithmetic.
+        """
+        delta = targets - positions
+        distance = np.sqrt(delta[..., 0]**2 + delta[..., 1]**2 + delta[..., 2]**2)
+        scale = np.ones_like(distance)
+        np.divide(self.config['uav']['max_speed'], distance, out=scale, where=distance > 0)
+        np.minimum(scale, 1, out=scale)
+        return np.where(distance[..., None] > 0, positions + delta * scale[..., None], positions)
+
     def calculate_distance(self, pos1, pos2):
         """
         Calculate Euclidean distance between two 3D points.
@@ -0,0 +1,49 @@
+# simulation/plots.py
+
+import os
+
+# matplotlib is imported inside the functions, so importing this module stays cheap
+
+PLOT_DIRECTORY = 'results/plots'
+
+def plot_confidence_band(plt, x, values, half_widths, color=None):
+    # Shaded mean +/- half width, skipped when the points ran a single replica
+    if half_widths and all(half_width is not None for half_width in half_widths):
+        low = [value - half_width for value, half_width in zip(values, half_widths)]
+        high = [value + half_width for value, half_width in zip(values, half_widths)]
+        plt.fill_between(x, low, high, color=color, alpha=0.2, label='Confidence interval')
+
+def plot_metric(plt, x, values, half_widths, title, ylabel, path, color=None):
+    plt.figure(figsize=(10, 6))
+    plt.plot(x, values, marker='o', color=color, label=title.split(' vs ')[0])
+    plot_confidence_band(plt, x, values, half_widths, color=color)
+    plt.title(title)
+    plt.xlabel('Number of IoT Devices')
+    plt.ylabel(ylabel)
+    plt.grid(True)
+    plt.legend()
+    plt.savefig(path)
+
+def plot_results(num_iot_devices_list, energy_efficiency_list, energy_consumption_list, system_utility_list,
+                 confidence_bands=None, directory=PLOT_DIRECTORY, show=False):
+    """
+    Save the energy efficiency, energy consumption and system utility plots under
+    `directory`. The figures are closed afterwards unless `show` is set, in which case
+    they are shown together in one blocking call at the end.
+    """
+    import matplotlib.pyplot as plt
+
+    confidence_bands = confidence_bands or {}
+    os.makedirs(directory, exist_ok=True)
+    plot_metric(plt, num_iot_devices_list, energy_efficiency_list, confidence_bands.get('energy_efficiency'),
+                'Energy Efficiency vs Number of IoT Devices', 'Energy Efficiency (Megabits/Joule)',
+                os.path.join(directory, 'energy_efficiency.png'))
+    plot_metric(plt, num_iot_devices_list, energy_consumption_list, confidence_bands.get('energy_consumption'),
+                'Energy Consumption vs Number of IoT Devices', 'Total Energy Consumption (Joules)',
+                os.path.join(directory, 'energy_consumption.png'), color='r')
+    plot_metric(plt, num_iot_devices_list, system_utility_list, confidence_bands.get('system_utility'),
+                'System Utility vs Number of IoT Devices', 'System Utility (Megabits Processed)',
+                os.path.join(directory, 'system_utility.png'), color='g')
+    if show:
+        plt.show()
+    plt.close('all')
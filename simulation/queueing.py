@@ -0,0 +1,186 @@
+# simulation/queueing.py
+
+import heapq
+import numpy as np
+from simulation.config import as_config
+from utils.constants import BITS_PER_MEGABIT
+
+class QueueingEngine:
+    """
+    Time-slotted CPU queues for every UAV and every IoT device. Each server runs
+    `cpu_frequency` cycles per second and serves the ready task with the earliest deadline,
+    preempting it when a task with an earlier deadline becomes ready. A task is dropped as
+    soon as it can no longer finish by its deadline. Offloaded tasks become ready once they
+    have been transmitted; until then they wait in the server's pending heap, keyed by
+    ready time, and the CPU serves whatever else is ready.
+
+    Servers 0..K-1 are the UAVs and K..K+N-1 the devices, for locally executed tasks.
+    Queue entries are [deadline, sequence, remaining cycles, arrival, ready, data size]
+    lists in one ready heap per server; the sequence number breaks deadline ties in
+    arrival order. Pending heaps hold (ready, sequence, entry) tuples.
+    """
+    def __init__(self, config):
+        config = as_config(config)
+        self.uav_count = config['uav']['count']
+        self.device_count = config['iot']['device_count']
+        self.slot_duration = config['simulation']['slot_duration']
+        self.uav_frequency = config['uav']['energy']['cpu_frequency']
+        self.iot_frequency = config['iot']['energy']['cpu_frequency']
+        self.queues = {}  # server -> heap of ready tasks; only servers with such tasks have one
+        self.pending = {}  # server -> heap of tasks still being transmitted
+        self.sequence = 0
+
+        # Run totals
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.completed_data_volume = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def frequency(self, server):
+        return self.uav_frequency if server < self.uav_count else self.iot_frequency
+
+    def submit(self, decisions, time_slot):
+        """
+        Queue one slot's tasks: an OffloadingBatch, or the decision dicts of the loop path.
+        """
+        if hasattr(decisions, 'offloaded'):
+            tasks = decisions.tasks
+            device_id = decisions.device_id
+            uav_id = decisions.uav_id
+            offloaded = decisions.offloaded
+            data_size = tasks['data_size']
+            computation_intensity = tasks['computation_intensity']
+            deadline = tasks['deadline']
+            data_rate = decisions.data_rate
+        else:
+            device_id = np.array([decision['device_id'] for decision in decisions], dtype=np.int64)
+            uav_id = np.array([decision['uav_id'] if decision['offloaded'] else -1 for decision in decisions], dtype=np.int64)
+            offloaded = uav_id >= 0
+            data_size = np.array([decision['task']['data_size'] for decision in decisions], dtype=float)
+            computation_intensity = np.array([decision['task']['computation_intensity'] for decision in decisions], dtype=float)
+            deadline = np.array([decision['task']['deadline'] for decision in decisions], dtype=float)
+            data_rate = np.array([decision.get('data_rate') or np.nan for decision in decisions], dtype=float)
+
+        arrival = time_slot * self.slot_duration
+        bits = data_size * BITS_PER_MEGABIT
+        server = np.where(offloaded, uav_id, self.uav_count + device_id)
+        cycles = bits * computation_intensity
+        # Offloaded tasks can start once they have been transmitted
+        ready = arrival + np.where(offloaded, bits / np.where(offloaded, data_rate, 1), 0)
+        deadline_time = deadline * self.slot_duration
+
+        entries = zip(deadline_time.tolist(), range(self.sequence, self.sequence + len(server)),
+                      cycles.tolist(), ready.tolist(), data_size.tolist())
+        for task_server, (task_deadline, sequence, task_cycles, task_ready, task_data_size) in zip(server.tolist(), entries):
+            self.push_pending(task_server, [task_deadline, sequence, task_cycles, arrival, task_ready, task_data_size])
+        self.sequence += len(server)
+        self.submitted += len(server)
+
+    def process(self, time_slot):
+        """
+        Serve every non-empty queue for one slot. Returns the slot's
+        {'completed', 'dropped', 'completed_data_volume', 'latency'} totals.
+        """
+        slot_start = time_slot * self.slot_duration
+        slot_end = slot_start + self.slot_duration
+        completed = 0
+        dropped = 0
+        data_volume = 0.0
+        latency = 0.0
+        for server in sorted(self.queues.keys() | self.pending.keys()):
+            queue = self.queues.setdefault(server, [])
+            pending = self.pending.get(server, [])
+            frequency = self.frequency(server)
+            now = slot_start
+            while now < slot_end:
+                # Everything transmitted by now competes for the CPU
+                while pending and pending[0][0] <= now:
+                    heapq.heappush(queue, heapq.heappop(pending)[2])
+                next_ready = pending[0][0] if pending else float('inf')
+                if not queue:
+                    # Idle until the next task is transmitted, if that happens within the slot
+                    if next_ready >= slot_end:
+                        break
+                    now = next_ready
+                    continue
+                entry = queue[0]
+                deadline_time, _, remaining, arrival, _, data_size = entry
+                finish = now + remaining / frequency
+                if finish > deadline_time:
+                    # Cannot make its deadline any more, even if served right away
+                    heapq.heappop(queue)
+                    dropped += 1
+                elif finish <= min(next_ready, slot_end):
+                    heapq.heappop(queue)
+                    now = finish
+                    completed += 1
+                    data_volume += data_size
+                    latency += finish - arrival
+                    self.max_latency = max(self.max_latency, finish - arrival)
+                else:
+                    # Runs until the next task becomes ready or the slot ends, then EDF picks again
+                    until = min(next_ready, slot_end)
+                    entry[2] = remaining - (until - now) * frequency
+                    now = until
+            if not queue:
+                del self.queues[server]
+            if not pending:
+                self.pending.pop(server, None)
+
+        self.completed += completed
+        self.dropped += dropped
+        self.completed_data_volume += data_volume
+        self.total_latency += latency
+        return {'completed': completed, 'dropped': dropped, 'completed_data_volume': data_volume, 'latency': latency}
+
+    def push_pending(self, server, entry):
+        pending = self.pending.get(server)
+        if pending is None:
+            pending = self.pending[server] = []
+        heapq.heappush(pending, (entry[4], entry[1], entry))
+
+    def queued(self):
+        return sum(len(queue) for queue in self.queues.values()) + sum(len(pending) for pending in self.pending.values())
+
+    def mean_latency(self):
+        return self.total_latency / self.completed if self.completed else 0.0
+
+    def summary(self):
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'dropped': self.dropped,
+            'queued': self.queued(),
+            'completed_data_volume': self.completed_data_volume,
+            'mean_latency': self.mean_latency(),
+            'max_latency': self.max_latency,
+            'drop_ratio': self.dropped / self.submitted if self.submitted else 0.0
+        }
+
+    def state_dict(self):
+        # Queued entries, ready and pending alike, as flat arrays for checkpoints
+        servers = sorted(self.queues.keys() | self.pending.keys())
+        per_server = [self.queues.get(server, []) + [item[2] for item in self.pending.get(server, [])] for server in servers]
+        entries = [entry for server_entries in per_server for entry in server_entries]
+        columns = np.array(entries, dtype=float).reshape(-1, 6)
+        return {
+            'server': np.repeat(np.array(servers, dtype=np.int64), [len(server_entries) for server_entries in per_server]),
+            'entries': columns,
+            'sequence': np.array(self.sequence),
+            'totals': np.array([self.submitted, self.completed, self.dropped], dtype=np.int64),
+            'float_totals': np.array([self.completed_data_volume, self.total_latency, self.max_latency])
+        }
+
+    def load_state_dict(self, state):
+        # Checkpoints are taken between slots, when every entry ready by the next slot start
+        # is still movable, so all of them can go back to the pending heaps
+        self.queues = {}
+        self.pending = {}
+        for server, entry in zip(state['server'].tolist(), state['entries'].tolist()):
+            entry[1] = int(entry[1])
+            self.push_pending(server, entry)
+        self.sequence = int(state['sequence'])
+        self.submitted, self.completed, self.dropped = state['totals'].tolist()
+        self.completed_data_volume, self.total_latency, self.max_latency = state['float_totals'].tolist()
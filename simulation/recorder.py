@@ -0,0 +1,257 @@
+# simulation/recorder.py
+
+import collections
+import glob
+import json
+import os
+import numpy as np
+
+MANIFEST_FILE = 'manifest.json'
+
+DEFAULT_WINDOW = 10  # Slots kept in memory when recording.window is not set
+
+def history_window(config):
+    """
+    Number of slots of position history that the simulations keep in memory, always
+    bounded; the full trajectories are the recorder's.
+    """
+    return config.get('recording', {}).get('window') or DEFAULT_WINDOW
+
+class TrajectoryRecorder:
+    """
+    Streams per-slot simulation state to chunked, compressed .npz files, one array per
+    field with a leading slot axis, and keeps the most recent `window` slots in memory.
+    Fields listed in `ragged` may change length between slots; they are stored
+    concatenated along with `<field>_offsets`. Without a directory everything stays in memory.
+    Chunks left in `directory` by a previous run are removed unless `clear` is False.
+    """
+    def __init__(self, directory=None, chunk_size=50, window=DEFAULT_WINDOW, compress=True, ragged=(), clear=True):
+        self.directory = directory
+        self.ragged = list(ragged)
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.slot_count = 0
+        self.written_count = 0
+        self.chunk_count = 0
+        self.fields = None
+        self.pending = []  # Slots not yet written to disk
+        self.recent = collections.deque(maxlen=window if directory else None)
+        self._reader = None
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            if clear:
+                # Clear chunks left over from a previous run
+                self.remove_chunks(0)
+
+    def remove_chunks(self, start):
+        for path in glob.glob(os.path.join(self.directory, 'chunk_*.npz')):
+            if int(os.path.basename(path)[len('chunk_'):-len('.npz')]) >= start:
+                os.remove(path)
+
+    def record(self, **fields):
+        slot = {name: np.array(value, copy=True) for name, value in fields.items()}
+        if self.fields is None:
+            self.fields = list(slot)
+        self.recent.append(slot)
+        self.slot_count += 1
+        if self.directory:
+            self.pending.append(slot)
+            if len(self.pending) == self.chunk_size:
+                self.write_chunk()
+
+    def write_chunk(self):
+        arrays = {}
+        for name in self.fields:
+            values = [slot[name] for slot in self.pending]
+            if name in self.ragged:
+                arrays[name] = np.concatenate(values)
+                arrays[name + '_offsets'] = np.cumsum([0] + [len(value) for value in values])
+            else:
+                arrays[name] = np.stack(values)
+        path = os.path.join(self.directory, f'chunk_{self.chunk_count:05d}.npz')
+        if self.compress:
+            np.savez_compressed(path, **arrays)
+        else:
+            np.savez(path, **arrays)
+        self.chunk_count += 1
+        self.written_count += len(self.pending)
+        self.pending = []
+        self.write_manifest()
+
+    def write_manifest(self):
+        manifest = {
+            'chunk_size': self.chunk_size,
+            'chunk_count': self.chunk_count,
+            'slot_count': self.written_count,
+            'fields': self.fields,
+            'ragged': self.ragged
+        }
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f)
+        self._reader = None  # Pick up the new chunk on the next read
+
+    def state_dict(self):
+        """
+        Counters plus every slot not yet on disk or still in the recent window, for checkpoints.
+        Slot arrays are never modified after recording, so they are not copied. When the
+        checkpoint interval is a multiple of the chunk size, nothing is pending.
+        """
+        recent_start = self.slot_count - len(self.recent)
+        first_slot = min(self.written_count, recent_start)
+        # Pending slots older than the window, then the window itself
+        slots = self.pending[:recent_start - first_slot] + list(self.recent)
+        state = {
+            'slot_count': np.array(self.slot_count),
+            'written_count': np.array(self.written_count),
+            'chunk_count': np.array(self.chunk_count),
+            'fields': np.array(self.fields or [], dtype=str)
+        }
+        for offset, slot in enumerate(slots):
+            for name, value in slot.items():
+                state[f'slot/{first_slot + offset}/{name}'] = value
+        return state
+
+    def load_state_dict(self, state):
+        self.slot_count = int(state['slot_count'])
+        self.written_count = int(state['written_count'])
+        self.chunk_count = int(state['chunk_count'])
+        self.fields = state['fields'].tolist() or None
+        slots = {}
+        for key, value in state.items():
+            if key.startswith('slot/'):
+                _, index, name = key.split('/', 2)
+                slots.setdefault(int(index), {})[name] = value
+        ordered = [slots[index] for index in sorted(slots)]
+        first_slot = self.slot_count - len(ordered)
+        self.recent.clear()
+        self.recent.extend(ordered)
+        self.pending = ordered[self.written_count - first_slot:] if self.directory else []
+        if self.directory:
+            # Drop chunks written after the checkpoint was taken
+            self.remove_chunks(self.chunk_count)
+            if self.chunk_count:
+                self.write_manifest()
+            elif os.path.exists(os.path.join(self.directory, MANIFEST_FILE)):
+                os.remove(os.path.join(self.directory, MANIFEST_FILE))
+        self._reader = None
+
+    def close(self):
+        if self.directory and self.pending:
+            self.write_chunk()
+
+    def __len__(self):
+        return self.slot_count
+
+    def get(self, slot, name):
+        if slot < 0:
+            slot += self.slot_count
+        if not 0 <= slot < self.slot_count:
+            raise IndexError(f'slot {slot} out of range')
+        # Slots still in memory are served directly, older ones are read back from disk
+        recent_start = self.slot_count - len(self.recent)
+        if slot >= recent_start:
+            return self.recent[slot - recent_start][name]
+        if slot >= self.written_count:
+            return self.pending[slot - self.written_count][name]
+        return self.reader().get(slot, name)
+
+    def series(self, name, stop=None):
+        """
+        All recorded values of one field up to slot `stop`, stacked along a leading slot axis.
+        Meant for small, fixed-shape fields such as UAV positions.
+        """
+        stop = self.slot_count if stop is None else min(stop, self.slot_count)
+        if stop == 0:
+            return np.empty((0,))
+        if not self.directory:
+            return np.stack([slot[name] for slot in list(self.recent)[:stop]])
+        written = self.written_count
+        parts = []
+        if written:
+            parts.append(self.reader().series(name, min(stop, written)))
+        if stop > written:
+            parts.append(np.stack([slot[name] for slot in self.pending[:stop - written]]))
+        return np.concatenate(parts)
+
+    def reader(self):
+        if self._reader is None:
+            self._reader = TrajectoryReader(self.directory)
+        return self._reader
+
+class TrajectoryReader:
+    """
+    Lazy reader for the chunks written by TrajectoryRecorder. Only one chunk is held in memory.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.chunk_size = manifest['chunk_size']
+        self.chunk_count = manifest['chunk_count']
+        self.slot_count = manifest['slot_count']
+        self.fields = manifest['fields']
+        self.ragged = manifest.get('ragged', [])
+        self._cached_index = None
+        self._cached_chunk = None
+
+    def load_chunk(self, index):
+        with np.load(os.path.join(self.directory, f'chunk_{index:05d}.npz')) as chunk:
+            return {name: chunk[name] for name in chunk.files}
+
+    def load_field(self, index, name):
+        # Members of an .npz file are decompressed individually
+        with np.load(os.path.join(self.directory, f'chunk_{index:05d}.npz')) as chunk:
+            return chunk[name]
+
+    def chunk_field(self, index, name):
+        # Fields of the most recently used chunk are cached as they are read
+        if index != self._cached_index:
+            self._cached_chunk = {}
+            self._cached_index = index
+        if name not in self._cached_chunk:
+            self._cached_chunk[name] = self.load_field(index, name)
+        return self._cached_chunk[name]
+
+    def __len__(self):
+        return self.slot_count
+
+    def get(self, slot, name):
+        if slot < 0:
+            slot += self.slot_count
+        if not 0 <= slot < self.slot_count:
+            raise IndexError(f'slot {slot} out of range')
+        index, offset = divmod(slot, self.chunk_size)
+        if name in self.ragged:
+            offsets = self.chunk_field(index, name + '_offsets')
+            return self.chunk_field(index, name)[offsets[offset]:offsets[offset + 1]]
+        return self.chunk_field(index, name)[offset]
+
+    def __getitem__(self, slot):
+        return {name: self.get(slot, name) for name in self.fields}
+
+    def series(self, name, stop=None):
+        stop = self.slot_count if stop is None else min(stop, self.slot_count)
+        chunk_stop = -(-stop // self.chunk_size)
+        parts = [self.load_field(index, name) for index in range(chunk_stop)]
+        return np.concatenate(parts)[:stop]
+
+class SlotView:
+    """
+    Read-only sequence over one recorded field, indexed by time slot.
+    """
+    def __init__(self, recorder, name, transform=None):
+        self.recorder = recorder
+        self.name = name
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.recorder)
+
+    def __getitem__(self, slot):
+        value = self.recorder.get(slot, self.name)
+        return self.transform(value) if self.transform else value
+
+    def __iter__(self):
+        for slot in range(len(self)):
+            yield self[slot]
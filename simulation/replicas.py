@@ -0,0 +1,239 @@
+# simulation/replicas.py
+
+import numpy as np
+
+from simulation.iot_simulation import draw_tasks
+from simulation.energy_model import EnergyModel
+from simulation.communication_model import CommunicationModel
+from simulation.task_offloading import TaskOffloading
+from simulation.path_planning import PathPlanning
+from simulation.task_batch import TaskBatch
+from simulation.instrumentation import Instrumentation
+from simulation.seeding import RandomStreams
+from simulation.sharding import ShardRanking
+from simulation.metrics import confidence_interval
+from simulation.config import as_config
+from utils.helpers import Logger
+
+REPLICA_METRICS = ('energy_efficiency', 'energy_consumption', 'system_utility', 'offload_ratio')
+
+class ReplicaSimulation:
+    """
+    R independent replicas of one config advanced together. State carries a leading
+    replica axis, (R, N) per device and (R, K) per UAV, and mobility, planning, offloading
+    and energy accounting run as single array operations over all replicas.
+
+    Replica r draws from the random streams of seeds[r] (by default simulation.seed + r),
+    in the same order as SimulationManager, so it follows the run of the batched
+    single-replica simulation with that seed; only the order of floating point sums in the
+    totals differs. The config rejects trajectory recording, queueing, checkpoints and the
+    capacity assignment in this mode.
+    """
+    def __init__(self, config, seeds=None):
+        config = as_config(config)
+        self.config = config
+        logging_config = config.get('logging', {})
+        self.logger = Logger(config['log_file'],
+                             level=logging_config.get('level', 'INFO'),
+                             quiet=logging_config.get('quiet', False))
+        replica_config = config.get('replicas', {})
+        if seeds is None:
+            seed = config['simulation'].get('seed', 0)
+            seeds = range(seed, seed + replica_config.get('count', 1))
+        self.seeds = list(seeds)
+        self.confidence = replica_config.get('confidence', 0.95)
+        self.replica_count = len(self.seeds)
+        self.time_slots = config['simulation']['time_slots']
+        self.area_size = config['simulation']['area_size']
+        self.slot_duration = config['simulation']['slot_duration']
+        self.device_count = config['iot']['device_count']
+        self.uav_count = config['uav']['count']
+        self.flying_height = config['uav']['flying_height']
+
+        streams = [RandomStreams(seed) for seed in self.seeds]
+        self.mobility_rngs = [stream.generator('iot_mobility') for stream in streams]
+        self.task_rngs = [stream.generator('tasks') for stream in streams]
+        self.planning_rngs = [stream.generator('path_planning') for stream in streams]
+
+        # Shared models supply the equations; the per-replica state lives in the arrays below
+        self.energy_model = EnergyModel(config)
+        # One planner per replica, since the cluster planner keeps its centroids between slots
+        self.path_plannings = [PathPlanning(config, stream) for stream in streams]
+        self.path_planning = self.path_plannings[0] if streams else PathPlanning(config)
+        local_config = config.override({'iot.device_count': 0})
+        self.task_offloading = TaskOffloading(local_config, self.energy_model, CommunicationModel(config))
+
+        R, N, K = self.replica_count, self.device_count, self.uav_count
+        self.iot_positions = np.zeros((R, N, 3))
+        self.uav_positions = np.empty((R, K, 3))
+        for r, stream in enumerate(streams):
+            self.iot_positions[r, :, :2] = stream.generator('iot_placement').uniform(0, self.area_size, size=(N, 2))
+            self.uav_positions[r, :, :2] = stream.generator('uav_placement').uniform(0, self.area_size, size=(K, 2))
+        self.uav_positions[:, :, 2] = self.flying_height
+        self.last_distances = np.zeros((R, K))
+        self.iot_energy_efficiency = np.full((R, N), np.nan)
+
+        # Per-replica ledgers and counters
+        self.uav_energy = np.zeros((R, K))
+        self.uav_propulsion_energy = np.zeros((R, K))
+        self.iot_energy = np.zeros((R, N))
+        self.processed_data_volume = np.zeros(R)
+        self.tasks_generated = np.zeros(R, dtype=np.int64)
+        self.tasks_offloaded = np.zeros(R, dtype=np.int64)
+
+        instrumentation_config = config.get('instrumentation', {})
+        self.instrumentation = Instrumentation(enabled=instrumentation_config.get('enabled', True),
+                                               profile=instrumentation_config.get('profile', False),
+                                               trace_memory=instrumentation_config.get('trace_memory', False),
+                                               directory=instrumentation_config.get('directory'))
+
+    def run_simulation(self):
+        instrumentation = self.instrumentation
+        self.logger.log(f"Starting simulation of {self.replica_count} replicas.")
+        instrumentation.start_run()
+        for t in range(self.time_slots):
+            self.logger.log(f"Time slot {t+1}/{self.time_slots}")
+            instrumentation.start_slot(t)
+
+            with instrumentation.phase('mobility'):
+                self.update_iot_positions()
+
+            with instrumentation.phase('uav_planning'):
+                self.update_uav_positions(t)
+
+            with instrumentation.phase('task_generation'):
+                replica, tasks = self.generate_tasks(t)
+
+            with instrumentation.phase('offloading'):
+                batch = self.task_offloading.select_offloading(tasks, self.uav_positions[replica])
+                self.iot_energy_efficiency[replica, tasks.device_id] = batch.energy_efficiency
+
+            instrumentation.count('tasks_generated', len(tasks))
+            instrumentation.count('tasks_offloaded', int(batch.offloaded.sum()))
+            instrumentation.count('candidate_pairs', len(tasks) * self.uav_count)
+
+            with instrumentation.phase('energy_accounting'):
+                self.update_energy(replica, batch)
+            instrumentation.end_slot()
+
+        instrumentation.end_run()
+        self.logger.log("Simulation completed.")
+        self.logger.close()
+
+    def update_iot_positions(self):
+        # One random walk step per replica; the draws stay per replica, the arithmetic is batched
+        steps = np.stack([rng.uniform(-5, 5, size=(self.device_count, 2)) for rng in self.mobility_rngs])
+        xy = self.iot_positions[..., :2]
+        xy += steps
+        np.clip(xy, 0, self.area_size, out=xy)
+
+    def update_uav_positions(self, time_slot):
+        positions = self.uav_positions
+        if self.device_count == 0:
+            targets = np.empty_like(positions)
+            for r, rng in enumerate(self.planning_rngs):
+                targets[r, :, :2] = rng.uniform(0, self.area_size, size=(self.uav_count, 2))
+            targets[..., 2] = self.flying_height
+            new_positions = self.path_planning.move_towards_batch(positions, targets)
+        elif self.path_planning.mode in ('distinct', 'cluster'):
+            # Planned replica by replica, each against its own ranking
+            new_positions = np.empty_like(positions)
+            for r, path_planning in enumerate(self.path_plannings):
+                ranking = ShardRanking()
+                device_ids = np.flatnonzero(~np.isnan(self.iot_energy_efficiency[r]))
+                ranking.update([(device_ids, self.iot_energy_efficiency[r, device_ids])])
+                if path_planning.mode == 'cluster':
+                    new_positions[r] = path_planning.plan_clusters(positions[r], self.iot_positions[r], ranking)
+                else:
+                    targets = path_planning.assign_targets([tuple(position) for position in positions[r].tolist()],
+                                                           self.iot_positions[r], ranking)
+                    new_positions[r] = path_planning.move_towards_batch(positions[r], np.asarray(targets))
+        else:
+            # Every UAV of a replica heads for its most efficient device; none yet means stay
+            efficiency = np.where(np.isnan(self.iot_energy_efficiency), -np.inf, self.iot_energy_efficiency)
+            best = efficiency.argmax(axis=1)
+            has_best = np.isfinite(efficiency[np.arange(self.replica_count), best])
+            targets = np.where(has_best[:, None, None], self.iot_positions[np.arange(self.replica_count), best][:, None, :], positions)
+            new_positions = self.path_planning.move_towards_batch(positions, targets)
+        self.last_distances = np.linalg.norm(new_positions - positions, axis=2)
+        self.uav_positions = new_positions
+
+    def generate_tasks(self, time_slot):
+        """
+        Draw every replica's tasks and concatenate them into one TaskBatch.
+        Returns (replica index per task, TaskBatch).
+        """
+        replicas = []
+        device_ids = []
+        fields = []
+        for r, rng in enumerate(self.task_rngs):
+            task_mask, data_size, computation_intensity, deadline = draw_tasks(rng, self.device_count, time_slot)
+            ids = np.flatnonzero(task_mask)
+            replicas.append(np.full(len(ids), r, dtype=np.int64))
+            device_ids.append(ids)
+            fields.append((data_size, computation_intensity, deadline))
+        replica = np.concatenate(replicas) if replicas else np.empty(0, dtype=np.int64)
+        device_ids = np.concatenate(device_ids) if device_ids else np.empty(0, dtype=np.int64)
+        if not fields:
+            return replica, TaskBatch.empty()
+        data_size, computation_intensity, deadline = (np.concatenate(field) for field in zip(*fields))
+        return replica, TaskBatch(device_ids, self.iot_positions[replica, device_ids], data_size, computation_intensity, deadline)
+
+    def update_energy(self, replica, batch):
+        R, N, K = self.replica_count, self.device_count, self.uav_count
+        tasks = batch.tasks
+        offloaded = batch.offloaded
+        energy_model = self.energy_model
+
+        speed = self.last_distances / self.slot_duration
+        self.uav_propulsion_energy += energy_model.calculate_uav_propulsion_power(speed) * self.slot_duration
+
+        # Scatter-adds over flattened (replica, uav) and (replica, device) indices
+        uav_energy = energy_model.calculate_uav_computation_energy(tasks)[offloaded]
+        uav_index = replica[offloaded] * K + batch.uav_id[offloaded]
+        self.uav_energy += np.bincount(uav_index, weights=uav_energy, minlength=R * K).reshape(R, K)
+        iot_energy = np.where(offloaded,
+                              energy_model.calculate_iot_transmission_energy(tasks, batch.data_rate),
+                              energy_model.calculate_iot_computation_energy(tasks))
+        self.iot_energy += np.bincount(replica * N + tasks.device_id, weights=iot_energy, minlength=R * N).reshape(R, N)
+
+        self.processed_data_volume += np.bincount(replica, weights=tasks.data_size, minlength=R)
+        self.tasks_generated += np.bincount(replica, minlength=R)
+        self.tasks_offloaded += np.bincount(replica[offloaded], minlength=R)
+
+    def replica_metrics(self):
+        """
+        {metric: (R,) array} with one value per replica.
+        """
+        energy_consumption = self.uav_energy.sum(axis=1) + self.uav_propulsion_energy.sum(axis=1) + self.iot_energy.sum(axis=1)
+        energy_efficiency = np.zeros(self.replica_count)
+        np.divide(self.processed_data_volume, energy_consumption, out=energy_efficiency, where=energy_consumption > 0)
+        offload_ratio = np.zeros(self.replica_count)
+        np.divide(self.tasks_offloaded, self.tasks_generated, out=offload_ratio, where=self.tasks_generated > 0)
+        return {
+            'energy_efficiency': energy_efficiency,
+            'energy_consumption': energy_consumption,
+            'system_utility': self.processed_data_volume.copy(),
+            'offload_ratio': offload_ratio
+        }
+
+    def summary(self):
+        """
+        {metric: {'mean', 'half_width', 'low', 'high'}}, a t confidence interval
+        at replicas.confidence over the replicas.
+        """
+        summary = {}
+        for name, values in self.replica_metrics().items():
+            mean, half_width = confidence_interval(values, self.confidence)
+            summary[name] = {'mean': mean, 'half_width': half_width, 'low': mean - half_width, 'high': mean + half_width}
+        return summary
+
+    # Replica means, so a ReplicaSimulation reads like a SimulationManager
+    def calculate_energy_efficiency(self):
+        return float(self.replica_metrics()['energy_efficiency'].mean())
+
+    def calculate_total_energy_consumption(self):
+        return float(self.replica_metrics()['energy_consumption'].mean())
+
+    def calculate_system_utility(self):
+        return float(self.processed_data_volume.mean())
@@ -0,0 +1,175 @@
+# simulation/result_cache.py
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from simulation.config import as_config
+
+ROW_FILE = 'row.json'
+TRAJECTORY_DIRECTORY = 'trajectories'
+
+# Config values that only decide where output goes or how it is reported, never the results
+OUTPUT_ONLY = ('log_file', 'logging', 'instrumentation', 'checkpoint', 'rendering', 'cache', 'recording.directory')
+
+# Everything whose source can change a result: the simulation package and the constants in utils
+SOURCE_PACKAGES = ('simulation', 'utils')
+
+@functools.lru_cache(maxsize=None)
+def source_hash(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))):
+    """
+    SHA-256 over the path and contents of every .py file in SOURCE_PACKAGES, computed once per process.
+    """
+    digest = hashlib.sha256()
+    for package in SOURCE_PACKAGES:
+        for directory, subdirectories, files in os.walk(os.path.join(root, package)):
+            subdirectories[:] = sorted(name for name in subdirectories if name != '__pycache__')
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(directory, name)
+                    digest.update(os.path.relpath(path, root).replace(os.sep, '/').encode())
+                    with open(path, 'rb') as source:
+                        digest.update(hashlib.sha256(source.read()).digest())
+    return digest.hexdigest()
+
+def result_key(config):
+    """
+    Cache key of a run: the resolved config without its output-only values (the seed is
+    part of the config), together with the source hash.
+    """
+    data = as_config(config).to_dict()
+    for dotted_key in OUTPUT_ONLY:
+        *parents, key = dotted_key.split('.')
+        section = data
+        for parent in parents:
+            section = section.get(parent) if isinstance(section, dict) else None
+        if isinstance(section, dict):
+            section.pop(key, None)
+    payload = json.dumps({'config': data, 'source': source_hash()}, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def is_deterministic(config):
+    # Whether a run's results follow from its config and seed alone, so that they can be cached
+    offloading_config = config.get('offloading', {})
+    return not (offloading_config.get('assignment', 'greedy') == 'capacity'
+                and offloading_config.get('assignment_time_budget') is not None)
+
+def directory_size(path):
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+class ResultCache:
+    """
+    Content-addressed store of finished runs: the metrics of the results row and, when the
+    run recorded them, its trajectories. Entries live in <directory>/<key[:2]>/<key>/,
+    are written to a temporary directory and renamed into place, and are evicted least
+    recently used first once they take up more than `max_bytes`. A hit refreshes the
+    entry's modification time, which is what the LRU order goes by.
+    """
+    def __init__(self, directory='results/data/cache', max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, config):
+        # None when caching is disabled
+        cache_config = config.get('cache', {})
+        if not cache_config.get('enabled', False) or not cache_config.get('directory'):
+            return None
+        if not is_deterministic(config):
+            return None
+        return cls(cache_config['directory'], cache_config.get('max_bytes', 1 << 30))
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key, recording_directory=None):
+        """
+        The cached metrics for `key`, or None. Cached trajectories are copied to
+        `recording_directory`, replacing what is there.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(os.path.join(path, ROW_FILE)) as f:
+                metrics = json.load(f)
+        except (OSError, ValueError):
+            return None
+        trajectories = os.path.join(path, TRAJECTORY_DIRECTORY)
+        if recording_directory and os.path.isdir(trajectories):
+            shutil.rmtree(recording_directory, ignore_errors=True)
+            shutil.copytree(trajectories, recording_directory)
+        os.utime(path)
+        return metrics
+
+    def put(self, key, metrics, recording_directory=None):
+        """
+        Store a run's metrics and, if given and present, its recorded trajectories.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.entry_', dir=self.directory)
+        try:
+            with open(os.path.join(staging, ROW_FILE), 'w') as f:
+                json.dump(metrics, f, default=lambda value: value.item())
+            if recording_directory and os.path.isdir(recording_directory):
+                shutil.copytree(recording_directory, os.path.join(staging, TRAJECTORY_DIRECTORY))
+            path = self.entry_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.rename(staging, path)
+            except OSError:
+                # Another process stored the same result first
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        """
+        (modification time, size, path) of every entry, least recently used first.
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for prefix in os.listdir(self.directory):
+            prefix_path = os.path.join(self.directory, prefix)
+            if prefix.startswith('.') or not os.path.isdir(prefix_path):
+                continue
+            for key in os.listdir(prefix_path):
+                path = os.path.join(prefix_path, key)
+                try:
+                    entries.append((os.path.getmtime(path), directory_size(path), path))
+                except OSError:
+                    pass
+        entries.sort()
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        # Drop least recently used entries until the cache fits in max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def invalidate(self, key=None):
+        """
+        Remove one entry, or the whole cache when no key is given.
+        """
+        if key is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        else:
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
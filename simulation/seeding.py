@@ -0,0 +1,53 @@
+# simulation/seeding.py
+
+import json
+import numpy as np
+
+# One independent stream per consumer of randomness. Each name is bound to a fixed child of
+# the root SeedSequence, so the draws of one component never depend on how many draws the
+# others made, or in which order. New streams go at the end to keep existing ones unchanged.
+STREAMS = (
+    'iot_placement',
+    'iot_mobility',
+    'tasks',
+    'uav_placement',
+    'path_planning',
+)
+
+# Spawn key prefix for per-shard roots, well clear of the indices of STREAMS
+SHARD_SPAWN_KEY = 1 << 16
+
+class RandomStreams:
+    """
+    Per-component numpy Generators spawned from one root seed. With `shard` set, the streams
+    are those of one worker of a sharded run, independent of every other shard's.
+    """
+    def __init__(self, seed=0, shard=None):
+        self.seed = seed
+        self.shard = shard
+        if shard is None:
+            root = np.random.SeedSequence(seed)
+        else:
+            root = np.random.SeedSequence(seed, spawn_key=(SHARD_SPAWN_KEY, shard))
+        children = root.spawn(len(STREAMS))
+        self.seed_sequences = dict(zip(STREAMS, children))
+        self.generators = {}
+
+    @classmethod
+    def from_config(cls, config, shard=None):
+        return cls(config['simulation'].get('seed', 0), shard)
+
+    def generator(self, name):
+        # Created on first use and shared by every later caller
+        if name not in self.generators:
+            self.generators[name] = np.random.default_rng(self.seed_sequences[name])
+        return self.generators[name]
+
+    def state_dict(self):
+        # Bit generator states hold 128-bit integers, so they are kept as JSON strings
+        return {name: np.array(json.dumps(self.generator(name).bit_generator.state)) for name in STREAMS}
+
+    def load_state_dict(self, state):
+        for name in STREAMS:
+            if name in state:
+                self.generator(name).bit_generator.state = json.loads(str(state[name]))
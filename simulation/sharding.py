@@ -0,0 +1,377 @@
+# simulation/sharding.py
+
+import math
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+import numpy as np
+
+from simulation.uav_simulation import UAVSimulation
+from simulation.iot_simulation import random_walk_step, draw_tasks
+from simulation.energy_model import EnergyModel
+from simulation.communication_model import CommunicationModel
+from simulation.task_offloading import TaskOffloading
+from simulation.path_planning import PathPlanning
+from simulation.task_batch import TaskBatch
+from simulation.instrumentation import Instrumentation
+from simulation.seeding import RandomStreams
+from simulation.metrics import MetricsAggregator
+from simulation.config import as_config
+from utils.helpers import Logger
+
+def tile_grid(workers):
+    # Most nearly square rows x cols factorization of the worker count
+    rows = max(d for d in range(1, math.isqrt(workers) + 1) if workers % d == 0)
+    return rows, workers // rows
+
+class TileLayout:
+    """
+    Splits the area_size square into rows x cols equal tiles, numbered row-major.
+    """
+    def __init__(self, area_size, rows, cols):
+        self.area_size = area_size
+        self.rows = rows
+        self.cols = cols
+        self.tile_width = area_size / cols
+        self.tile_height = area_size / rows
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def tile_of(self, xy):
+        # Tile of each (x, y) row; positions on the far edge belong to the last tile
+        col = np.minimum((xy[:, 0] // self.tile_width).astype(np.int64), self.cols - 1)
+        row = np.minimum((xy[:, 1] // self.tile_height).astype(np.int64), self.rows - 1)
+        return row * self.cols + col
+
+    def bounds(self, tile):
+        row, col = divmod(tile, self.cols)
+        return (col * self.tile_width, row * self.tile_height,
+                (col + 1) * self.tile_width, (row + 1) * self.tile_height)
+
+    def covering_uavs(self, tile, uav_positions, radius):
+        """
+        Indices of the UAVs whose coverage can reach into the tile, in ascending order.
+        The horizontal distance bounds the 3D distance from below, so none are missed.
+        """
+        x0, y0, x1, y1 = self.bounds(tile)
+        dx = np.maximum(np.maximum(x0 - uav_positions[:, 0], uav_positions[:, 0] - x1), 0)
+        dy = np.maximum(np.maximum(y0 - uav_positions[:, 1], uav_positions[:, 1] - y1), 0)
+        return np.flatnonzero(dx**2 + dy**2 <= radius**2)
+
+def create_shared_array(shape, dtype, fill):
+    dtype = np.dtype(dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    array.fill(fill)
+    return block, array
+
+def attach_shared_array(spec):
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+class ShardRanking:
+    """
+    Global ranking of devices by energy efficiency, merged from the best devices of every
+    shard. Stands in for EfficiencyTracker.top_k in path planning.
+    """
+    def __init__(self):
+        self.ranking = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0)  # Efficiency of each ranked device, in ranking order
+
+    def update(self, candidates):
+        ids = np.concatenate([ids for ids, _ in candidates])
+        values = np.concatenate([values for _, values in candidates])
+        # Best first, lowest device id first on ties
+        order = np.lexsort((ids, -values))
+        self.ranking = ids[order]
+        self.values = values[order]
+
+    def top_k(self, k):
+        return self.ranking[:k]
+
+    def top_k_values(self, k):
+        return self.values[:k]
+
+class ShardWorker:
+    """
+    State of one tile: the ids of the devices currently inside it, its own random streams
+    and worker-local models. Per-device arrays live in shared memory and are indexed by
+    device_id; a worker only ever writes the rows of the devices it owns.
+    """
+    def __init__(self, config, shard, layout, specs, report_count):
+        self.shard = shard
+        self.layout = layout
+        self.report_count = report_count
+        self.coverage_radius = config['uav']['coverage_radius']
+        self.area_size = config['simulation']['area_size']
+        self.blocks = {}
+        arrays = {}
+        for name, spec in specs.items():
+            self.blocks[name], arrays[name] = attach_shared_array(spec)
+        self.positions = arrays['positions']
+        self.efficiency = arrays['efficiency']
+        self.uav_positions = arrays['uav_positions']
+
+        streams = RandomStreams.from_config(config, shard)
+        self.mobility_rng = streams.generator('iot_mobility')
+        self.task_rng = streams.generator('tasks')
+
+        # The worker-local models hold no per-device state of their own
+        local_config = config.override({'iot.device_count': 0})
+        self.energy_model = EnergyModel(local_config)
+        self.energy_model.iot_energy = arrays['iot_energy']
+        self.task_offloading = TaskOffloading(local_config, self.energy_model, CommunicationModel(local_config))
+
+        self.device_ids = np.flatnonzero(layout.tile_of(self.positions[:, :2]) == shard)
+
+    def move(self, time_slot):
+        """
+        Random walk step for the local devices. Returns {tile: device ids} for the devices
+        that left the tile; they stop being local immediately.
+        """
+        xy = self.positions[self.device_ids, :2]
+        random_walk_step(xy, self.mobility_rng, self.area_size)
+        self.positions[self.device_ids, :2] = xy
+        tiles = self.layout.tile_of(xy)
+        leaving = tiles != self.shard
+        emigrants = {int(tile): self.device_ids[leaving & (tiles == tile)] for tile in np.unique(tiles[leaving])}
+        self.device_ids = self.device_ids[~leaving]
+        return emigrants
+
+    def offload(self, time_slot, immigrants):
+        """
+        Take in the devices handed over by other tiles, then generate, offload and account
+        the tasks of the local devices. Returns the slot's partial metrics.
+        """
+        if len(immigrants):
+            self.device_ids = np.union1d(self.device_ids, immigrants)
+        task_mask, data_size, computation_intensity, deadline = draw_tasks(self.task_rng, len(self.device_ids), time_slot)
+        task_ids = self.device_ids[task_mask]
+        tasks = TaskBatch(task_ids, self.positions[task_ids], data_size, computation_intensity, deadline)
+
+        # Only UAVs that can reach into the tile are candidates
+        covering = self.layout.covering_uavs(self.shard, self.uav_positions, self.coverage_radius)
+        batch = self.task_offloading.select_offloading(tasks, self.uav_positions[covering])
+        batch.uav_id[batch.offloaded] = covering[batch.uav_id[batch.offloaded]]
+        self.efficiency[task_ids] = batch.energy_efficiency
+        self.energy_model.update_energy_consumption_batch(batch, time_slot)
+        metrics = self.task_offloading.metrics
+        metrics.record_tasks(data_size, batch.energy_efficiency, batch.offloaded, batch.uav_id)
+
+        top_ids, top_values = self.top_devices()
+        return {
+            'tasks_generated': len(tasks),
+            'tasks_offloaded': int(batch.offloaded.sum()),
+            'candidate_pairs': len(tasks) * len(covering),
+            'slot_metrics': metrics.take_slot(),
+            'uav_energy': self.energy_model.uav_energy_series[time_slot].copy(),
+            'iot_energy': float(self.energy_model.iot_energy_series[time_slot]),
+            'top_ids': top_ids,
+            'top_values': top_values
+        }
+
+    def task_metrics(self):
+        # The per-task distributions, merged by the parent at the end of the run
+        return self.task_offloading.metrics
+
+    def top_devices(self):
+        # The report_count most efficient local devices; the global best are among them
+        values = self.efficiency[self.device_ids]
+        values = np.where(np.isnan(values), -np.inf, values)
+        if len(values) > self.report_count:
+            best = np.argpartition(-values, self.report_count - 1)[:self.report_count]
+        else:
+            best = np.arange(len(values))
+        best = best[np.isfinite(values[best])]
+        return self.device_ids[best], values[best]
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+
+def run_worker(connection, config, shard, layout, specs, report_count):
+    # Worker process loop: (method, *args) commands in, ('ok', result) or ('error', traceback) out
+    try:
+        worker = ShardWorker(config, shard, layout, specs, report_count)
+    except Exception:
+        connection.send(('error', traceback.format_exc()))
+        connection.close()
+        return
+    # Reported once every worker has claimed its initial devices, before anything moves
+    connection.send(('ok', len(worker.device_ids)))
+    try:
+        while True:
+            command = connection.recv()
+            if command is None:
+                break
+            name, *args = command
+            try:
+                connection.send(('ok', getattr(worker, name)(*args)))
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+    finally:
+        worker.close()
+        connection.close()
+
+class ShardedSimulation:
+    """
+    SimulationManager counterpart for very large device populations. The area is split into
+    one tile per worker process (sharding.workers). Workers keep device positions, IoT energy
+    and energy efficiency in shared memory, hand devices that walk across a tile border to
+    the new tile's worker, and run the batched offloading kernel for their own tasks against
+    the UAVs that can reach their tile. UAV planning, propulsion and the merged metrics stay
+    in this process; UAV positions are broadcast through shared memory every slot.
+
+    Every worker draws from its own random streams, so a run is reproducible for a given
+    worker count but differs from a single-process run with the same seed. The config rejects
+    trajectory recording, queueing, checkpoints and the capacity assignment in this mode.
+    """
+    def __init__(self, config):
+        config = as_config(config)
+        self.config = config
+        logging_config = config.get('logging', {})
+        self.logger = Logger(config['log_file'],
+                             level=logging_config.get('level', 'INFO'),
+                             quiet=logging_config.get('quiet', False))
+        self.random_streams = RandomStreams.from_config(config)
+        self.energy_model = EnergyModel(config)
+        self.path_planning = PathPlanning(config, self.random_streams)
+        self.uav_simulation = UAVSimulation(config, self.path_planning, self.random_streams)
+        self.ranking = ShardRanking()
+        self.time_slots = config['simulation']['time_slots']
+        self.device_count = config['iot']['device_count']
+        metrics_config = config.get('metrics', {})
+        self.metrics = MetricsAggregator(self.uav_simulation.uav_count, metrics_config.get('series_capacity', 1024),
+                                         metrics_config.get('relative_accuracy', 0.01))
+
+        sharding_config = config.get('sharding', {})
+        self.workers = sharding_config.get('workers', 1)
+        self.layout = TileLayout(config['simulation']['area_size'], *tile_grid(self.workers))
+        # Every shard reports enough of its best devices for the planner's top-k
+        planning_config = config.get('path_planning', {})
+        self.report_count = max(planning_config.get('top_k', 10), self.uav_simulation.uav_count, 1)
+        if self.path_planning.mode == 'cluster':
+            self.report_count = max(self.report_count, self.path_planning.cluster_sample)
+
+        # Device state, copied out of shared memory when the run ends
+        self.iot_positions = np.zeros((self.device_count, 3))
+        self.iot_positions[:, :2] = self.random_streams.generator('iot_placement').uniform(0, config['simulation']['area_size'], size=(self.device_count, 2))
+        self.iot_energy_efficiency = np.full(self.device_count, np.nan)
+
+        instrumentation_config = config.get('instrumentation', {})
+        self.instrumentation = Instrumentation(enabled=instrumentation_config.get('enabled', True),
+                                               profile=instrumentation_config.get('profile', False),
+                                               trace_memory=instrumentation_config.get('trace_memory', False),
+                                               directory=instrumentation_config.get('directory'))
+
+    def run_simulation(self):
+        instrumentation = self.instrumentation
+        self.logger.log(f"Starting sharded simulation with {len(self.layout)} workers.")
+        instrumentation.start_run()
+
+        blocks = {}
+        arrays = {}
+        for name, initial in (('positions', self.iot_positions),
+                              ('iot_energy', self.energy_model.iot_energy),
+                              ('efficiency', self.iot_energy_efficiency),
+                              ('uav_positions', self.uav_simulation.positions)):
+            blocks[name], arrays[name] = create_shared_array(initial.shape, initial.dtype, 0)
+            arrays[name][...] = initial
+        specs = {name: (blocks[name].name, arrays[name].shape, arrays[name].dtype.str) for name in blocks}
+
+        connections = []
+        processes = []
+        try:
+            for shard in range(len(self.layout)):
+                parent_end, worker_end = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=run_worker,
+                                                  args=(worker_end, self.config, shard, self.layout, specs, self.report_count),
+                                                  daemon=True)
+                process.start()
+                worker_end.close()
+                connections.append(parent_end)
+                processes.append(process)
+            self.collect(connections)
+
+            for t in range(self.time_slots):
+                self.logger.log(f"Time slot {t+1}/{self.time_slots}")
+                instrumentation.start_slot(t)
+
+                with instrumentation.phase('mobility'):
+                    immigrants = [[] for _ in connections]
+                    for emigrants in self.broadcast(connections, [('move', t)] * len(connections)):
+                        for tile, device_ids in emigrants.items():
+                            immigrants[tile].append(device_ids)
+
+                with instrumentation.phase('uav_planning'):
+                    self.uav_simulation.update_positions(t, arrays['positions'], self.ranking)
+                    arrays['uav_positions'][:] = self.uav_simulation.positions
+
+                with instrumentation.phase('offloading'):
+                    commands = [('offload', t, np.concatenate(ids) if ids else np.empty(0, dtype=np.int64))
+                                for ids in immigrants]
+                    reports = self.broadcast(connections, commands)
+                    self.ranking.update([(report['top_ids'], report['top_values']) for report in reports])
+
+                for counter in ('tasks_generated', 'tasks_offloaded', 'candidate_pairs'):
+                    instrumentation.count(counter, sum(report[counter] for report in reports))
+
+                with instrumentation.phase('energy_accounting'):
+                    self.energy_model.update_propulsion_energy(self.uav_simulation.last_distances, t)
+                    self.energy_model.add_slot_energy(t, sum(report['uav_energy'] for report in reports),
+                                                      sum(report['iot_energy'] for report in reports))
+                # Slot-level metrics need the whole area, so the shards' counts are added up first
+                tasks, offloaded, uav_tasks, data_volume = (sum(values) for values in zip(*(report['slot_metrics'] for report in reports)))
+                self.metrics.record_slot(tasks, offloaded, uav_tasks, data_volume)
+                instrumentation.end_slot()
+
+            for worker_metrics in self.broadcast(connections, [('task_metrics',)] * len(connections)):
+                self.metrics.merge_tasks(worker_metrics)
+
+            self.iot_positions = arrays['positions'].copy()
+            self.energy_model.iot_energy = arrays['iot_energy'].copy()
+            self.iot_energy_efficiency = arrays['efficiency'].copy()
+        finally:
+            for connection in connections:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+            for process in processes:
+                process.join()
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+
+        instrumentation.end_run()
+        self.logger.log("Simulation completed.")
+        self.logger.close()
+
+    def broadcast(self, connections, commands):
+        # Send every worker its command first so they run in parallel, then collect the results
+        for connection, command in zip(connections, commands):
+            connection.send(command)
+        return self.collect(connections)
+
+    def collect(self, connections):
+        results = []
+        for shard, connection in enumerate(connections):
+            status, result = connection.recv()
+            if status == 'error':
+                raise RuntimeError(f'shard {shard} failed:\n{result}')
+            results.append(result)
+        return results
+
+    def calculate_energy_efficiency(self):
+        total_energy = self.energy_model.get_total_energy_consumption()
+        system_utility = self.calculate_system_utility()
+        return system_utility / total_energy if total_energy > 0 else 0
+
+    def calculate_total_energy_consumption(self):
+        return self.energy_model.get_total_energy_consumption()
+
+    def calculate_system_utility(self):
+        # System Utility is the total processed data volume
+        return self.metrics.data_volume
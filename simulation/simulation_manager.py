@@ -6,63 +6,188 @@ from simulation.energy_model import EnergyModel
 from simulation.communication_model import CommunicationModel
 from simulation.task_offloading import TaskOffloading
 from simulation.path_planning import PathPlanning
+from simulation.recorder import TrajectoryRecorder, SlotView
+from simulation.efficiency_tracker import EfficiencyHistory
+from simulation.instrumentation import Instrumentation
+from simulation.checkpoint import CheckpointWriter, load_checkpoint, prefixed, unprefixed
+from simulation.seeding import RandomStreams
+from simulation.config import as_config
+from simulation.queueing import QueueingEngine
 from utils.helpers import Logger
-import matplotlib.pyplot as plt
-import os
-import matplotlib.animation as animation
 import numpy as np
 
 class SimulationManager:
-    def __init__(self, config):
+    def __init__(self, config, resume=None):
+        """
+        `resume` is a checkpoint file, or a checkpoint directory to resume from its latest
+        checkpoint; the run then continues from the slot after the checkpoint.
+        """
+        config = as_config(config)
         self.config = config
-        self.logger = Logger(config['log_file'])
+        logging_config = config.get('logging', {})
+        self.logger = Logger(config['log_file'],
+                             level=logging_config.get('level', 'INFO'),
+                             quiet=logging_config.get('quiet', False))
+        # Every component draws from its own stream, spawned from simulation.seed
+        self.random_streams = RandomStreams.from_config(config)
         self.energy_model = EnergyModel(config)
         self.communication_model = CommunicationModel(config)
-        self.path_planning = PathPlanning(config)
+        self.path_planning = PathPlanning(config, self.random_streams)
         self.task_offloading = TaskOffloading(config, self.energy_model, self.communication_model)
-        self.uav_simulation = UAVSimulation(config, self.path_planning)
-        self.iot_simulation = IoTSimulation(config)
+        self.uav_simulation = UAVSimulation(config, self.path_planning, self.random_streams)
+        self.iot_simulation = IoTSimulation(config, self.random_streams)
         self.time_slots = config['simulation']['time_slots']
 
-        # Initialize lists to store positions and energy efficiency
-        self.uav_positions_over_time = []  # List of lists of UAV positions at each time slot
-        self.iot_positions_over_time = []  # List of lists of IoT device positions at each time slot
-        self.iot_energy_efficiency_over_time = []  # List of dicts per time slot
+        # Stream positions and energy efficiency per time slot to disk, keeping a window in memory
+        recording_config = config.get('recording', {})
+        self.recorder = TrajectoryRecorder(recording_config.get('directory'),
+                                           chunk_size=recording_config.get('chunk_size', 50),
+                                           window=recording_config.get('window', 10),
+                                           ragged=['efficiency_ids', 'efficiency_values'],
+                                           clear=resume is None)
+        self.uav_positions_over_time = SlotView(self.recorder, 'uav_positions')  # (K, 3) array per time slot
+        self.iot_positions_over_time = SlotView(self.recorder, 'iot_positions')  # (N, 3) array per time slot
+        # Energy efficiency is recorded as per-slot change sets and replayed into (N,) arrays on read
+        self.iot_energy_efficiency_over_time = EfficiencyHistory(self.iot_simulation.device_count,
+                                                                 SlotView(self.recorder, 'efficiency_ids'),
+                                                                 SlotView(self.recorder, 'efficiency_values'))
+
+        # Per-phase timers and counters, exported next to the run when a directory is set
+        instrumentation_config = config.get('instrumentation', {})
+        self.instrumentation = Instrumentation(enabled=instrumentation_config.get('enabled', True),
+                                               profile=instrumentation_config.get('profile', False),
+                                               trace_memory=instrumentation_config.get('trace_memory', False),
+                                               directory=instrumentation_config.get('directory'))
+
+        # Periodic checkpoints, written in the background every `interval` slots
+        checkpoint_config = config.get('checkpoint', {})
+        self.checkpoint_directory = checkpoint_config.get('directory')
+        self.checkpoint_interval = checkpoint_config.get('interval', 0)
+        self.checkpoint_keep = checkpoint_config.get('keep', 2)
+        self.checkpoint_compress = checkpoint_config.get('compress', False)
+
+        # Optional CPU queues with deadlines; without them every task counts as processed at once
+        self.queueing = QueueingEngine(config) if config.get('queueing', {}).get('enabled', False) else None
+
+        self.start_slot = 0
+        if resume is not None:
+            self.load_state_dict(load_checkpoint(resume))
+
+    def state_dict(self):
+        """
+        Everything needed to continue the run bit for bit, as a flat {name: array} dict.
+        Arrays are copies (recorded slots excepted, which never change), so the dict can be
+        written out while the simulation moves on.
+        """
+        state = {'slot': np.array(self.start_slot)}
+        state.update(prefixed('rng', self.random_streams.state_dict()))
+        state.update(prefixed('iot', self.iot_simulation.state_dict()))
+        state.update(prefixed('uav', self.uav_simulation.state_dict()))
+        state.update(prefixed('planning', self.path_planning.state_dict()))
+        state.update(prefixed('energy', self.energy_model.state_dict()))
+        state.update(prefixed('offloading', self.task_offloading.state_dict()))
+        state.update(prefixed('recorder', self.recorder.state_dict()))
+        if self.queueing:
+            state.update(prefixed('queueing', self.queueing.state_dict()))
+        return state
+
+    def load_state_dict(self, state):
+        self.start_slot = int(state['slot'])
+        self.random_streams.load_state_dict(unprefixed('rng', state))
+        self.iot_simulation.load_state_dict(unprefixed('iot', state))
+        self.uav_simulation.load_state_dict(unprefixed('uav', state))
+        self.path_planning.load_state_dict(unprefixed('planning', state))
+        self.energy_model.load_state_dict(unprefixed('energy', state))
+        self.task_offloading.load_state_dict(unprefixed('offloading', state))
+        self.recorder.load_state_dict(unprefixed('recorder', state))
+        if self.queueing:
+            self.queueing.load_state_dict(unprefixed('queueing', state))
 
     def run_simulation(self):
+        instrumentation = self.instrumentation
         self.logger.log("Starting simulation.")
-        for t in range(self.time_slots):
+        instrumentation.start_run()
+        checkpoint_writer = None
+        if self.checkpoint_directory and self.checkpoint_interval:
+            checkpoint_writer = CheckpointWriter(self.checkpoint_directory, keep=self.checkpoint_keep,
+                                                 compress=self.checkpoint_compress)
+        if self.start_slot:
+            self.logger.log(f"Resuming from time slot {self.start_slot + 1}.")
+        for t in range(self.start_slot, self.time_slots):
             self.logger.log(f"Time slot {t+1}/{self.time_slots}")
+            instrumentation.start_slot(t)
 
             # Update IoT devices and UAVs positions
-            self.iot_simulation.update_positions(t)
-            current_iot_positions = [device.position for device in self.iot_simulation.devices]
-            current_iot_ids = [device.device_id for device in self.iot_simulation.devices]
-            current_iot_energy_efficiency = self.task_offloading.task_energy_efficiency.copy()
-
-            self.uav_simulation.update_positions(t, current_iot_positions, current_iot_energy_efficiency)
-
-            # Record positions
-            self.uav_positions_over_time.append([uav.position for uav in self.uav_simulation.uavs])
-            self.iot_positions_over_time.append(current_iot_positions)
-
-            # Generate tasks for IoT devices
-            tasks = self.iot_simulation.generate_tasks(t)
-
-            # Perform task offloading decisions
-            offloading_decisions = self.task_offloading.decide_offloading(tasks, self.uav_simulation.uavs, t)
+            with instrumentation.phase('mobility'):
+                self.iot_simulation.update_positions(t)
+            current_iot_positions = self.iot_simulation.positions
+            current_iot_energy_efficiency = self.task_offloading.task_energy_efficiency
+
+            with instrumentation.phase('uav_planning'):
+                self.uav_simulation.update_positions(t, current_iot_positions, current_iot_energy_efficiency)
+
+            # Generate tasks for IoT devices, as one columnar TaskBatch
+            with instrumentation.phase('task_generation'):
+                tasks = self.iot_simulation.generate_tasks(t)
+
+            candidate_pairs = self.task_offloading.candidate_pairs
+            with instrumentation.phase('offloading'):
+                # Perform task offloading decisions
+                if self.task_offloading.use_batch:
+                    offloading_decisions = self.task_offloading.decide_offloading_batch(tasks, self.uav_simulation.positions, t)
+                else:
+                    offloading_decisions = self.task_offloading.decide_offloading(tasks, self.uav_simulation.uavs, t)
 
-            # Record energy efficiency
-            self.iot_energy_efficiency_over_time.append(self.task_offloading.task_energy_efficiency.copy())
+            instrumentation.count('tasks_generated', len(tasks))
+            if self.task_offloading.use_batch:
+                instrumentation.count('tasks_offloaded', int(offloading_decisions.offloaded.sum()))
+            else:
+                instrumentation.count('tasks_offloaded', sum(decision['offloaded'] for decision in offloading_decisions))
+            instrumentation.count('candidate_pairs', self.task_offloading.candidate_pairs - candidate_pairs)
+
+            # Record positions and this slot's energy efficiency changes
+            with instrumentation.phase('recording'):
+                efficiency_ids, efficiency_values = self.task_offloading.task_energy_efficiency.end_slot()
+                self.task_offloading.metrics.end_slot()
+                self.recorder.record(uav_positions=self.uav_simulation.positions,
+                                     iot_positions=self.iot_simulation.positions,
+                                     efficiency_ids=efficiency_ids,
+                                     efficiency_values=efficiency_values)
 
             # Execute tasks and update energy consumption
-            self.energy_model.update_energy_consumption(offloading_decisions, t)
+            with instrumentation.phase('energy_accounting'):
+                self.energy_model.update_propulsion_energy(self.uav_simulation.last_distances, t)
+                self.energy_model.update_energy_consumption(offloading_decisions, t)
+
+            # Queue this slot's tasks and run every CPU for one slot
+            if self.queueing:
+                with instrumentation.phase('queueing'):
+                    self.queueing.submit(offloading_decisions, t)
+                    slot_queueing = self.queueing.process(t)
+                instrumentation.count('tasks_completed', slot_queueing['completed'])
+                instrumentation.count('tasks_dropped', slot_queueing['dropped'])
+            instrumentation.end_slot()
 
             # Log the number of recorded positions and energy efficiencies
-            self.logger.log(f"Recorded {len(self.uav_positions_over_time[-1])} UAV positions and {len(self.iot_positions_over_time[-1])} IoT positions.")
-            self.logger.log(f"Recorded energy efficiencies for {len(self.iot_energy_efficiency_over_time[-1])} IoT devices.")
-
+            self.logger.log(f"Recorded {len(self.uav_simulation.positions)} UAV positions and {len(self.iot_simulation.positions)} IoT positions.")
+            self.logger.log(f"Recorded energy efficiencies for {len(self.task_offloading.task_energy_efficiency)} IoT devices.")
+
+            self.start_slot = t + 1
+            if checkpoint_writer and self.start_slot % self.checkpoint_interval == 0:
+                with instrumentation.phase('checkpoint'):
+                    checkpoint_writer.submit(self.start_slot, self.state_dict())
+
+        if checkpoint_writer:
+            checkpoint_writer.close()
+        self.recorder.close()
+        self.log_metrics_summary()
+        if self.queueing:
+            summary = self.queueing.summary()
+            self.logger.log(f"Completed {summary['completed']} of {summary['submitted']} tasks, dropped {summary['dropped']}, "
+                            f"{summary['queued']} still queued; mean latency {summary['mean_latency']:.3f}s.")
+        instrumentation.end_run()
         self.logger.log("Simulation completed.")
+        self.logger.close()
 
     def calculate_energy_efficiency(self):
         # Energy Efficiency = System Utility / Total Energy Consumption
@@ -76,108 +201,38 @@ class SimulationManager:
         return total_energy
 
     def calculate_system_utility(self):
-        # System Utility is the total processed data volume
-        system_utility = sum(self.task_offloading.processed_data_volume)
+        # System Utility is the total processed data volume; with queueing, only tasks that met their deadline count
+        if self.queueing:
+            return self.queueing.completed_data_volume
+        system_utility = self.task_offloading.metrics.data_volume
         return system_utility
 
-    def visualize_uav_flight_paths_animation(self, num_devices):
+    def log_metrics_summary(self):
+        summary = self.task_offloading.metrics.summary()
+        efficiency = summary['energy_efficiency']
+        if efficiency['count']:
+            self.logger.log(f"Energy efficiency over {efficiency['count']} tasks: mean {efficiency['mean']:.4e}, "
+                            f"p50 {efficiency['p50']:.4e}, p99 {efficiency['p99']:.4e}; "
+                            f"mean offload ratio {summary['offload_ratio']['mean']:.3f}, "
+                            f"mean UAV load {summary['uav_load']['mean']:.1f} tasks per slot.")
+        assignment = self.task_offloading.assignment
+        if assignment is not None:
+            assignment_summary = assignment.summary()
+            self.logger.log(f"Capacity assignment offloaded {assignment_summary['offloaded_volume']:.1f} Mb against "
+                            f"{assignment_summary['greedy_volume']:.1f} Mb for the greedy baseline "
+                            f"({assignment_summary['gain']:+.1%}); {assignment_summary['iterations']} auction rounds, "
+                            f"greedy fallback in {assignment_summary['fallbacks']} of {assignment_summary['slots']} slots.")
+
+    def visualize_uav_flight_paths_animation(self, num_devices, key=None):
         """
         Creates an animation of UAV flight paths and IoT device locations based on energy efficiency.
         """
-        # Create a subdirectory for the current simulation run
-        animation_dir = f'results/plots/{num_devices}_iot_devices/animations'
-        os.makedirs(animation_dir, exist_ok=True)
-
-        fig, ax = plt.subplots(figsize=(10, 10))
-        ax.set_xlim(0, self.config['simulation']['area_size'])
-        ax.set_ylim(0, self.config['simulation']['area_size'])
-        ax.set_xlabel('X Position (meters)')
-        ax.set_ylabel('Y Position (meters)')
-        ax.set_title('UAV Flight Paths and IoT Device Locations')
-
-        # Initialize scatter plots with empty 2D arrays
-        iot_scatter = ax.scatter([], [], c='blue', s=10, alpha=0.5, label='IoT Devices')
-        uav_scatter = ax.scatter([], [], c='red', marker='^', s=100, label='UAVs')
-        
-        # Assign unique colors to each UAV
-        colors = plt.cm.get_cmap('hsv', self.uav_simulation.uav_count)
-        lines = []
-        for idx, uav in enumerate(self.uav_simulation.uavs):
-            line, = ax.plot([], [], linestyle='--', color=colors(idx), label=f'UAV {uav.uav_id} Path')
-            lines.append(line)
-
-        ax.legend(loc='upper right')
-        ax.grid(True)
-
-        def init():
-            iot_scatter.set_offsets(np.empty((0, 2)))
-            uav_scatter.set_offsets(np.empty((0, 2)))
-            for line in lines:
-                line.set_data([], [])
-            return [iot_scatter, uav_scatter] + lines
-
-        def animate(t):
-            # Update IoT device positions and energy efficiency
-            iot_positions = self.iot_positions_over_time[t]
-            energy_efficiency = self.iot_energy_efficiency_over_time[t]
-            if iot_positions:
-                # Pair each IoT position with its energy efficiency
-                iot_data = list(zip(iot_positions, energy_efficiency.values()))
-                # Sort IoT devices by energy efficiency in descending order
-                sorted_iot = sorted(iot_data, key=lambda x: x[1], reverse=True)
-                # Select top N IoT devices to highlight
-                top_n = 10  # Number of top IoT devices to highlight
-                top_iot = sorted_iot[:top_n]
-                other_iot = sorted_iot[top_n:]
-
-                # Extract coordinates
-                x_top_iot = [pos[0][0] for pos in top_iot]
-                y_top_iot = [pos[0][1] for pos in top_iot]
-                x_other_iot = [pos[0][0] for pos in other_iot]
-                y_other_iot = [pos[0][1] for pos in other_iot]
-
-                # Update scatter plots
-                iot_scatter.set_offsets(np.column_stack((x_other_iot, y_other_iot)))
-                # Remove existing top IoT scatter and add new ones
-                if hasattr(self, 'top_iot_scatter'):
-                    self.top_iot_scatter.remove()
-                top_iot_scatter = ax.scatter(x_top_iot, y_top_iot, c='green', s=20, marker='*', label='Top Energy Efficient IoT Devices')
-                self.top_iot_scatter = top_iot_scatter
-            else:
-                iot_scatter.set_offsets(np.empty((0, 2)))
-                if hasattr(self, 'top_iot_scatter'):
-                    self.top_iot_scatter.remove()
-
-            # Update UAV positions
-            uav_positions = self.uav_positions_over_time[t]
-            if uav_positions:
-                x_uav = [pos[0] for pos in uav_positions]
-                y_uav = [pos[1] for pos in uav_positions]
-                positions = np.column_stack((x_uav, y_uav))
-                uav_scatter.set_offsets(positions)
-            else:
-                uav_scatter.set_offsets(np.empty((0, 2)))
-
-            # Update UAV flight paths
-            for idx, uav in enumerate(self.uav_simulation.uavs):
-                positions = uav.position_history[:t+1]
-                if positions:
-                    x_path = [pos[0] for pos in positions]
-                    y_path = [pos[1] for pos in positions]
-                    lines[idx].set_data(x_path, y_path)
-                else:
-                    lines[idx].set_data([], [])
-
-            # Update the title
-            ax.set_title(f'UAV Flight Paths and IoT Device Locations at Time Slot {t+1}')
-            return [iot_scatter, uav_scatter] + lines
-
-        ani = animation.FuncAnimation(fig, animate, init_func=init,
-                                      frames=self.time_slots, interval=500, blit=True)
-
-        # Save the animation as GIF
-        ani.save(f'{animation_dir}/uav_flight_paths_animation.gif', writer='pillow')
-        # Alternatively, to save as MP4 (requires ffmpeg):
-        # ani.save(f'{animation_dir}/uav_flight_paths_animation.mp4', writer='ffmpeg')
-
-        plt.close()
+        # Imported here so that running a simulation never loads matplotlib
+        from simulation.visualization import render_flight_paths, animation_path
+        rendering_config = self.config.get('rendering', {})
+        fmt = rendering_config.get('format', 'gif')
+        return render_flight_paths(self.recorder, animation_path(num_devices, fmt, key),
+                                   self.config['simulation']['area_size'],
+                                   top_n=rendering_config.get('top_n', 10),
+                                   fmt=fmt,
+                                   processes=rendering_config.get('processes', 1))
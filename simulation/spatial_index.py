@@ -0,0 +1,114 @@
+# simulation/spatial_index.py
+
+import math
+import numpy as np
+
+def concatenated_ranges(starts, lengths):
+    # Concatenation of arange(start, start + length) for every start and length
+    ends = np.cumsum(lengths)
+    return np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+
+class UniformGridIndex:
+    """
+    Uniform grid over UAV positions for fixed-radius coverage lookups.
+    """
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        # CSR form of the grid for query_batch: the UAVs of cell_keys[i] are
+        # cell_uavs[cell_start[i]:cell_start[i + 1]], in ascending order
+        self.origin = np.zeros(2, dtype=np.int64)
+        self.extent = np.zeros(2, dtype=np.int64)
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_start = np.zeros(1, dtype=np.int64)
+        self.cell_uavs = np.empty(0, dtype=np.int64)
+
+    def build(self, positions):
+        # Rebuild the grid from scratch; called once per time slot
+        self.cells = {}
+        for idx, position in enumerate(positions):
+            self.cells.setdefault(self.get_cell(position), []).append(idx)
+
+        cells = self.grid_cells(np.asarray(positions, dtype=float).reshape(-1, 3))
+        if not len(cells):
+            self.cell_keys = np.empty(0, dtype=np.int64)
+            self.cell_start = np.zeros(1, dtype=np.int64)
+            self.cell_uavs = np.empty(0, dtype=np.int64)
+            return
+        self.origin = cells.min(axis=0)
+        self.extent = cells.max(axis=0) - self.origin + 1
+        keys = self.cell_key(cells - self.origin, self.extent[1])
+        self.cell_uavs = np.argsort(keys, kind='stable')
+        self.cell_keys, counts = np.unique(keys[self.cell_uavs], return_counts=True)
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+
+    def get_cell(self, position):
+        x, y = position[0], position[1]
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def grid_cells(self, positions):
+        return np.floor(positions[:, :2] / self.cell_size).astype(np.int64)
+
+    @staticmethod
+    def cell_key(cells, width):
+        # Row-major key of non-negative cell coordinates, ordered like the coordinates
+        return cells[..., 0] * width + cells[..., 1]
+
+    def query(self, position, radius):
+        """
+        Return indices of all UAVs whose grid cell overlaps the square around `position`,
+        in ascending order. The result is a superset of the UAVs within `radius`; callers
+        apply the exact distance check.
+        """
+        reach = max(1, math.ceil(radius / self.cell_size))
+        cx, cy = self.get_cell(position)
+        candidates = []
+        for i in range(cx - reach, cx + reach + 1):
+            for j in range(cy - reach, cy + reach + 1):
+                candidates.extend(self.cells.get((i, j), ()))
+        candidates.sort()
+        return candidates
+
+    def query_batch(self, positions, radius):
+        """
+        Array form of query for (N, 3) positions, as sparse (rows, uavs) pairs: the UAVs that
+        query would return for positions[row], grouped by row in ascending order and ascending
+        within each row. Positions are bucketed by cell, so the neighbouring cells are looked
+        up once per occupied cell rather than once per position.
+        """
+        reach = max(1, math.ceil(radius / self.cell_size))
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        empty = np.empty(0, dtype=np.int64)
+        if not len(self.cell_keys) or not len(positions):
+            return empty, empty
+
+        # Cells relative to the UAV grid, with a margin of `reach` around it; positions
+        # outside the margin have no UAV cell in range
+        cells = self.grid_cells(positions) - self.origin + reach
+        window = self.extent + 2 * reach
+        inside = ((cells >= 0) & (cells < window)).all(axis=1)
+        occupied, inverse = np.unique(self.cell_key(cells[inside], window[1]), return_inverse=True)
+        occupied = np.column_stack((occupied // window[1], occupied % window[1])) - reach
+
+        # UAVs of every occupied cell's neighbourhood
+        steps = np.arange(-reach, reach + 1)
+        offsets = np.stack(np.meshgrid(steps, steps, indexing='ij'), axis=-1).reshape(-1, 2)
+        neighbours = occupied[:, None, :] + offsets[None, :, :]
+        valid = ((neighbours >= 0) & (neighbours < self.extent)).all(axis=2)
+        keys = self.cell_key(np.where(valid[..., None], neighbours, 0), self.extent[1])
+        found = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        valid &= self.cell_keys[found] == keys
+        lengths = np.where(valid, self.cell_start[found + 1] - self.cell_start[found], 0).ravel()
+        uavs = self.cell_uavs[concatenated_ranges(self.cell_start[found].ravel(), lengths)]
+        owner = np.repeat(np.arange(len(occupied)), lengths.reshape(len(occupied), -1).sum(axis=1))
+        uavs = uavs[np.lexsort((uavs, owner))]
+        counts = np.bincount(owner, minlength=len(occupied))
+        starts = np.cumsum(counts) - counts
+
+        # Expand to the positions, in row order
+        row_counts = np.zeros(len(positions), dtype=np.int64)
+        row_starts = np.zeros(len(positions), dtype=np.int64)
+        row_counts[inside] = counts[inverse]
+        row_starts[inside] = starts[inverse]
+        rows = np.repeat(np.arange(len(positions)), row_counts)
+        return rows, uavs[concatenated_ranges(row_starts, row_counts)]
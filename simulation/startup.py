@@ -0,0 +1,69 @@
+# simulation/startup.py
+
+import json
+import subprocess
+import sys
+import time
+
+# Modules a batch worker imports to run simulations and sweeps; none of them may load matplotlib
+CORE_MODULES = (
+    'simulation.config',
+    'simulation.simulation_manager',
+    'simulation.replicas',
+    'simulation.sharding',
+    'simulation.sweep',
+)
+
+# Imported only when rendering or plotting
+VISUALIZATION_MODULES = (
+    'simulation.visualization',
+)
+
+HEAVY_MODULES = ('matplotlib', 'scipy', 'pandas')
+
+IMPORT_PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "heavy": sorted(name for name in {heavy!r} if name in sys.modules)}}))
+'''
+
+def measure_import(module, repeats=5):
+    """
+    Import `module` in `repeats` fresh interpreters. Returns the best and mean import time
+    and the heavy modules (HEAVY_MODULES) that the import pulled in.
+    """
+    times = []
+    heavy = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        times.append(result['seconds'])
+        heavy = result['heavy']
+    return {'best': min(times), 'mean': sum(times) / len(times), 'heavy_modules': heavy}
+
+def measure_command(arguments, repeats=5):
+    # Best and mean wall time of a fresh process running `arguments`, interpreter startup included
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(arguments, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'mean': sum(times) / len(times)}
+
+def measure_startup(repeats=5):
+    """
+    Interpreter baseline, CLI startup (`python -m simulation --help`) and the import time of
+    every core and visualization module, each in fresh processes.
+    """
+    return {
+        'interpreter': measure_command([sys.executable, '-c', 'pass'], repeats),
+        'cli': measure_command([sys.executable, '-m', 'simulation', '--help'], repeats),
+        'imports': {module: measure_import(module, repeats) for module in CORE_MODULES + VISUALIZATION_MODULES}
+    }
+
+def check_headless(report):
+    # Core modules that load a heavy module when imported
+    return [module for module in CORE_MODULES if report['imports'][module]['heavy_modules']]
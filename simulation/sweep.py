@@ -0,0 +1,231 @@
+# simulation/sweep.py
+
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation.simulation_manager import SimulationManager
+from simulation.sharding import ShardedSimulation
+from simulation.replicas import ReplicaSimulation
+from simulation.config import as_config
+from simulation.recorder import TrajectoryReader, MANIFEST_FILE
+from simulation.result_cache import ResultCache, result_key
+
+METRIC_COLUMNS = ['energy_efficiency', 'energy_consumption', 'system_utility', 'runtime', 'drop_ratio', 'mean_latency',
+                  'replicas', 'energy_efficiency_ci', 'energy_consumption_ci', 'system_utility_ci',
+                  'offloaded_volume', 'greedy_offloaded_volume', 'cached']
+
+# Base config of a pool worker, sent once per worker process rather than once per point
+_worker_base_config = None
+
+def set_worker_base_config(base_config):
+    global _worker_base_config
+    _worker_base_config = base_config
+
+def run_worker_point(index, overrides):
+    return run_point(_worker_base_config, index, overrides)
+
+def render_worker_point(index, overrides, name, key):
+    return render_point(_worker_base_config, index, overrides, name, key)
+
+def expand_grid(grid, seeds=(0,)):
+    """
+    Expand a grid of dotted config overrides, e.g. {'iot.device_count': [300, 400]},
+    into one override dict per sweep point. Every point is run once per seed.
+    """
+    keys = list(grid.keys())
+    points = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        for seed in seeds:
+            overrides = dict(zip(keys, values))
+            overrides['simulation.seed'] = seed
+            points.append(overrides)
+    return points
+
+def apply_overrides(base_config, overrides):
+    # Copies only the sections the overrides touch; the base config is never modified
+    return as_config(base_config).override(overrides)
+
+def point_log_file(base_config, index):
+    log_dir = os.path.join(os.path.dirname(base_config['log_file']), 'sweep')
+    os.makedirs(log_dir, exist_ok=True)
+    return os.path.join(log_dir, f'point_{index}.log')
+
+def animation_keys(overrides, names):
+    """
+    Suffixes that tell apart the animations of sweep points sharing a name: the overrides
+    that differ between those points, e.g. 'seed1' or 'uav.count-6_seed1'. A point whose
+    name is unique gets None and keeps the plain animation name.
+    """
+    groups = {}
+    for index, name in enumerate(names):
+        groups.setdefault(name, []).append(index)
+    keys = [None] * len(names)
+    for indices in groups.values():
+        if len(indices) < 2:
+            continue
+        candidates = dict.fromkeys(key for index in indices for key in overrides[index])
+        differing = [key for key in candidates
+                     if len({json.dumps(overrides[index].get(key), default=str) for index in indices}) > 1]
+        for index in indices:
+            parts = (('seed' if key == 'simulation.seed' else f'{key}-') + str(overrides[index].get(key))
+                     for key in differing)
+            keys[index] = '_'.join(parts).replace(os.sep, '-')
+    return keys
+
+def row_overrides(row):
+    # The overrides of the point a results row came from
+    return {key: row[key] for key in row if key != 'point' and key not in METRIC_COLUMNS}
+
+def build_point(base_config, index, overrides):
+    """
+    Resolve the config of one sweep point. The simulation seeds its own random streams from
+    simulation.seed, so a point gives the same results in any worker and in any order.
+    """
+    config = apply_overrides(base_config, overrides)
+    # Each point logs to its own file so parallel workers never share one
+    point_overrides = {'log_file': point_log_file(base_config, index), 'logging.quiet': True}
+    # Per-point output directories for recorded trajectories, instrumentation and checkpoints
+    for section in ('recording', 'instrumentation', 'checkpoint'):
+        directory = config.get(section, {}).get('directory')
+        if directory:
+            point_overrides[f'{section}.directory'] = os.path.join(directory, f'point_{index}')
+    return config.override(point_overrides)
+
+def create_simulation(config):
+    # The simulation class that the config asks for; Config rejects settings these classes would ignore
+    if config.get('sharding', {}).get('workers', 1) > 1:
+        return ShardedSimulation(config)
+    if config.get('replicas', {}).get('count', 1) > 1:
+        # Seeds simulation.seed .. seed + count - 1 in one batched run; metrics are replica means
+        return ReplicaSimulation(config)
+    return SimulationManager(config)
+
+def run_point(base_config, index, overrides):
+    """
+    Run one sweep point, or take its metrics and trajectories from the result cache when
+    the same config, seed and source have been run before.
+    """
+    config = build_point(base_config, index, overrides)
+    recording_directory = config.get('recording', {}).get('directory')
+    cache = ResultCache.from_config(config)
+    if cache:
+        key = result_key(config)
+        metrics = cache.get(key, recording_directory)
+        if metrics is not None:
+            row = {'point': index}
+            row.update(overrides)
+            row.update(metrics)
+            row['cached'] = True
+            return row
+
+    start = time.perf_counter()
+    sim_manager = create_simulation(config)
+    sim_manager.run_simulation()
+    row = {'point': index}
+    row.update(overrides)
+    row['energy_efficiency'] = sim_manager.calculate_energy_efficiency()
+    row['energy_consumption'] = sim_manager.calculate_total_energy_consumption()
+    row['system_utility'] = sim_manager.calculate_system_utility()
+    if isinstance(sim_manager, ReplicaSimulation):
+        summary = sim_manager.summary()
+        row['replicas'] = sim_manager.replica_count
+        for metric in ('energy_efficiency', 'energy_consumption', 'system_utility'):
+            row[f'{metric}_ci'] = summary[metric]['half_width']
+    if getattr(sim_manager, 'queueing', None):
+        queueing_summary = sim_manager.queueing.summary()
+        row['drop_ratio'] = queueing_summary['drop_ratio']
+        row['mean_latency'] = queueing_summary['mean_latency']
+    assignment = getattr(getattr(sim_manager, 'task_offloading', None), 'assignment', None)
+    if assignment is not None:
+        row['offloaded_volume'] = assignment.offloaded_volume
+        row['greedy_offloaded_volume'] = assignment.greedy_volume
+    row['runtime'] = time.perf_counter() - start
+    if cache:
+        cache.put(key, {column: row[column] for column in METRIC_COLUMNS if column in row}, recording_directory)
+    row['cached'] = False
+    return row
+
+def render_point(base_config, index, overrides, name, key=None):
+    """
+    Render one sweep point's flight path animation from the trajectories it recorded,
+    or re-run the point from its seed when nothing was recorded to disk. Returns None for
+    points that cannot be rendered, see render_run.
+    """
+    return render_run(build_point(base_config, index, overrides), name, key)
+
+def render_run(config, name, key=None):
+    """
+    Render the flight path animation of a run from the trajectories it recorded under
+    recording.directory, or re-run it from its seed when nothing was recorded there.
+    `key` goes into the animation path, see animation_path.
+    Sharded and replica runs record no trajectories and SimulationManager cannot replay
+    them, so they are skipped and None is returned.
+    """
+    from simulation.visualization import render_flight_paths, animation_path
+
+    if config.get('sharding', {}).get('workers', 1) > 1 or config.get('replicas', {}).get('count', 1) > 1:
+        return None
+
+    directory = config.get('recording', {}).get('directory')
+    if directory and os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        rendering_config = config.get('rendering', {})
+        fmt = rendering_config.get('format', 'gif')
+        render_flight_paths(TrajectoryReader(directory), animation_path(name, fmt, key),
+                            config['simulation']['area_size'],
+                            top_n=rendering_config.get('top_n', 10),
+                            fmt=fmt)
+        return name
+    sim_manager = SimulationManager(config)
+    sim_manager.run_simulation()
+    sim_manager.visualize_uav_flight_paths_animation(name, key)
+    return name
+
+def run_sweep(base_config, grid, seeds=(0,), processes=None):
+    """
+    Run every point of the grid on a process pool and return the merged results table,
+    one row per point in grid order. `processes=1` runs the points in this process.
+    """
+    base_config = as_config(base_config)
+    points = expand_grid(grid, seeds)
+    indices = range(len(points))
+    if processes == 1:
+        return [run_point(base_config, index, overrides) for index, overrides in zip(indices, points)]
+    # Each task carries only its point's overrides
+    with ProcessPoolExecutor(max_workers=processes, initializer=set_worker_base_config, initargs=(base_config,)) as executor:
+        return list(executor.map(run_worker_point, indices, points))
+
+def render_sweep(base_config, rows, name_key='iot.device_count', processes=None):
+    """
+    Render animations for finished sweep rows as a separate step, named after `name_key`.
+    Returns the rendered names, with None for points that render_point skipped.
+    """
+    from simulation.visualization import animation_path
+
+    base_config = as_config(base_config)
+    overrides = [row_overrides(row) for row in rows]
+    names = [row[name_key] for row in rows]
+    keys = animation_keys(overrides, names)
+    # Points served from the result cache keep the animation rendered when they first ran
+    fmt = base_config.get('rendering', {}).get('format', 'gif')
+    pending = [position for position, row in enumerate(rows)
+               if not (row.get('cached') and os.path.exists(animation_path(names[position], fmt, keys[position])))]
+    indices = [rows[position]['point'] for position in pending]
+    overrides, names, keys = ([values[position] for position in pending] for values in (overrides, names, keys))
+    if processes == 1:
+        return [render_point(base_config, *args) for args in zip(indices, overrides, names, keys)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=set_worker_base_config, initargs=(base_config,)) as executor:
+        return list(executor.map(render_worker_point, indices, overrides, names, keys))
+
+def write_results_table(rows, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,51 @@
+# simulation/task_batch.py
+
+import numpy as np
+
+class TaskBatch:
+    """
+    Columnar batch of the tasks generated in one time slot, one array per task field.
+    Fields are read as batch['data_size'], like the keys of a task dict, so the energy
+    equations apply to a whole batch at once. Iterating yields one task dict per task
+    for code that still expects dicts.
+    """
+    FIELDS = ('device_id', 'position', 'data_size', 'computation_intensity', 'deadline')
+    __slots__ = FIELDS
+
+    def __init__(self, device_id, position, data_size, computation_intensity, deadline):
+        self.device_id = device_id
+        self.position = position  # (T, 3)
+        self.data_size = data_size  # in Megabits
+        self.computation_intensity = computation_intensity  # cycles per bit
+        self.deadline = deadline
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty(0), np.empty(0), np.empty(0, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.device_id)
+
+    def __getitem__(self, field):
+        return getattr(self, field)
+
+    def select(self, index):
+        """
+        Sub-batch from a boolean mask or integer index array.
+        """
+        return TaskBatch(*(getattr(self, field)[index] for field in self.FIELDS))
+
+    def __iter__(self):
+        for device_id, position, data_size, computation_intensity, deadline in zip(
+                self.device_id.tolist(),
+                self.position.tolist(),
+                self.data_size.tolist(),
+                self.computation_intensity.tolist(),
+                self.deadline.tolist()):
+            yield {
+                'device_id': device_id,
+                'position': tuple(position),
+                'data_size': data_size,
+                'computation_intensity': computation_intensity,
+                'deadline': deadline
+            }
@@ -1,27 +1,141 @@
 # simulation/task_offloading.py
 
+import numpy as np
+from simulation.spatial_index import UniformGridIndex
+from simulation.efficiency_tracker import EfficiencyTracker
+from simulation.metrics import MetricsAggregator
+from simulation.assignment import CapacityAssignment
+from simulation.checkpoint import prefixed, unprefixed
+from utils.constants import BITS_PER_MEGABIT
+
+def segment_argmax(values, rows):
+    """
+    Argmax of `values` within each run of equal, ascending `rows`: returns the distinct rows
+    and, for each, the index of its first maximal value, as np.argmax would pick it.
+    """
+    if not len(rows):
+        return rows, rows
+    starts = np.flatnonzero(np.diff(rows, prepend=rows[0] - 1))
+    lengths = np.diff(starts, append=len(rows))
+    maxima = np.repeat(np.maximum.reduceat(values, starts), lengths)
+    positions = np.where(values == maxima, np.arange(len(rows)), len(rows))
+    return rows[starts], np.minimum.reduceat(positions, starts)
+
+class OffloadingBatch:
+    """
+    Array form of one time slot's offloading decisions.
+    """
+    def __init__(self, tasks, uav_id, offloaded, energy_efficiency, data_rate):
+        self.tasks = tasks  # TaskBatch
+        self.device_id = tasks.device_id
+        self.uav_id = uav_id  # -1 where the task is executed locally
+        self.offloaded = offloaded
+        self.energy_efficiency = energy_efficiency
+        self.data_rate = data_rate  # Device-to-UAV rate, NaN where the task is executed locally
+        self.candidate_pairs = 0  # Task-UAV pairs evaluated for the decisions
+        self.pairs = None  # Covered task-UAV pairs, when requested from select_offloading
+        self.local_efficiency = None
+
+    def __len__(self):
+        return len(self.device_id)
+
+    def to_records(self):
+        """
+        Expand into the same decision dicts that decide_offloading returns.
+        """
+        records = []
+        for task, uav_id, offloaded, energy_efficiency, data_rate in zip(
+                self.tasks, self.uav_id.tolist(), self.offloaded.tolist(), self.energy_efficiency.tolist(), self.data_rate.tolist()):
+            records.append({
+                'device_id': task['device_id'],
+                'uav_id': uav_id if offloaded else None,
+                'task': task,
+                'offloaded': offloaded,
+                'energy_efficiency': energy_efficiency,
+                'data_rate': data_rate if offloaded else None
+            })
+        return records
+
 class TaskOffloading:
     def __init__(self, config, energy_model, communication_model):
         self.config = config
         self.energy_model = energy_model
         self.communication_model = communication_model
-        self.processed_data_volume = []
-        self.task_energy_efficiency = {}  # **Initialize this attribute**
+        self.metrics = MetricsAggregator(config['uav']['count'], config.get('metrics', {}).get('series_capacity', 1024),
+                                         config.get('metrics', {}).get('relative_accuracy', 0.01))
+        self.task_energy_efficiency = EfficiencyTracker(config['iot']['device_count'])
+        self.candidate_pairs = 0  # Task-UAV pairs evaluated so far
+
+        # Optional grid index over UAV positions for coverage lookups
+        self.use_spatial_index = config.get('offloading', {}).get('spatial_index', False)
+        self.spatial_index = UniformGridIndex(config['uav']['coverage_radius'])
+
+        # Batched decision kernel; task-UAV pairs are evaluated in chunks of at most this many
+        self.use_batch = config.get('offloading', {}).get('batch', False)
+        self.batch_pair_limit = config.get('offloading', {}).get('batch_pair_limit', 1 << 20)
+
+        # Optional slot-wide assignment under per-UAV compute and airtime capacities
+        self.assignment = None
+        if config.get('offloading', {}).get('assignment', 'greedy') == 'capacity':
+            self.assignment = CapacityAssignment(config)
+
+    @property
+    def processed_data_volume(self):
+        # Total data volume of all decided tasks, kept as a running sum by the metrics
+        return self.metrics.data_volume
+
+    def state_dict(self):
+        state = {'candidate_pairs': np.array(self.candidate_pairs)}
+        state.update(prefixed('efficiency', self.task_energy_efficiency.state_dict()))
+        state.update(prefixed('metrics', self.metrics.state_dict()))
+        if self.assignment is not None:
+            state.update(prefixed('assignment', self.assignment.state_dict()))
+        return state
+
+    def load_state_dict(self, state):
+        self.candidate_pairs = int(state['candidate_pairs'])
+        self.task_energy_efficiency.load_state_dict(unprefixed('efficiency', state))
+        self.metrics.load_state_dict(unprefixed('metrics', state))
+        if self.assignment is not None:
+            self.assignment.load_state_dict(unprefixed('assignment', state))
 
     def decide_offloading(self, tasks, uavs, time_slot):
+        if self.assignment is not None:
+            # The capacity assignment works on the whole slot at once, so it always runs batched
+            return self.decide_offloading_batch(tasks, [uav.position for uav in uavs], time_slot).to_records()
         offloading_decisions = []
+        device_ids = []
+        efficiencies = []
+        data_sizes = []
+        uav_ids = []
+        coverage_radius = self.config['uav']['coverage_radius']
+        uav_positions = [uav.position for uav in uavs]
+        all_uav_indices = range(len(uavs))
+        if self.use_spatial_index:
+            # Rebuild the index once per time slot
+            self.spatial_index.build(uav_positions)
+
         for task in tasks:
             best_uav = None
+            best_data_rate = None
             max_energy_efficiency = -float('inf')
-            for uav in uavs:
+            if self.use_spatial_index:
+                candidate_indices = self.spatial_index.query(task['position'], coverage_radius)
+            else:
+                candidate_indices = all_uav_indices
+            self.candidate_pairs += len(candidate_indices)
+            for idx in candidate_indices:
+                uav = uavs[idx]
                 # Check if the UAV can cover the IoT device
-                distance = self.communication_model.calculate_distance(task['position'], uav.position)
-                if distance <= self.config['uav']['coverage_radius']:
-                    # Calculate energy efficiency
-                    energy_efficiency = self.calculate_energy_efficiency(task, uav)
+                distance = self.communication_model.calculate_distance(task['position'], uav_positions[idx])
+                if distance <= coverage_radius:
+                    # Calculate energy efficiency at this pair's data rate
+                    data_rate = float(self.communication_model.calculate_data_rates(distance))
+                    energy_efficiency = self.calculate_energy_efficiency(task, uav, data_rate)
                     if energy_efficiency > max_energy_efficiency:
                         max_energy_efficiency = energy_efficiency
                         best_uav = uav
+                        best_data_rate = data_rate
 
             if best_uav:
                 # Offload to best_uav
@@ -30,10 +144,12 @@ class TaskOffloading:
                     'uav_id': best_uav.uav_id,
                     'task': task,
                     'offloaded': True,
-                    'energy_efficiency': max_energy_efficiency  # Store energy efficiency
+                    'energy_efficiency': max_energy_efficiency,  # Store energy efficiency
+                    'data_rate': best_data_rate
                 }
-                self.processed_data_volume.append(task['data_size'])
-                self.task_energy_efficiency[task['device_id']] = max_energy_efficiency
+                uav_ids.append(best_uav.uav_id)
+                device_ids.append(task['device_id'])
+                efficiencies.append(max_energy_efficiency)
             else:
                 # Execute locally
                 energy_efficiency = self.calculate_energy_efficiency(task, None)  # Energy efficiency when not offloaded
@@ -42,23 +158,190 @@ class TaskOffloading:
                     'uav_id': None,
                     'task': task,
                     'offloaded': False,
-                    'energy_efficiency': energy_efficiency
+                    'energy_efficiency': energy_efficiency,
+                    'data_rate': None
                 }
-                self.processed_data_volume.append(task['data_size'])
-                self.task_energy_efficiency[task['device_id']] = energy_efficiency
+                uav_ids.append(-1)
+                device_ids.append(task['device_id'])
+                efficiencies.append(energy_efficiency)
+            data_sizes.append(task['data_size'])
             offloading_decisions.append(decision)
+        self.task_energy_efficiency.assign(device_ids, efficiencies)
+        uav_ids = np.array(uav_ids, dtype=np.int64)
+        self.metrics.record_tasks(data_sizes, efficiencies, uav_ids >= 0, uav_ids)
         return offloading_decisions
 
-    def calculate_energy_efficiency(self, task, uav):
+    def calculate_energy_efficiency(self, task, uav, data_rate=None):
         # Implement the energy efficiency calculation as per Equation (11)
         # Energy efficiency = Utility / Total Energy Consumption
         utility = task['data_size']
         if uav:
             uav_energy = self.energy_model.calculate_uav_computation_energy(task)
-            iot_energy = self.energy_model.calculate_iot_transmission_energy(task)
+            iot_energy = self.energy_model.calculate_iot_transmission_energy(task, data_rate)
             total_energy = uav_energy + iot_energy
         else:
             # If not offloaded, only IoT computation energy is considered
             total_energy = self.energy_model.calculate_iot_computation_energy(task)
         energy_efficiency = utility / total_energy if total_energy > 0 else 0
         return energy_efficiency
+
+    def decide_offloading_batch(self, tasks, uav_positions, time_slot):
+        """
+        Vectorized equivalent of decide_offloading.
+        `tasks` is a TaskBatch and `uav_positions` an (K, 3) array.
+        """
+        uav_positions = np.asarray(uav_positions, dtype=float).reshape(-1, 3)
+        if self.assignment is not None:
+            batch = self.assign_offloading(self.select_offloading(tasks, uav_positions, collect_pairs=True))
+        else:
+            batch = self.select_offloading(tasks, uav_positions)
+        self.candidate_pairs += batch.candidate_pairs
+        self.task_energy_efficiency.assign(tasks['device_id'], batch.energy_efficiency)
+        self.metrics.record_tasks(tasks['data_size'], batch.energy_efficiency, batch.offloaded, batch.uav_id)
+        return batch
+
+    def select_offloading(self, tasks, uav_positions, collect_pairs=False):
+        """
+        The decision kernel of decide_offloading_batch, without recording anything.
+        `uav_positions` is a (K, 3) array, or (T, K, 3) with its own K UAVs for every task.
+        With `collect_pairs`, the batch also carries every covered task-UAV pair in `pairs`.
+        With offloading.spatial_index and (K, 3) positions, only the pairs in neighbouring
+        grid cells are evaluated, as sparse pair arrays rather than (T, K) arrays, giving the
+        same decisions.
+        """
+        uav_positions = np.asarray(uav_positions, dtype=float)
+        per_task_uavs = uav_positions.ndim == 3
+        if not per_task_uavs:
+            uav_positions = uav_positions.reshape(-1, 3)
+        uav_count = uav_positions.shape[-2]
+        task_count = len(tasks)
+        coverage_radius = self.config['uav']['coverage_radius']
+
+        # Efficiency when executed locally, and the UAV's computation energy if offloaded
+        local_efficiency = self.calculate_energy_efficiency_batch(tasks, offloaded=False)
+        uav_energy = self.energy_model.calculate_uav_computation_energy(tasks)
+
+        uav_id = np.full(task_count, -1, dtype=np.int64)
+        offloaded = np.zeros(task_count, dtype=bool)
+        offload_efficiency = np.zeros(task_count)
+        data_rate = np.full(task_count, np.nan)
+        pair_chunks = []
+        candidate_pairs = 0
+        use_spatial_index = self.use_spatial_index and not per_task_uavs
+        if use_spatial_index:
+            self.spatial_index.build(uav_positions)
+        chunk = max(1, self.batch_pair_limit // max(1, uav_count))
+        for start in range(0, task_count if uav_count else 0, chunk):
+            stop = min(start + chunk, task_count)
+            if use_spatial_index:
+                # Sparse covered pairs from neighbouring grid cells, grouped by task
+                pair_rows, pair_uavs, rates, pair_efficiency, evaluated = self.evaluate_indexed_pairs(
+                    tasks, uav_energy, start, stop, uav_positions)
+                candidate_pairs += evaluated
+                if collect_pairs:
+                    pair_chunks.append((pair_rows + start, pair_uavs, rates, pair_efficiency))
+                task_rows, best = segment_argmax(pair_efficiency, pair_rows)
+                task_rows += start
+                uav_id[task_rows] = pair_uavs[best]
+                offloaded[task_rows] = True
+                offload_efficiency[task_rows] = pair_efficiency[best]
+                data_rate[task_rows] = rates[best]
+                continue
+
+            rows = np.arange(stop - start)
+            chunk_uavs = uav_positions[start:stop] if per_task_uavs else uav_positions
+            distances = self.communication_model.calculate_distances(tasks['position'][start:stop], chunk_uavs)
+
+            # Efficiency of every task-UAV pair at that pair's data rate, as in calculate_energy_efficiency
+            rates = self.communication_model.calculate_data_rates(distances)
+            data_size = tasks['data_size'][start:stop, None]
+            total_energy = uav_energy[start:stop, None] + self.energy_model.calculate_transmission_energy(data_size, rates)
+            pair_efficiency = np.zeros(total_energy.shape)
+            np.divide(data_size, total_energy, out=pair_efficiency, where=total_energy > 0)
+            candidate_pairs += distances.size
+            coverage = distances <= coverage_radius
+            if collect_pairs:
+                # Row-major, so the pairs come out grouped by task
+                pair_rows, pair_uavs = np.nonzero(coverage)
+                pair_chunks.append((pair_rows + start, pair_uavs, rates[pair_rows, pair_uavs],
+                                    pair_efficiency[pair_rows, pair_uavs]))
+
+            # Uncovered pairs are masked out; argmax keeps the first UAV on ties
+            pair_efficiency[~coverage] = -np.inf
+            best = np.argmax(pair_efficiency, axis=1)
+            uav_id[start:stop] = best
+            offloaded[start:stop] = coverage.any(axis=1)
+            offload_efficiency[start:stop] = pair_efficiency[rows, best]
+            data_rate[start:stop] = rates[rows, best]
+        uav_id[~offloaded] = -1
+        data_rate[~offloaded] = np.nan
+
+        energy_efficiency = np.where(offloaded, offload_efficiency, local_efficiency)
+        batch = OffloadingBatch(tasks, uav_id, offloaded, energy_efficiency, data_rate)
+        batch.candidate_pairs = candidate_pairs
+        if collect_pairs:
+            columns = zip(*pair_chunks) if pair_chunks else [[np.empty(0, dtype=np.int64)]] * 2 + [[np.empty(0)]] * 2
+            batch.pairs = dict(zip(('task', 'uav', 'data_rate', 'energy_efficiency'),
+                                   (np.concatenate(column) for column in columns)))
+            batch.local_efficiency = local_efficiency
+        return batch
+
+    def evaluate_indexed_pairs(self, tasks, uav_energy, start, stop, uav_positions):
+        """
+        Rates and efficiencies of tasks start:stop against (K, 3) UAV positions, computed only
+        for the pairs that the spatial index returns and that pass the exact coverage check.
+        Returns the covered pairs' task rows (relative to `start`) and UAVs, grouped by task
+        with UAVs ascending, their rates and efficiencies, and the number of pairs evaluated.
+        """
+        positions = tasks['position'][start:stop]
+        coverage_radius = self.config['uav']['coverage_radius']
+        rows, uavs = self.spatial_index.query_batch(positions, coverage_radius)
+        # Same arithmetic as calculate_distances, pair by pair and one coordinate at a time
+        squared = np.zeros(len(rows))
+        for axis in range(3):
+            squared += (positions[:, axis][rows] - uav_positions[:, axis][uavs])**2
+        distances = np.sqrt(squared)
+        covered = distances <= coverage_radius
+        evaluated = len(rows)
+        rows, uavs, distances = rows[covered], uavs[covered], distances[covered]
+
+        rates = self.communication_model.calculate_data_rates(distances)
+        data_size = tasks['data_size'][start:stop][rows]
+        total_energy = uav_energy[start:stop][rows] + self.energy_model.calculate_transmission_energy(data_size, rates)
+        efficiency = np.zeros(len(rows))
+        np.divide(data_size, total_energy, out=efficiency, where=total_energy > 0)
+        return rows, uavs, rates, efficiency, evaluated
+
+    def assign_offloading(self, batch):
+        """
+        Re-decide a batch from select_offloading(collect_pairs=True) with the capacity
+        assignment. Tasks that find no capacity on a covering UAV are executed locally.
+        """
+        tasks = batch.tasks
+        pairs = batch.pairs
+        cycles = tasks['data_size'] * BITS_PER_MEGABIT * tasks['computation_intensity']
+        chosen = self.assignment.assign(tasks['data_size'], cycles, pairs)
+        offloaded = chosen >= 0
+        pair = chosen[offloaded]
+        uav_id = np.full(len(tasks), -1, dtype=np.int64)
+        uav_id[offloaded] = pairs['uav'][pair]
+        data_rate = np.full(len(tasks), np.nan)
+        data_rate[offloaded] = pairs['data_rate'][pair]
+        energy_efficiency = batch.local_efficiency.copy()
+        energy_efficiency[offloaded] = pairs['energy_efficiency'][pair]
+        assigned = OffloadingBatch(tasks, uav_id, offloaded, energy_efficiency, data_rate)
+        assigned.candidate_pairs = batch.candidate_pairs
+        return assigned
+
+    def calculate_energy_efficiency_batch(self, tasks, offloaded):
+        # Same Equation (11) as calculate_energy_efficiency, over arrays of tasks
+        utility = tasks['data_size']
+        if offloaded:
+            uav_energy = self.energy_model.calculate_uav_computation_energy(tasks)
+            iot_energy = self.energy_model.calculate_iot_transmission_energy(tasks)
+            total_energy = uav_energy + iot_energy
+        else:
+            total_energy = self.energy_model.calculate_iot_computation_energy(tasks)
+        energy_efficiency = np.zeros(len(utility))
+        np.divide(utility, total_energy, out=energy_efficiency, where=total_energy > 0)
+        return energy_efficiency
@@ -1,33 +1,70 @@
 # simulation/uav_simulation.py
 
 from simulation.path_planning import PathPlanning
-import random
+import collections
+import numpy as np
+from simulation.recorder import history_window
+from simulation.seeding import RandomStreams
 
 class UAV:
-    def __init__(self, uav_id, initial_position):
+    """
+    Object-style view onto one row of the UAVSimulation state arrays.
+    """
+    def __init__(self, simulation, uav_id):
+        self._simulation = simulation
         self.uav_id = uav_id
-        self.position = initial_position
-        self.position_history = [initial_position]  # Record initial position
+
+    @property
+    def position(self):
+        return tuple(self._simulation.positions[self.uav_id].tolist())
+
+    @position.setter
+    def position(self, value):
+        self._simulation.positions[self.uav_id] = value
+
+    @property
+    def position_history(self):
+        return [tuple(positions[self.uav_id].tolist()) for positions in self._simulation.position_history]
 
 class UAVSimulation:
-    def __init__(self, config, path_planning):
+    def __init__(self, config, path_planning, streams=None):
         self.uav_count = config['uav']['count']
-        self.uavs = [
-            UAV(
-                uav_id=i,
-                initial_position=(
-                    random.uniform(0, config['simulation']['area_size']),
-                    random.uniform(0, config['simulation']['area_size']),
-                    config['uav']['flying_height']
-                )
-            )
-            for i in range(self.uav_count)
-        ]
+        streams = streams or RandomStreams.from_config(config)
+
+        # Structure-of-arrays state, one row per UAV
+        self.positions = np.empty((self.uav_count, 3))
+        self.positions[:, :2] = streams.generator('uav_placement').uniform(0, config['simulation']['area_size'], size=(self.uav_count, 2))
+        self.positions[:, 2] = config['uav']['flying_height']
+        # Record initial positions; always bounded to the recording window
+        self.position_history = collections.deque([self.positions.copy()], maxlen=history_window(config))
+
+        self.last_distances = np.zeros(self.uav_count)  # Distance flown by each UAV in the last slot
+
+        self.uavs = [UAV(self, uav_id=i) for i in range(self.uav_count)]
         self.path_planning = path_planning
 
+    def state_dict(self):
+        # Copies of the UAV state, for checkpoints
+        return {
+            'positions': self.positions.copy(),
+            'position_history': np.stack(self.position_history),
+            'last_distances': self.last_distances.copy()
+        }
+
+    def load_state_dict(self, state):
+        self.positions[:] = state['positions']
+        self.position_history.clear()
+        self.position_history.extend(state['position_history'])
+        self.last_distances = state['last_distances'].copy()
+
+    def get_positions(self):
+        return [tuple(position) for position in self.positions.tolist()]
+
     def update_positions(self, time_slot, iot_positions, iot_energy_efficiency):
-        for uav in self.uavs:
-            # Update UAV positions based on the path planning algorithm
-            new_position = self.path_planning.calculate_next_position(uav, time_slot, iot_positions, iot_energy_efficiency)
-            uav.position = new_position
-            uav.position_history.append(new_position)  # Record the new position
+        # Update UAV positions based on the path planning algorithm
+        # (K, 3) even when there are no UAVs and the planner returns an empty list
+        new_positions = np.asarray(self.path_planning.plan(self.uavs, time_slot, iot_positions, iot_energy_efficiency),
+                                   dtype=float).reshape(-1, 3)
+        self.last_distances = np.linalg.norm(new_positions - self.positions, axis=1)
+        self.positions[:] = new_positions
+        self.position_history.append(self.positions.copy())  # Record the new positions
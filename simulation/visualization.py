@@ -0,0 +1,143 @@
+# simulation/visualization.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import matplotlib.animation as animation
+import numpy as np
+
+from simulation.efficiency_tracker import EfficiencyHistory
+from simulation.recorder import TrajectoryReader, SlotView
+
+FORMAT_EXTENSIONS = {'gif': '.gif', 'mp4': '.mp4', 'png': ''}
+
+def animation_path(name, fmt='gif', key=None):
+    """
+    Output path of the flight path animation for a run; a directory of frames for 'png'.
+    `key` tells apart runs that share a name, e.g. 'seed1' for sweep points with different seeds.
+    """
+    animation_dir = f'results/plots/{name}_iot_devices/animations'
+    suffix = f'_{key}' if key else ''
+    if fmt == 'png':
+        return os.path.join(animation_dir, 'frames' + suffix)
+    return os.path.join(animation_dir, 'uav_flight_paths_animation' + suffix + FORMAT_EXTENSIONS[fmt])
+
+class FlightPathRenderer:
+    """
+    Draws UAV flight paths and IoT device locations from recorded trajectories.
+    `source` is a TrajectoryRecorder or TrajectoryReader. All artists are created once
+    and only their data changes from frame to frame.
+    """
+    def __init__(self, source, area_size, top_n=10):
+        self.source = source
+        self.area_size = area_size
+        self.top_n = top_n  # Number of top IoT devices to highlight
+        self.frame_count = len(source)
+        self.uav_paths = source.series('uav_positions')  # (slots, UAVs, 3)
+        device_count = len(source.get(0, 'iot_positions'))
+        self.energy_efficiency = EfficiencyHistory(device_count,
+                                                   SlotView(source, 'efficiency_ids'),
+                                                   SlotView(source, 'efficiency_values'))
+        self.fig = None
+
+    def setup(self):
+        self.fig, self.ax = plt.subplots(figsize=(10, 10))
+        ax = self.ax
+        ax.set_xlim(0, self.area_size)
+        ax.set_ylim(0, self.area_size)
+        ax.set_xlabel('X Position (meters)')
+        ax.set_ylabel('Y Position (meters)')
+        ax.set_title('UAV Flight Paths and IoT Device Locations')
+
+        self.iot_scatter = ax.scatter([], [], c='blue', s=10, alpha=0.5, label='IoT Devices')
+        self.top_iot_scatter = ax.scatter([], [], c='green', s=20, marker='*', label='Top Energy Efficient IoT Devices')
+        self.uav_scatter = ax.scatter([], [], c='red', marker='^', s=100, label='UAVs')
+
+        # Assign unique colors to each UAV
+        uav_count = self.uav_paths.shape[1]
+        colors = plt.get_cmap('hsv', uav_count)
+        self.lines = []
+        for idx in range(uav_count):
+            line, = ax.plot([], [], linestyle='--', color=colors(idx), label=f'UAV {idx} Path')
+            self.lines.append(line)
+
+        ax.legend(loc='upper right')
+        ax.grid(True)
+        return self.fig
+
+    def artists(self):
+        return [self.iot_scatter, self.top_iot_scatter, self.uav_scatter] + self.lines
+
+    def init_frame(self):
+        for scatter in (self.iot_scatter, self.top_iot_scatter, self.uav_scatter):
+            scatter.set_offsets(np.empty((0, 2)))
+        for line in self.lines:
+            line.set_data([], [])
+        return self.artists()
+
+    def draw_frame(self, t):
+        iot_positions = self.source.get(t, 'iot_positions')
+
+        # Select the top N devices by energy efficiency without sorting the rest
+        scores = np.nan_to_num(self.energy_efficiency[t], nan=-np.inf)
+        top_n = min(self.top_n, len(scores))
+        if top_n < len(scores):
+            top = np.argpartition(-scores, top_n - 1)[:top_n] if top_n else np.empty(0, dtype=np.int64)
+        else:
+            top = np.arange(len(scores))
+        top = top[np.isfinite(scores[top])]
+        others = np.ones(len(scores), dtype=bool)
+        others[top] = False
+        self.iot_scatter.set_offsets(iot_positions[others, :2])
+        self.top_iot_scatter.set_offsets(iot_positions[top, :2])
+
+        # UAV positions and flight paths, as views into the precomputed path array
+        self.uav_scatter.set_offsets(self.uav_paths[t, :, :2])
+        for idx, line in enumerate(self.lines):
+            line.set_data(self.uav_paths[:t+1, idx, 0], self.uav_paths[:t+1, idx, 1])
+
+        self.ax.set_title(f'UAV Flight Paths and IoT Device Locations at Time Slot {t+1}')
+        return self.artists()
+
+    def save(self, path, fmt='gif', frames=None, interval=500):
+        frames = range(self.frame_count) if frames is None else frames
+        if self.fig is None:
+            self.setup()
+        if fmt == 'png':
+            # One image per time slot
+            os.makedirs(path, exist_ok=True)
+            for t in frames:
+                self.draw_frame(t)
+                self.fig.savefig(os.path.join(path, f'frame_{t:05d}.png'))
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            ani = animation.FuncAnimation(self.fig, self.draw_frame, init_func=self.init_frame,
+                                          frames=frames, interval=interval, blit=True)
+            # MP4 requires ffmpeg
+            ani.save(path, writer='pillow' if fmt == 'gif' else 'ffmpeg')
+        plt.close(self.fig)
+        self.fig = None
+
+def render_frames(directory, area_size, top_n, path, frames):
+    # Worker entry point: each process reads the recorded chunks on its own
+    renderer = FlightPathRenderer(TrajectoryReader(directory), area_size, top_n)
+    renderer.save(path, 'png', frames)
+    return len(frames)
+
+def render_flight_paths(source, path, area_size, top_n=10, fmt='gif', processes=1, interval=500):
+    """
+    Render recorded trajectories as a GIF, an MP4 or a directory of PNG frames.
+    PNG frames can be rendered in parallel processes when the trajectories are on disk.
+    """
+    directory = getattr(source, 'directory', None)
+    if fmt == 'png' and processes > 1 and directory:
+        frame_count = len(source)
+        chunk = -(-frame_count // processes)
+        frame_ranges = [range(start, min(start + chunk, frame_count)) for start in range(0, frame_count, chunk)]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            list(executor.map(render_frames, [directory] * len(frame_ranges), [area_size] * len(frame_ranges),
+                              [top_n] * len(frame_ranges), [path] * len(frame_ranges), frame_ranges))
+        return path
+    FlightPathRenderer(source, area_size, top_n).save(path, fmt, interval=interval)
+    return path
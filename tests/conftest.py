@@ -0,0 +1,30 @@
+# conftest.py
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulation.config import load_config
+
+@pytest.fixture
+def make_config(tmp_path):
+    """
+    config.json with every output under tmp_path (or off) and the given dotted overrides.
+    """
+    def make(overrides=None):
+        config = load_config(os.path.join(ROOT, 'config.json')).override({
+            'simulation.time_slots': 10,
+            'iot.device_count': 200,
+            'log_file': str(tmp_path / 'simulation.log'),
+            'logging.quiet': True,
+            'recording.directory': None,
+            'instrumentation.directory': None,
+            'checkpoint.directory': None,
+            'cache.enabled': False
+        })
+        return config.override(overrides or {})
+    return make
@@ -0,0 +1,90 @@
+# test_assignment.py
+
+import numpy as np
+import pytest
+
+from simulation.assignment import CapacityAssignment
+from simulation.simulation_manager import SimulationManager
+
+def random_pairs(rng, task_count, uav_count, coverage=0.4):
+    covered = rng.random((task_count, uav_count)) < coverage
+    task, uav = np.nonzero(covered)
+    return {
+        'task': task,
+        'uav': uav,
+        'data_rate': rng.uniform(5e6, 3e7, len(task)),
+        'energy_efficiency': rng.uniform(0, 1, len(task))
+    }
+
+def loads(chosen, data_size, cycles, pairs, uav_count):
+    tasks = np.flatnonzero(chosen >= 0)
+    pair = chosen[tasks]
+    uav = pairs['uav'][pair]
+    compute = np.bincount(uav, weights=cycles[tasks], minlength=uav_count)
+    airtime = np.bincount(uav, weights=data_size[tasks] * 1e6 / pairs['data_rate'][pair], minlength=uav_count)
+    return compute, airtime
+
+@pytest.mark.parametrize('seed', range(5))
+def test_assignment_is_feasible_and_not_below_greedy(make_config, seed):
+    rng = np.random.default_rng(seed)
+    uav_count = 6
+    config = make_config({'uav.count': uav_count, 'offloading.assignment': 'capacity',
+                          'offloading.compute_capacity': 2e10, 'offloading.airtime_capacity': 0.5})
+    assignment = CapacityAssignment(config)
+    for _ in range(3):
+        task_count = 300
+        data_size = rng.uniform(0.5, 5.2, task_count)
+        cycles = data_size * 1e6 * rng.uniform(500, 1000, task_count)
+        pairs = random_pairs(rng, task_count, uav_count)
+        chosen = assignment.assign(data_size, cycles, pairs)
+
+        assert chosen.shape == (task_count,)
+        offloaded = chosen >= 0
+        # Every chosen pair belongs to its task
+        np.testing.assert_array_equal(pairs['task'][chosen[offloaded]], np.flatnonzero(offloaded))
+        compute, airtime = loads(chosen, data_size, cycles, pairs, uav_count)
+        assert (compute <= assignment.compute_capacity * (1 + 1e-12)).all()
+        assert (airtime <= assignment.airtime_capacity * (1 + 1e-12)).all()
+        slot = assignment.last_slot
+        assert slot['offloaded_volume'] == pytest.approx(data_size[offloaded].sum())
+        assert slot['offloaded_volume'] >= slot['greedy_volume']
+
+def test_no_coverage_keeps_everything_local(make_config):
+    assignment = CapacityAssignment(make_config({'offloading.assignment': 'capacity'}))
+    empty = {'task': np.empty(0, dtype=np.int64), 'uav': np.empty(0, dtype=np.int64),
+             'data_rate': np.empty(0), 'energy_efficiency': np.empty(0)}
+    chosen = assignment.assign(np.ones(4), np.full(4, 1e9), empty)
+    assert (chosen == -1).all()
+
+def test_capacity_mode_respects_capacities_in_a_run(make_config):
+    config = make_config({'uav.count': 8, 'iot.device_count': 800, 'offloading.assignment': 'capacity'})
+    simulation = SimulationManager(config)
+    assignment = simulation.task_offloading.assignment
+    decide = simulation.task_offloading.decide_offloading_batch
+    peaks = []
+
+    def checked(tasks, uav_positions, time_slot):
+        batch = decide(tasks, uav_positions, time_slot)
+        offloaded = batch.offloaded
+        uav = batch.uav_id[offloaded]
+        bits = tasks['data_size'][offloaded] * 1e6
+        compute = np.bincount(uav, weights=bits * tasks['computation_intensity'][offloaded], minlength=8)
+        airtime = np.bincount(uav, weights=bits / batch.data_rate[offloaded], minlength=8)
+        peaks.append(max((compute / assignment.compute_capacity).max(), (airtime / assignment.airtime_capacity).max()))
+        return batch
+
+    simulation.task_offloading.decide_offloading_batch = checked
+    simulation.run_simulation()
+    assert len(peaks) == config['simulation']['time_slots']
+    assert max(peaks) <= 1 + 1e-12
+    summary = assignment.summary()
+    assert summary['offloaded_volume'] >= summary['greedy_volume'] > 0
+
+def test_capacity_mode_is_deterministic(make_config):
+    config = make_config({'uav.count': 8, 'iot.device_count': 800, 'offloading.assignment': 'capacity'})
+    summaries = []
+    for _ in range(2):
+        simulation = SimulationManager(config)
+        simulation.run_simulation()
+        summaries.append(simulation.task_offloading.assignment.summary())
+    assert summaries[0] == summaries[1]
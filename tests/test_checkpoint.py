@@ -0,0 +1,44 @@
+# test_checkpoint.py
+
+import os
+
+import numpy as np
+import pytest
+
+from simulation.simulation_manager import SimulationManager
+
+def assert_same_run(expected, resumed):
+    assert resumed.calculate_system_utility() == expected.calculate_system_utility()
+    assert resumed.calculate_total_energy_consumption() == expected.calculate_total_energy_consumption()
+    np.testing.assert_array_equal(resumed.energy_model.uav_energy, expected.energy_model.uav_energy)
+    np.testing.assert_array_equal(resumed.energy_model.iot_energy, expected.energy_model.iot_energy)
+    np.testing.assert_array_equal(resumed.uav_simulation.positions, expected.uav_simulation.positions)
+    np.testing.assert_array_equal(resumed.iot_simulation.positions, expected.iot_simulation.positions)
+    np.testing.assert_array_equal(resumed.task_offloading.task_energy_efficiency.values,
+                                  expected.task_offloading.task_energy_efficiency.values)
+    for series, values in expected.energy_model.get_energy_time_series().items():
+        np.testing.assert_array_equal(resumed.energy_model.get_energy_time_series()[series], values)
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'offloading.batch': False},
+    {'path_planning.mode': 'distinct'},
+    {'path_planning.mode': 'cluster'},
+    {'queueing.enabled': True},
+    {'offloading.assignment': 'capacity'},
+])
+def test_resume_is_bit_identical(make_config, tmp_path, overrides):
+    directory = str(tmp_path / 'checkpoints')
+    config = make_config(dict({'simulation.time_slots': 12, 'checkpoint.directory': directory,
+                               'checkpoint.interval': 4, 'checkpoint.keep': 0}, **overrides))
+    expected = SimulationManager(config)
+    expected.run_simulation()
+
+    # Resume from the middle, as if the run had stopped after slot 8
+    os.remove(os.path.join(directory, 'checkpoint_000012.npz'))
+    resumed = SimulationManager(config.override({'checkpoint.directory': None}), resume=directory)
+    assert resumed.start_slot == 8
+    resumed.run_simulation()
+    assert_same_run(expected, resumed)
+    if expected.queueing:
+        assert resumed.queueing.summary() == expected.queueing.summary()
@@ -0,0 +1,100 @@
+# test_config.py
+
+import pickle
+
+import pytest
+
+from simulation.config import Config
+
+MINIMAL = {
+    'simulation': {'time_slots': 5},
+    'uav': {'count': 3, 'coverage_radius': 200, 'flying_height': 50},
+    'iot': {'device_count': 100},
+    'log_file': 'simulation.log'
+}
+
+def test_defaults_fill_missing_values():
+    config = Config.from_dict(MINIMAL)
+    assert config['simulation']['slot_duration'] == 1
+    assert config['uav']['energy']['cpu_frequency'] == 5e9
+    assert config.derived['uav_computation_coefficient'] == pytest.approx(1e-5 * 5e9 ** 2)
+
+@pytest.mark.parametrize('key', ['simulation.time_slots', 'uav.count', 'log_file'])
+def test_missing_required_value(key):
+    data = Config.from_dict(MINIMAL).to_dict()
+    section, _, name = key.rpartition('.')
+    del (data[section] if section else data)[name]
+    with pytest.raises(ValueError, match=key):
+        Config.from_dict(data)
+
+@pytest.mark.parametrize('key, value', [
+    ('simulation.time_slots', 0),
+    ('simulation.time_slots', 2.5),
+    ('uav.count', -1),
+    ('uav.count', True),
+    ('offloading.batch', 'yes'),
+    ('path_planning.mode', 'fastest'),
+    ('metrics.relative_accuracy', 1),
+    ('communication.lookup_points', 1),
+    ('offloading.assignment', 'auction'),
+    ('offloading.assignment_time_budget', 0),
+])
+def test_invalid_values(key, value):
+    config = Config.from_dict(MINIMAL)
+    with pytest.raises(ValueError, match=key.replace('.', r'\.')):
+        config.override({key: value})
+    section, _, name = key.rpartition('.')
+    data = config.to_dict()
+    data.setdefault(section, {})[name] = value
+    with pytest.raises(ValueError):
+        Config.from_dict(data)
+
+def test_spatial_index_needs_a_positive_radius():
+    config = Config.from_dict(MINIMAL)
+    with pytest.raises(ValueError, match='coverage_radius'):
+        config.override({'offloading.spatial_index': True, 'uav.coverage_radius': 0})
+    with pytest.raises(ValueError, match='coverage_radius'):
+        config.override({'uav.coverage_radius': 0}).override({'offloading.spatial_index': True})
+
+def test_override_copies_only_touched_sections():
+    config = Config.from_dict(MINIMAL)
+    changed = config.override({'uav.count': 7, 'new_section.value': 1})
+    assert changed['uav']['count'] == 7
+    assert changed['new_section']['value'] == 1
+    assert config['uav']['count'] == 3
+    assert 'new_section' not in config
+    assert changed._data['iot'] is config._data['iot']
+
+def test_config_is_read_only():
+    config = Config.from_dict(dict(MINIMAL, rendering={'top_n': 3}))
+    with pytest.raises(TypeError):
+        config['uav']['count'] = 4
+    data = config.to_dict()
+    data['uav']['count'] = 4
+    assert config['uav']['count'] == 3
+
+def test_round_trips():
+    config = Config.from_dict(MINIMAL).override({'replicas.count': 4})
+    assert Config.from_json(config.to_json()).to_json() == config.to_json()
+    assert pickle.loads(pickle.dumps(config)).to_dict() == config.to_dict()
+
+@pytest.mark.parametrize('mode', [{'sharding.workers': 2}, {'replicas.count': 3}])
+@pytest.mark.parametrize('setting, name', [
+    ({'offloading.assignment': 'capacity'}, 'offloading.assignment'),
+    ({'queueing.enabled': True}, 'queueing.enabled'),
+    ({'recording.directory': 'trajectories'}, 'recording.directory'),
+    ({'checkpoint.directory': 'checkpoints', 'checkpoint.interval': 5}, 'checkpoint.directory'),
+])
+def test_sharded_and_replica_runs_reject_unsupported_settings(mode, setting, name):
+    config = Config.from_dict(MINIMAL).override({'checkpoint.interval': 0})
+    with pytest.raises(ValueError, match=name.replace('.', r'\.')):
+        config.override(dict(mode, **setting))
+    with pytest.raises(ValueError, match=name.replace('.', r'\.')):
+        config.override(setting).override(mode)
+    # Each setting is fine on its own, and the mode is fine without it
+    config.override(setting)
+    config.override(mode)
+
+def test_sharding_and_replicas_are_exclusive():
+    with pytest.raises(ValueError, match='replicas.count'):
+        Config.from_dict(MINIMAL).override({'sharding.workers': 2, 'replicas.count': 2})
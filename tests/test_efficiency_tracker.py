@@ -0,0 +1,83 @@
+# test_efficiency_tracker.py
+
+import numpy as np
+import pytest
+
+from simulation.efficiency_tracker import EfficiencyHistory, EfficiencyTracker
+from simulation.simulation_manager import SimulationManager
+
+def brute_force_top_k(values, k):
+    ids = np.flatnonzero(~np.isnan(values))
+    return ids[np.lexsort((ids, -values[ids]))][:k]
+
+def test_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    tracker = EfficiencyTracker(500)
+    assert len(tracker.top_k(5)) == 0
+    for _ in range(30):
+        ids = rng.choice(500, rng.integers(1, 80), replace=False)
+        # Rounded, so that ties are common
+        tracker.assign(ids, np.round(rng.random(len(ids)), 1))
+        for k in (1, 3, 10, 1000):
+            np.testing.assert_array_equal(tracker.top_k(k), brute_force_top_k(tracker.values, k))
+        np.testing.assert_array_equal(tracker.top_k_values(10), tracker.values[brute_force_top_k(tracker.values, 10)])
+
+def test_top_k_sees_every_assign():
+    tracker = EfficiencyTracker(4)
+    tracker.assign([0, 1, 2], [0.5, 0.2, 0.9])
+    assert tracker.top_k(2).tolist() == [2, 0]
+    tracker[1] = 1.5
+    assert tracker.top_k(2).tolist() == [1, 2]
+    assert tracker.top_k(1).tolist() == [1]
+    tracker.assign([2], [0.1])
+    assert tracker.top_k(4).tolist() == [1, 0, 2]
+
+def test_reads_like_a_dict_and_hands_over_changes():
+    tracker = EfficiencyTracker(5)
+    tracker.assign([3, 1], [0.25, 0.5])
+    tracker[3] = 0.75
+    assert dict(tracker) == {1: 0.5, 3: 0.75}
+    assert len(tracker) == 2
+    with pytest.raises(KeyError):
+        tracker[0]
+    ids, values = tracker.end_slot()
+    assert ids.tolist() == [3, 1, 3] and values.tolist() == [0.25, 0.5, 0.75]
+    ids, values = tracker.end_slot()
+    assert len(ids) == len(values) == 0
+    with pytest.raises(ValueError):
+        tracker.view()[0] = 1.0
+
+def test_state_dict_round_trip():
+    tracker = EfficiencyTracker(6)
+    tracker.assign([0, 4, 5], [0.3, 0.6, 0.6])
+    restored = EfficiencyTracker(6)
+    restored.load_state_dict(tracker.state_dict())
+    np.testing.assert_array_equal(restored.values, tracker.values)
+    assert restored.top_k(3).tolist() == tracker.top_k(3).tolist() == [4, 5, 0]
+
+def test_history_replays_the_change_sets():
+    rng = np.random.default_rng(1)
+    tracker = EfficiencyTracker(40)
+    change_ids, change_values, snapshots = [], [], []
+    for _ in range(12):
+        ids = rng.choice(40, rng.integers(0, 15), replace=False)
+        tracker.assign(ids, rng.random(len(ids)))
+        ids, values = tracker.end_slot()
+        change_ids.append(ids)
+        change_values.append(values)
+        snapshots.append(tracker.values.copy())
+    history = EfficiencyHistory(40, change_ids, change_values)
+    assert len(history) == 12
+    for slot in (0, 5, 11, 3, -1):
+        np.testing.assert_array_equal(history[slot], snapshots[slot])
+    for values, snapshot in zip(history, snapshots):
+        np.testing.assert_array_equal(values, snapshot)
+    with pytest.raises(IndexError):
+        history[12]
+
+def test_history_of_a_run_ends_at_the_tracker_state(make_config):
+    simulation = SimulationManager(make_config())
+    simulation.run_simulation()
+    history = simulation.iot_energy_efficiency_over_time
+    assert len(history) == 10
+    np.testing.assert_array_equal(history[-1], simulation.task_offloading.task_energy_efficiency.values)
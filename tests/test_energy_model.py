@@ -1,2 +1,68 @@
 # test_energy_model.py
 
+import numpy as np
+import pytest
+
+from simulation.energy_model import EnergyModel
+from simulation.simulation_manager import SimulationManager
+from simulation.task_batch import TaskBatch
+from simulation.task_offloading import OffloadingBatch
+
+def test_transmission_energy_units(make_config):
+    # 2 Mb at 4 Mbps takes 0.5 s; at 0.5 W that is 0.25 J
+    energy_model = EnergyModel(make_config())
+    assert energy_model.calculate_transmission_energy(2.0, 4e6) == pytest.approx(0.25)
+    # The fixed IoT rate is 1 Mbps
+    assert energy_model.calculate_iot_transmission_energy({'data_size': 3.0}) == pytest.approx(1.5)
+    sizes = np.array([[1.0], [2.0]])
+    rates = np.array([[1e6, 2e6], [4e6, 8e6]])
+    np.testing.assert_allclose(energy_model.calculate_transmission_energy(sizes, rates), [[0.5, 0.25], [0.25, 0.125]])
+
+def test_batch_ledger_matches_the_loop(make_config):
+    config = make_config({'uav.count': 4, 'iot.device_count': 300})
+    simulation = SimulationManager(config)
+    tasks = simulation.iot_simulation.generate_tasks(0)
+    batch = simulation.task_offloading.decide_offloading_batch(tasks, simulation.uav_simulation.positions, 0)
+    simulation.logger.close()
+
+    loop, vectorized = EnergyModel(config), EnergyModel(config)
+    loop.update_energy_consumption(batch.to_records(), 0)
+    vectorized.update_energy_consumption(batch, 0)
+    np.testing.assert_allclose(vectorized.uav_energy, loop.uav_energy, rtol=1e-12)
+    np.testing.assert_allclose(vectorized.iot_energy, loop.iot_energy, rtol=1e-12)
+    assert vectorized.get_total_energy_consumption() == pytest.approx(loop.get_total_energy_consumption(), rel=1e-12)
+    for series, values in loop.get_energy_time_series().items():
+        np.testing.assert_allclose(vectorized.get_energy_time_series()[series], values, rtol=1e-12)
+
+def test_scatter_add_charges_repeated_ids(make_config):
+    energy_model = EnergyModel(make_config({'uav.count': 2, 'iot.device_count': 3}))
+    device_id = np.array([0, 0, 2, 2, 2])
+    tasks = TaskBatch(device_id, np.zeros((5, 3)), np.full(5, 2.0), np.full(5, 1000.0), np.ones(5))
+    uav_id = np.array([1, 1, -1, 0, 1])
+    offloaded = uav_id >= 0
+    data_rate = np.where(offloaded, 4e6, np.nan)
+    energy_model.update_energy_consumption(OffloadingBatch(tasks, uav_id, offloaded, np.zeros(5), data_rate), 0)
+
+    computation = energy_model.calculate_uav_computation_energy({'data_size': 2.0, 'computation_intensity': 1000.0})
+    local = energy_model.calculate_iot_computation_energy({'data_size': 2.0, 'computation_intensity': 1000.0})
+    np.testing.assert_allclose(energy_model.uav_energy, [computation, 3 * computation])
+    np.testing.assert_allclose(energy_model.iot_energy, [0.5, 0, local + 0.5])
+    assert energy_model.total_uav_energy == pytest.approx(energy_model.uav_energy.sum())
+    assert energy_model.total_iot_energy == pytest.approx(energy_model.iot_energy.sum())
+    np.testing.assert_allclose(energy_model.get_energy_time_series()['uav_computation'], [energy_model.uav_energy])
+
+def test_propulsion_power_against_speed(make_config):
+    energy_model = EnergyModel(make_config({'uav.count': 3}))
+    # Hover costs the blade profile plus the induced power
+    assert energy_model.calculate_uav_propulsion_power(0.0) == pytest.approx(79.86 + 88.63)
+    speeds = np.linspace(0, 50, 101)
+    power = energy_model.calculate_uav_propulsion_power(speeds)
+    # Falls at first as induced power drops, then rises with parasite drag
+    slowest = int(np.argmin(power))
+    assert 0 < slowest < len(speeds) - 1
+    assert (np.diff(power[:slowest + 1]) < 0).all() and (np.diff(power[slowest:]) > 0).all()
+
+    energy_model.update_propulsion_energy([0.0, 10.0, 30.0], 0)
+    expected = energy_model.calculate_uav_propulsion_power(np.array([0.0, 10.0, 30.0]))
+    np.testing.assert_allclose(energy_model.uav_propulsion_energy, expected)
+    assert energy_model.total_propulsion_energy == pytest.approx(expected.sum())
@@ -0,0 +1,56 @@
+# test_helpers.py
+
+import threading
+
+from utils.helpers import Logger, _open_loggers
+
+def test_flush_writes_everything_logged_so_far(tmp_path):
+    path = tmp_path / 'logs' / 'run.log'
+    logger = Logger(str(path), quiet=True, batch_size=7)
+    for index in range(100):
+        logger.info(f'message {index}')
+    logger.flush()
+    assert path.read_text().splitlines() == [f'message {index}' for index in range(100)]
+    logger.close()
+
+def test_levels_and_recent_messages(tmp_path, capsys):
+    logger = Logger(str(tmp_path / 'run.log'), level='WARNING', buffer_size=2)
+    logger.info('skipped')
+    logger.warning('first')
+    logger.error('second')
+    logger.error('third')
+    logger.close()
+    assert logger.recent() == ['second', 'third']
+    assert (tmp_path / 'run.log').read_text() == 'first\nsecond\nthird\n'
+    assert capsys.readouterr().out == 'first\nsecond\nthird\n'
+
+def test_close_stops_the_writer_and_logging_restarts_it(tmp_path):
+    path = tmp_path / 'run.log'
+    logger = Logger(str(path), quiet=True)
+    logger.info('before')
+    writer = logger._writer
+    logger.close()
+    assert not writer.is_alive()
+    logger.close()  # Closing twice is harmless
+    logger.flush()  # As is flushing a closed logger
+
+    logger.info('after')
+    assert logger._writer.is_alive()
+    logger.close()
+    assert path.read_text() == 'before\nafter\n'
+    assert logger in _open_loggers
+
+def test_concurrent_logging_loses_nothing(tmp_path):
+    path = tmp_path / 'run.log'
+    logger = Logger(str(path), quiet=True)
+
+    def log_many(thread):
+        for index in range(200):
+            logger.info(f'{thread} {index}')
+    threads = [threading.Thread(target=log_many, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.close()
+    assert len(path.read_text().splitlines()) == 800
@@ -0,0 +1,67 @@
+# test_instrumentation.py
+
+import csv
+import json
+
+from simulation.instrumentation import Instrumentation
+from simulation.simulation_manager import SimulationManager
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def on_run_start(self, instrumentation):
+        self.events.append('run_start')
+
+    def on_slot_end(self, slot, record):
+        self.events.append(('slot_end', slot))
+
+    def on_run_end(self, summary):
+        self.events.append('run_end')
+
+def test_run_exports_summary_and_slot_table(make_config, tmp_path):
+    directory = tmp_path / 'instrumentation'
+    simulation = SimulationManager(make_config({'instrumentation.directory': str(directory),
+                                                'instrumentation.profile': True}))
+    hooks = Recorder()
+    simulation.instrumentation.add_hook(hooks)
+    simulation.run_simulation()
+
+    summary = json.loads((directory / 'instrumentation.json').read_text())
+    assert summary['slots'] == 10
+    assert {'mobility', 'uav_planning', 'task_generation', 'offloading', 'energy_accounting'} <= set(summary['phases'])
+    counters = summary['counters']
+    assert counters['tasks_generated'] == simulation.task_offloading.metrics.distributions['data_volume'].stats.count
+    assert summary['offload_ratio'] == counters['tasks_offloaded'] / counters['tasks_generated']
+    assert sum(phase['share'] for phase in summary['phases'].values()) <= 1 + 1e-6
+
+    with open(directory / 'slots.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row['slot']) for row in rows] == list(range(10))
+    assert sum(int(row['tasks_generated']) for row in rows) == counters['tasks_generated']
+    assert (directory / 'profile.prof').exists() and (directory / 'profile.txt').exists()
+    assert hooks.events == ['run_start'] + [('slot_end', slot) for slot in range(10)] + ['run_end']
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation = Instrumentation(enabled=False)
+    instrumentation.start_run()
+    instrumentation.start_slot(0)
+    with instrumentation.phase('offloading'):
+        instrumentation.count('tasks_generated', 5)
+    instrumentation.end_slot()
+    assert instrumentation.end_run() is None
+    assert instrumentation.slot_records == [] and instrumentation.counter_totals == {}
+
+def test_phases_and_counters_accumulate():
+    instrumentation = Instrumentation()
+    instrumentation.start_run()
+    for slot in range(3):
+        instrumentation.start_slot(slot)
+        for _ in range(2):
+            with instrumentation.phase('offloading'):
+                instrumentation.count('tasks_generated', 4)
+        instrumentation.end_slot()
+    summary = instrumentation.end_run()
+    assert summary['counters'] == {'tasks_generated': 24}
+    assert [record['tasks_generated'] for record in instrumentation.slot_records] == [8, 8, 8]
+    assert summary['phases']['offloading']['wall'] >= 0
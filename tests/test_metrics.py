@@ -0,0 +1,85 @@
+# test_metrics.py
+
+import math
+
+import numpy as np
+import pytest
+
+from simulation.metrics import MetricsAggregator, QuantileSketch, RunningStats, SlotSeries, confidence_interval
+
+def test_running_stats_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(0, 2, 10000)
+    stats = RunningStats()
+    for batch in np.array_split(values, 37):
+        stats.update(batch)
+    assert stats.count == len(values)
+    assert stats.total == pytest.approx(values.sum(), rel=1e-12)
+    assert stats.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert stats.variance == pytest.approx(np.var(values, ddof=1), rel=1e-10)
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+def test_merge_equals_one_combined_pass():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(mean, 1, size) for mean, size in ((0, 100), (50, 3), (-7, 1000), (1e6, 10))]
+    merged = RunningStats()
+    for part in parts:
+        stats = RunningStats()
+        stats.update(part)
+        merged.merge(stats)
+    merged.merge(RunningStats())
+    combined = RunningStats()
+    combined.update(np.concatenate(parts))
+    for name in ('count', 'total', 'mean', 'variance', 'min', 'max'):
+        assert getattr(merged, name) == pytest.approx(getattr(combined, name), rel=1e-9)
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.05])
+def test_quantile_sketch_within_relative_accuracy(relative_accuracy):
+    rng = np.random.default_rng(2)
+    values = np.concatenate([rng.lognormal(0, 3, 20000), -rng.lognormal(0, 1, 5000), np.zeros(100)])
+    sketch, left, right = (QuantileSketch(relative_accuracy) for _ in range(3))
+    sketch.update(values)
+    left.update(values[:12345])
+    right.update(values[12345:])
+    left.merge(right)
+    ordered = np.sort(values)
+    for q in (0, 0.01, 0.1, 0.2, 0.5, 0.9, 0.99, 1):
+        exact = ordered[math.floor(q * (len(values) - 1))]
+        for estimate in (sketch.quantile(q), left.quantile(q)):
+            assert abs(estimate - exact) <= relative_accuracy * abs(exact) * (1 + 1e-9)
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_slot_series_folds_rows_pairwise():
+    series = SlotSeries(['tasks', 'volume'], capacity=4)
+    for slot in range(11):
+        series.append([1, slot])
+    arrays = series.arrays()
+    # 11 slots in 4 rows: folded twice, so each row covers 4 slots
+    np.testing.assert_array_equal(arrays['slot'], [0, 4, 8])
+    np.testing.assert_array_equal(arrays['tasks'], [4, 4, 3])
+    np.testing.assert_array_equal(arrays['volume'], [0 + 1 + 2 + 3, 4 + 5 + 6 + 7, 8 + 9 + 10])
+
+    restored = SlotSeries(['tasks', 'volume'], capacity=4)
+    restored.load_state_dict(series.state_dict())
+    for target in (series, restored):
+        target.append([1, 11])
+    np.testing.assert_array_equal(restored.arrays()['volume'], series.arrays()['volume'])
+
+def test_aggregator_state_round_trip():
+    rng = np.random.default_rng(3)
+    aggregator = MetricsAggregator(3, series_capacity=8)
+    for _ in range(5):
+        uav_id = rng.integers(-1, 3, 50)
+        aggregator.record_tasks(rng.uniform(0.5, 5, 50), rng.random(50), uav_id >= 0, uav_id)
+        aggregator.end_slot()
+    restored = MetricsAggregator(3, series_capacity=8)
+    restored.load_state_dict(aggregator.state_dict())
+    assert restored.summary() == aggregator.summary()
+    assert restored.data_volume == aggregator.data_volume
+
+def test_confidence_interval():
+    mean, half_width = confidence_interval([1.0, 2.0, 3.0, 4.0], 0.95)
+    assert mean == 2.5
+    # t(0.975, 3) = 3.182
+    assert half_width == pytest.approx(3.182 * np.std([1, 2, 3, 4], ddof=1) / 2, rel=0.01)
+    assert math.isnan(confidence_interval([1.0])[1])
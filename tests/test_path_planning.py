@@ -1,2 +1,33 @@
 # test_path_planning.py
 
+import itertools
+
+import numpy as np
+import pytest
+
+from simulation.path_planning import linear_assignment
+
+def brute_force_cost(cost):
+    # Lowest total over every way of matching min(n, m) rows and columns one to one
+    n, m = cost.shape
+    if n <= m:
+        return min(cost[np.arange(n), list(columns)].sum() for columns in itertools.permutations(range(m), n))
+    return min(cost[list(rows), np.arange(m)].sum() for rows in itertools.permutations(range(n), m))
+
+@pytest.mark.parametrize('shape', [(1, 1), (3, 3), (4, 4), (5, 5), (2, 5), (3, 6), (5, 2), (6, 4)])
+def test_linear_assignment_matches_brute_force(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(20):
+        cost = rng.uniform(0, 100, shape)
+        columns = linear_assignment(cost)
+        assert columns.shape == (shape[0],)
+        assigned = columns >= 0
+        assert assigned.sum() == min(shape)
+        assert len(set(columns[assigned].tolist())) == assigned.sum()
+        assert cost[np.flatnonzero(assigned), columns[assigned]].sum() == pytest.approx(brute_force_cost(cost))
+
+def test_linear_assignment_with_ties():
+    cost = np.array([[1.0, 1.0, 2.0], [1.0, 1.0, 2.0], [2.0, 2.0, 0.0]])
+    columns = linear_assignment(cost)
+    assert sorted(columns.tolist()) == [0, 1, 2]
+    assert cost[np.arange(3), columns].sum() == pytest.approx(2.0)
@@ -0,0 +1,87 @@
+# test_queueing.py
+
+import numpy as np
+import pytest
+
+from simulation.queueing import QueueingEngine
+from simulation.task_batch import TaskBatch
+from simulation.task_offloading import OffloadingBatch
+
+UAV_FREQUENCY = 5e9
+
+def submit(engine, tasks, time_slot=0):
+    """
+    Queue (uav_id, data size in Mb, cycles per bit, deadline slot, data rate) tasks; a
+    uav_id of -1 executes the task on its own device.
+    """
+    uav_id, data_size, intensity, deadline, data_rate = (np.array(column) for column in zip(*tasks))
+    device_id = np.arange(len(tasks))
+    batch = TaskBatch(device_id, np.zeros((len(tasks), 3)), data_size.astype(float), intensity.astype(float),
+                      deadline.astype(float))
+    offloaded = uav_id >= 0
+    engine.submit(OffloadingBatch(batch, uav_id, offloaded, np.zeros(len(tasks)),
+                                  np.where(offloaded, data_rate, np.nan).astype(float)), time_slot)
+
+@pytest.fixture
+def engine(make_config):
+    return QueueingEngine(make_config({'uav.count': 1, 'iot.device_count': 4}))
+
+def cycles_per_bit(seconds, data_size=1.0):
+    # Intensity that keeps a UAV busy for `seconds` with a task of `data_size` Mb
+    return seconds * UAV_FREQUENCY / (data_size * 1e6)
+
+def test_serves_earliest_deadline_first(engine):
+    submit(engine, [(0, 1.0, cycles_per_bit(0.6), 3, np.inf), (0, 1.0, cycles_per_bit(0.6), 1, np.inf)])
+    result = engine.process(0)
+    # Only the earlier deadline fits into the first slot
+    assert result['completed'] == 1
+    assert result['latency'] == pytest.approx(0.6)
+    assert engine.queued() == 1
+    result = engine.process(1)
+    assert result['completed'] == 1
+    assert result['latency'] == pytest.approx(1.2)
+    assert engine.summary()['dropped'] == 0
+
+def test_drops_tasks_that_cannot_make_their_deadline(engine):
+    submit(engine, [(0, 1.0, cycles_per_bit(0.7), 1, np.inf), (0, 1.0, cycles_per_bit(0.7), 1, np.inf),
+                    (0, 1.0, cycles_per_bit(1.5), 1, np.inf)])
+    result = engine.process(0)
+    assert result['completed'] == 1
+    assert result['dropped'] == 2
+    assert engine.queued() == 0
+    assert engine.summary()['drop_ratio'] == pytest.approx(2 / 3)
+
+def test_serves_ready_tasks_while_another_is_in_transit(engine):
+    # The earlier deadline is still being transmitted until 0.5 s; the other task runs meanwhile
+    submit(engine, [(0, 1.0, cycles_per_bit(0.2), 1, 2e6), (0, 1.0, cycles_per_bit(0.4), 2, np.inf)])
+    result = engine.process(0)
+    assert result['completed'] == 2
+    assert result['dropped'] == 0
+    assert engine.summary()['max_latency'] == pytest.approx(0.7)
+
+def test_preempts_for_an_earlier_deadline(engine):
+    # The long task runs from 0, is preempted when the urgent one arrives at 0.25 s and resumes after it
+    submit(engine, [(0, 1.0, cycles_per_bit(0.5), 3, np.inf), (0, 1.0, cycles_per_bit(0.5), 1, 4e6)])
+    result = engine.process(0)
+    assert result['completed'] == 2
+    # The urgent task finishes at 0.75 s and the long one at 1.0 s; without preemption 1.0 s and 0.5 s
+    assert result['latency'] == pytest.approx(1.75)
+    assert engine.summary()['max_latency'] == pytest.approx(1.0)
+
+def test_local_tasks_use_the_device_cpu(engine):
+    # 1 GHz device CPU: 0.5 Mb at 1000 cycles per bit takes 0.5 s
+    submit(engine, [(-1, 0.5, 1000, 1, np.nan)])
+    result = engine.process(0)
+    assert result['completed'] == 1
+    assert result['latency'] == pytest.approx(0.5)
+
+def test_state_dict_round_trip(engine, make_config):
+    submit(engine, [(0, 1.0, cycles_per_bit(0.8), 4, np.inf), (0, 1.0, cycles_per_bit(0.8), 4, 1e6),
+                    (-1, 2.0, 1000, 5, np.nan)])
+    engine.process(0)
+    restored = QueueingEngine(make_config({'uav.count': 1, 'iot.device_count': 4}))
+    restored.load_state_dict(engine.state_dict())
+    assert restored.queued() == engine.queued()
+    for time_slot in range(1, 5):
+        assert restored.process(time_slot) == engine.process(time_slot)
+    assert restored.summary() == engine.summary()
@@ -0,0 +1,65 @@
+# test_recorder.py
+
+import numpy as np
+import pytest
+
+from simulation.recorder import MANIFEST_FILE, TrajectoryReader, TrajectoryRecorder
+from simulation.simulation_manager import SimulationManager
+
+def record_slots(recorder, count, rng):
+    slots = []
+    for _ in range(count):
+        slot = {'uav_positions': rng.uniform(0, 1000, (3, 3)),
+                'efficiency_ids': rng.choice(50, rng.integers(0, 10), replace=False)}
+        recorder.record(**slot)
+        slots.append(slot)
+    return slots
+
+def test_round_trip_through_chunks(tmp_path):
+    directory = str(tmp_path / 'trajectories')
+    rng = np.random.default_rng(0)
+    recorder = TrajectoryRecorder(directory, chunk_size=4, window=3, ragged=['efficiency_ids'])
+    slots = record_slots(recorder, 10, rng)
+    # Two full chunks on disk, the rest pending; every slot readable through the recorder
+    assert recorder.written_count == 8 and recorder.chunk_count == 2
+    for index, slot in enumerate(slots):
+        np.testing.assert_array_equal(recorder.get(index, 'uav_positions'), slot['uav_positions'])
+        np.testing.assert_array_equal(recorder.get(index, 'efficiency_ids'), slot['efficiency_ids'])
+    np.testing.assert_array_equal(recorder.series('uav_positions'), np.stack([slot['uav_positions'] for slot in slots]))
+
+    recorder.close()
+    assert (tmp_path / 'trajectories' / MANIFEST_FILE).exists()
+    reader = TrajectoryReader(directory)
+    assert len(reader) == 10
+    for index, slot in enumerate(slots):
+        np.testing.assert_array_equal(reader[index]['uav_positions'], slot['uav_positions'])
+        np.testing.assert_array_equal(reader.get(index, 'efficiency_ids'), slot['efficiency_ids'])
+    np.testing.assert_array_equal(reader.series('uav_positions', 6), np.stack([slot['uav_positions'] for slot in slots[:6]]))
+    with pytest.raises(IndexError):
+        reader.get(10, 'uav_positions')
+
+def test_memory_is_bounded_by_the_window(tmp_path):
+    rng = np.random.default_rng(1)
+    recorder = TrajectoryRecorder(str(tmp_path / 'trajectories'), chunk_size=5, window=3, ragged=['efficiency_ids'])
+    record_slots(recorder, 23, rng)
+    assert len(recorder.recent) == 3
+    assert len(recorder.pending) == 3
+
+def test_new_recorder_clears_old_chunks(tmp_path):
+    directory = str(tmp_path / 'trajectories')
+    rng = np.random.default_rng(2)
+    recorder = TrajectoryRecorder(directory, chunk_size=2, ragged=['efficiency_ids'])
+    record_slots(recorder, 6, rng)
+    recorder.close()
+    recorder = TrajectoryRecorder(directory, chunk_size=2, ragged=['efficiency_ids'])
+    record_slots(recorder, 2, rng)
+    recorder.close()
+    assert len(TrajectoryReader(directory)) == 2
+    assert sorted(path.name for path in (tmp_path / 'trajectories').glob('chunk_*.npz')) == ['chunk_00000.npz']
+
+def test_position_history_is_bounded_in_a_run(make_config):
+    simulation = SimulationManager(make_config({'simulation.time_slots': 15, 'recording.window': 4}))
+    simulation.run_simulation()
+    assert len(simulation.uav_simulation.position_history) == 4
+    assert len(simulation.iot_simulation.position_history) == 4
+    np.testing.assert_array_equal(simulation.uav_simulation.position_history[-1], simulation.uav_simulation.positions)
@@ -0,0 +1,32 @@
+# test_replicas.py
+
+import numpy as np
+import pytest
+
+from simulation.replicas import ReplicaSimulation
+from simulation.simulation_manager import SimulationManager
+
+@pytest.mark.parametrize('mode', ['best', 'distinct', 'cluster'])
+def test_replica_follows_the_run_with_its_seed(make_config, mode):
+    config = make_config({'path_planning.mode': mode, 'uav.count': 4})
+    replicas = ReplicaSimulation(config, seeds=[3, 5])
+    replicas.run_simulation()
+    metrics = replicas.replica_metrics()
+    for r, seed in enumerate(replicas.seeds):
+        simulation = SimulationManager(config.override({'simulation.seed': seed}))
+        simulation.run_simulation()
+        np.testing.assert_allclose(replicas.uav_positions[r], simulation.uav_simulation.positions, rtol=1e-12)
+        np.testing.assert_allclose(replicas.iot_energy[r], simulation.energy_model.iot_energy, rtol=1e-9)
+        assert metrics['system_utility'][r] == pytest.approx(simulation.calculate_system_utility(), rel=1e-12)
+        assert metrics['energy_consumption'][r] == pytest.approx(simulation.calculate_total_energy_consumption(), rel=1e-9)
+        assert metrics['energy_efficiency'][r] == pytest.approx(simulation.calculate_energy_efficiency(), rel=1e-9)
+
+def test_summary_is_a_confidence_interval_over_replicas(make_config):
+    replicas = ReplicaSimulation(make_config({'replicas.count': 4}))
+    replicas.run_simulation()
+    assert replicas.seeds == [0, 1, 2, 3]
+    utility = replicas.replica_metrics()['system_utility']
+    summary = replicas.summary()['system_utility']
+    assert summary['mean'] == pytest.approx(utility.mean())
+    assert summary['low'] < summary['mean'] < summary['high']
+    assert replicas.calculate_system_utility() == pytest.approx(utility.mean())
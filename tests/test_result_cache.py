@@ -0,0 +1,79 @@
+# test_result_cache.py
+
+import os
+import time
+
+from simulation.__main__ import main
+from simulation.recorder import MANIFEST_FILE
+from simulation.result_cache import ResultCache, result_key
+from simulation.sweep import build_point, run_sweep
+
+def test_cache_command_clears_one_entry_or_everything(make_config, tmp_path, capsys):
+    directory = str(tmp_path / 'cache')
+    cache = ResultCache(directory)
+    config = make_config({'cache.directory': directory})
+    other = config.override({'simulation.seed': 1})
+    for entry in (config, other):
+        cache.put(result_key(entry), {'energy_efficiency': 1.0})
+
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(other.to_json())
+    assert main(['cache', '--clear', '--config', str(config_file)]) == 0
+    assert not os.path.exists(cache.entry_path(result_key(other)))
+    assert os.path.exists(cache.entry_path(result_key(config)))
+
+    assert main(['cache', '--clear', '--config', str(config_file), '--set', f'cache.directory={directory}']) == 0
+    assert main(['cache', '--set', f'cache.directory={directory}']) == 0
+    assert '1 cache entries' in capsys.readouterr().out
+    assert main(['cache', '--clear', '--set', f'cache.directory={directory}']) == 0
+    assert cache.entries() == []
+
+def test_key_ignores_output_only_values(make_config, tmp_path):
+    config = make_config()
+    assert result_key(config) == result_key(config.override({
+        'log_file': str(tmp_path / 'other.log'), 'recording.directory': 'elsewhere', 'cache.enabled': True}))
+    assert result_key(config) != result_key(config.override({'simulation.seed': 1}))
+    assert result_key(config) != result_key(config.override({'recording.window': 20}))
+
+def test_sweep_hits_misses_and_invalidates(make_config, tmp_path):
+    directory = str(tmp_path / 'cache')
+    base = make_config({'simulation.time_slots': 4, 'cache.enabled': True, 'cache.directory': directory,
+                        'recording.directory': str(tmp_path / 'trajectories')})
+    grid = {'iot.device_count': [100, 150]}
+    first = run_sweep(base, grid, processes=1)
+    assert [row['cached'] for row in first] == [False, False]
+
+    second = run_sweep(base, grid, processes=1)
+    assert [row['cached'] for row in second] == [True, True]
+    for expected, row in zip(first, second):
+        for column in ('energy_efficiency', 'energy_consumption', 'system_utility'):
+            assert row[column] == expected[column]
+    # A hit restores the point's recorded trajectories
+    assert os.path.exists(os.path.join(str(tmp_path / 'trajectories'), 'point_0', MANIFEST_FILE))
+
+    changed = run_sweep(base.override({'uav.count': 4}), grid, processes=1)
+    assert [row['cached'] for row in changed] == [False, False]
+
+    cache = ResultCache(directory)
+    cache.invalidate(result_key(build_point(base, 0, {'iot.device_count': 100, 'simulation.seed': 0})))
+    assert [row['cached'] for row in run_sweep(base, grid, processes=1)] == [False, True]
+    cache.invalidate()
+    assert cache.entries() == []
+
+def test_eviction_drops_the_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    keys = [letter * 64 for letter in 'abc']
+    for age, key in zip((300, 200), keys):
+        cache.put(key, {'energy_efficiency': 1.0})
+        os.utime(cache.entry_path(key), (time.time() - age,) * 2)
+    entry_size = cache.size() // 2
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get(keys[0]) == {'energy_efficiency': 1.0}
+    cache.max_bytes = 2 * entry_size
+    cache.put(keys[2], {'energy_efficiency': 1.0})
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+
+def test_time_budgeted_runs_are_not_cached(make_config):
+    config = make_config({'cache.enabled': True, 'offloading.assignment': 'capacity'})
+    assert ResultCache.from_config(config) is not None
+    assert ResultCache.from_config(config.override({'offloading.assignment_time_budget': 0.01})) is None
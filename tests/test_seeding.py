@@ -0,0 +1,56 @@
+# test_seeding.py
+
+import numpy as np
+
+from simulation.seeding import RandomStreams, STREAMS
+from simulation.simulation_manager import SimulationManager
+from simulation.sweep import run_sweep
+
+def test_streams_are_independent():
+    quiet, busy = RandomStreams(7), RandomStreams(7)
+    busy.generator('iot_mobility').random(1000)
+    busy.generator('path_planning').integers(0, 10, 50)
+    np.testing.assert_array_equal(quiet.generator('tasks').random(20), busy.generator('tasks').random(20))
+    draws = [RandomStreams(7).generator(name).random(5) for name in STREAMS]
+    assert len({tuple(draw) for draw in draws}) == len(STREAMS)
+
+def test_shards_and_seeds_get_their_own_streams():
+    draws = {(seed, shard): RandomStreams(seed, shard).generator('tasks').random(5).tobytes()
+             for seed in (0, 1) for shard in (None, 0, 1)}
+    assert len(set(draws.values())) == len(draws)
+    np.testing.assert_array_equal(RandomStreams(3, 1).generator('tasks').random(5),
+                                  RandomStreams(3, 1).generator('tasks').random(5))
+
+def test_state_dict_restores_the_draws():
+    streams = RandomStreams(5)
+    streams.generator('iot_mobility').random(17)
+    state = streams.state_dict()
+    expected = streams.generator('iot_mobility').random(10)
+    restored = RandomStreams(5)
+    restored.load_state_dict(state)
+    np.testing.assert_array_equal(restored.generator('iot_mobility').random(10), expected)
+
+def run(config):
+    simulation = SimulationManager(config)
+    simulation.run_simulation()
+    return simulation
+
+def test_runs_are_reproducible_by_seed(make_config):
+    first, second = run(make_config({'simulation.seed': 3})), run(make_config({'simulation.seed': 3}))
+    np.testing.assert_array_equal(first.uav_simulation.positions, second.uav_simulation.positions)
+    np.testing.assert_array_equal(first.energy_model.iot_energy, second.energy_model.iot_energy)
+    assert first.calculate_system_utility() == second.calculate_system_utility()
+    other = run(make_config({'simulation.seed': 4}))
+    assert other.calculate_system_utility() != first.calculate_system_utility()
+
+def test_pool_sweep_matches_serial(make_config):
+    base = make_config({'simulation.time_slots': 5})
+    grid = {'iot.device_count': [100, 150], 'uav.count': [2, 3]}
+    serial = run_sweep(base, grid, seeds=[0, 1], processes=1)
+    pooled = run_sweep(base, grid, seeds=[0, 1], processes=2)
+    assert len(serial) == len(pooled) == 8
+    for expected, row in zip(serial, pooled):
+        expected, row = dict(expected), dict(row)
+        expected.pop('runtime')
+        row.pop('runtime')
+        assert row == expected
@@ -0,0 +1,41 @@
+# test_sharding.py
+
+import numpy as np
+import pytest
+
+from simulation.sharding import ShardedSimulation
+from simulation.simulation_manager import SimulationManager
+
+def run(simulation):
+    simulation.run_simulation()
+    return simulation
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_sharded_totals_agree_with_unsharded(make_config, workers):
+    # Shards draw tasks and mobility from their own streams, so the totals agree in distribution, not bit for bit
+    config = make_config({'iot.device_count': 4000, 'uav.count': 6})
+    unsharded = run(SimulationManager(config))
+    sharded = run(ShardedSimulation(config.override({'sharding.workers': workers})))
+    assert sharded.calculate_system_utility() == pytest.approx(unsharded.calculate_system_utility(), rel=0.1)
+    assert sharded.calculate_total_energy_consumption() == pytest.approx(unsharded.calculate_total_energy_consumption(), rel=0.1)
+    offload_ratio = sharded.metrics.summary()['offload_ratio']['mean']
+    assert offload_ratio == pytest.approx(unsharded.task_offloading.metrics.summary()['offload_ratio']['mean'], rel=0.1)
+
+def test_sharded_totals_match_the_ledgers(make_config):
+    config = make_config({'iot.device_count': 1000, 'uav.count': 4, 'sharding.workers': 3})
+    sharded = run(ShardedSimulation(config))
+    energy_model = sharded.energy_model
+    # Per-device energy comes back from the workers' shared memory, the totals from their reports
+    assert energy_model.iot_energy.sum() == pytest.approx(energy_model.total_iot_energy, rel=1e-9)
+    assert energy_model.uav_energy.sum() == pytest.approx(energy_model.total_uav_energy, rel=1e-9)
+    series = sharded.metrics.series.arrays()
+    assert series['data_volume'].sum() == pytest.approx(sharded.calculate_system_utility(), rel=1e-9)
+    assert series['tasks'].sum() == sharded.metrics.distributions['data_volume'].stats.count
+    assert ((sharded.iot_positions[:, :2] >= 0) & (sharded.iot_positions[:, :2] <= 1000)).all()
+
+def test_sharded_run_is_reproducible(make_config):
+    config = make_config({'iot.device_count': 600, 'sharding.workers': 2})
+    first, second = run(ShardedSimulation(config)), run(ShardedSimulation(config))
+    assert first.calculate_system_utility() == second.calculate_system_utility()
+    np.testing.assert_array_equal(first.energy_model.iot_energy, second.energy_model.iot_energy)
+    np.testing.assert_array_equal(first.uav_simulation.positions, second.uav_simulation.positions)
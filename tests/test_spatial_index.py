@@ -0,0 +1,45 @@
+# test_spatial_index.py
+
+import numpy as np
+import pytest
+
+from simulation.spatial_index import UniformGridIndex
+
+@pytest.mark.parametrize('cell_size, radius', [(200, 200), (50, 120), (300, 100)])
+def test_query_covers_brute_force(cell_size, radius):
+    rng = np.random.default_rng(0)
+    uav_positions = np.column_stack([rng.uniform(0, 1000, (40, 2)), np.full(40, 50.0)])
+    queries = np.column_stack([rng.uniform(-100, 1100, (300, 2)), np.zeros(300)])
+    index = UniformGridIndex(cell_size)
+    index.build([tuple(position) for position in uav_positions])
+
+    for position in queries:
+        candidates = index.query(tuple(position), radius)
+        assert candidates == sorted(candidates)
+        in_range = np.flatnonzero(np.linalg.norm(uav_positions[:, :2] - position[:2], axis=1) <= radius)
+        assert set(in_range.tolist()) <= set(candidates)
+
+def test_query_batch_matches_query():
+    rng = np.random.default_rng(1)
+    uav_positions = np.column_stack([rng.uniform(0, 1000, (25, 2)), np.full(25, 50.0)])
+    queries = np.column_stack([rng.uniform(0, 1000, (200, 2)), np.zeros(200)])
+    index = UniformGridIndex(150)
+    index.build(uav_positions)
+
+    rows, uavs = index.query_batch(queries, 150)
+    assert (np.diff(rows) >= 0).all()
+    for row, position in enumerate(queries):
+        assert uavs[rows == row].tolist() == index.query(tuple(position), 150)
+
+@pytest.mark.parametrize('cell_size, radius', [(200, 200), (50, 120)])
+def test_query_batch_far_and_empty(cell_size, radius):
+    index = UniformGridIndex(cell_size)
+    index.build(np.empty((0, 3)))
+    rows, uavs = index.query_batch(np.zeros((3, 3)), radius)
+    assert len(rows) == len(uavs) == 0
+
+    index.build(np.array([[0.0, 0.0, 50.0], [10.0, 10.0, 50.0], [-5000.0, 0.0, 50.0]]))
+    queries = np.array([[5000.0, 5000.0, 0.0], [1.0, 1.0, 0.0], [-4990.0, 5.0, 0.0], [-1e6, -1e6, 0.0]])
+    rows, uavs = index.query_batch(queries, radius)
+    assert rows.tolist() == [1, 1, 2]
+    assert uavs.tolist() == [0, 1, 2]
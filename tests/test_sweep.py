@@ -0,0 +1,17 @@
+# test_sweep.py
+
+import pytest
+
+from simulation.sweep import animation_keys, render_run
+
+@pytest.mark.parametrize('mode', [{'sharding.workers': 2}, {'replicas.count': 2}])
+def test_render_skips_sharded_and_replica_runs(make_config, mode):
+    assert render_run(make_config(mode), 'skipped') is None
+
+def test_animation_keys_only_tell_apart_colliding_names():
+    overrides = [{'iot.device_count': 300, 'simulation.seed': 0}, {'iot.device_count': 300, 'simulation.seed': 1},
+                 {'iot.device_count': 400, 'simulation.seed': 0}]
+    assert animation_keys(overrides, [300, 300, 400]) == ['seed0', 'seed1', None]
+    overrides = [{'iot.device_count': 300, 'uav.count': 3, 'simulation.seed': 0},
+                 {'iot.device_count': 300, 'uav.count': 6, 'simulation.seed': 0}]
+    assert animation_keys(overrides, [300, 300]) == ['uav.count-3', 'uav.count-6']
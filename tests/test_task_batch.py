@@ -0,0 +1,48 @@
+# test_task_batch.py
+
+import numpy as np
+
+from simulation.simulation_manager import SimulationManager
+from simulation.task_batch import TaskBatch
+
+def make_batch():
+    return TaskBatch(np.array([4, 7, 9]), np.arange(9, dtype=float).reshape(3, 3), np.array([1.0, 2.5, 4.0]),
+                     np.array([500.0, 750.0, 1000.0]), np.array([2, 3, 5]))
+
+def test_fields_read_like_task_dict_keys():
+    batch = make_batch()
+    assert len(batch) == 3
+    for field in TaskBatch.FIELDS:
+        assert batch[field] is getattr(batch, field)
+
+def test_iteration_yields_task_dicts():
+    tasks = list(make_batch())
+    assert tasks[1] == {'device_id': 7, 'position': (3.0, 4.0, 5.0), 'data_size': 2.5,
+                        'computation_intensity': 750.0, 'deadline': 3}
+    assert all(type(value) in (int, float, tuple) for task in tasks for value in task.values())
+
+def test_select_by_mask_and_index():
+    batch = make_batch()
+    selected = batch.select(np.array([True, False, True]))
+    np.testing.assert_array_equal(selected.device_id, [4, 9])
+    np.testing.assert_array_equal(selected.position, [[0, 1, 2], [6, 7, 8]])
+    reordered = batch.select(np.array([2, 0]))
+    np.testing.assert_array_equal(reordered.data_size, [4.0, 1.0])
+    assert len(batch.select(np.zeros(3, dtype=bool))) == 0
+
+def test_empty_batch():
+    batch = TaskBatch.empty()
+    assert len(batch) == 0
+    assert batch.position.shape == (0, 3)
+    assert list(batch) == []
+
+def test_generated_tasks_match_the_device_state(make_config):
+    simulation = SimulationManager(make_config())
+    iot_simulation = simulation.iot_simulation
+    tasks = iot_simulation.generate_tasks(3)
+    simulation.logger.close()
+    np.testing.assert_array_equal(tasks.device_id, np.flatnonzero(iot_simulation.task_mask))
+    np.testing.assert_array_equal(tasks.position, iot_simulation.positions[tasks.device_id])
+    assert ((tasks.data_size >= 0.5) & (tasks.data_size <= 5.2)).all()
+    assert ((tasks.computation_intensity >= 500) & (tasks.computation_intensity <= 1000)).all()
+    assert ((tasks.deadline >= 4) & (tasks.deadline <= 8)).all()
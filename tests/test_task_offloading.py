@@ -1,2 +1,49 @@
 # test_task_offloading.py
 
+import numpy as np
+import pytest
+
+from simulation.simulation_manager import SimulationManager
+from simulation.task_offloading import TaskOffloading
+
+def decide_both_ways(config):
+    simulation = SimulationManager(config)
+    tasks = simulation.iot_simulation.generate_tasks(0)
+    uavs = simulation.uav_simulation.uavs
+    loop = TaskOffloading(config, simulation.energy_model, simulation.communication_model)
+    batch = TaskOffloading(config, simulation.energy_model, simulation.communication_model)
+    records = loop.decide_offloading(tasks, uavs, 0)
+    decisions = batch.decide_offloading_batch(tasks, simulation.uav_simulation.positions, 0)
+    simulation.logger.close()
+    return loop, records, batch, decisions
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'offloading.spatial_index': True},
+    {'offloading.batch_pair_limit': 64},
+    {'uav.count': 12, 'uav.coverage_radius': 300},
+    {'communication.rate_lookup': True},
+])
+def test_batch_matches_loop(make_config, overrides):
+    config = make_config(dict({'iot.device_count': 400}, **overrides))
+    loop, records, batch, decisions = decide_both_ways(config)
+
+    assert len(records) == len(decisions) > 0
+    assert [record['device_id'] for record in records] == decisions.device_id.tolist()
+    assert [record['offloaded'] for record in records] == decisions.offloaded.tolist()
+    assert [record['uav_id'] if record['offloaded'] else -1 for record in records] == decisions.uav_id.tolist()
+    np.testing.assert_allclose([record['energy_efficiency'] for record in records], decisions.energy_efficiency, rtol=1e-12)
+    loop_rates = np.array([record['data_rate'] if record['offloaded'] else np.nan for record in records])
+    np.testing.assert_allclose(loop_rates, decisions.data_rate, rtol=1e-12)
+    np.testing.assert_allclose(loop.task_energy_efficiency.values, batch.task_energy_efficiency.values, rtol=1e-12)
+
+def test_spatial_index_prunes_batch_pairs_like_the_loop(make_config):
+    config = make_config({'iot.device_count': 400, 'uav.count': 10, 'offloading.spatial_index': True})
+    loop, _, batch, _ = decide_both_ways(config)
+    assert batch.candidate_pairs == loop.candidate_pairs < 400 * 10
+
+def test_spatial_index_gives_the_dense_decisions(make_config):
+    dense = decide_both_ways(make_config({'uav.count': 10}))[3]
+    indexed = decide_both_ways(make_config({'uav.count': 10, 'offloading.spatial_index': True}))[3]
+    np.testing.assert_array_equal(dense.uav_id, indexed.uav_id)
+    np.testing.assert_array_equal(dense.energy_efficiency, indexed.energy_efficiency)
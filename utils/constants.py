@@ -1,5 +1,8 @@
 # utils/constants.py
 
+# Defaults for the physical parameters of the simulation. Each one can be overridden
+# through its config.json field; see DEFAULTS in simulation/config.py for the mapping.
+
 # Simulation area size
 AREA_SIZE = 1000  # meters
 
@@ -22,3 +25,21 @@ IOT_ENERGY_PARAMS = {
 NOISE_POWER = 1e-10  # Watts
 BANDWIDTH = 1e6  # 1 MHz
 PATH_LOSS_EXPONENT = 2
+
+# UAV propulsion power model for rotary-wing UAVs
+UAV_PROPULSION_PARAMS = {
+    'blade_profile_power': 79.86,  # Watts, in hover
+    'induced_power': 88.63,  # Watts, in hover
+    'tip_speed': 120,  # meters per second, rotor blade tip
+    'mean_induced_velocity': 4.03,  # meters per second, in hover
+    'fuselage_drag_ratio': 0.6,
+    'air_density': 1.225,  # kg per cubic meter
+    'rotor_solidity': 0.05,
+    'rotor_disc_area': 0.503,  # square meters
+}
+
+# Duration of one simulation time slot
+SLOT_DURATION = 1  # seconds
+
+# Task data sizes are in megabits
+BITS_PER_MEGABIT = 1e6
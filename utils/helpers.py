@@ -1,13 +1,111 @@
 # utils/helpers.py
 
+import atexit
+import collections
+import os
+import queue
+import threading
+import weakref
+
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+# Loggers still alive in this process, closed at exit; weak so that the registry keeps none alive
+_open_loggers = weakref.WeakSet()
+
+@atexit.register
+def _close_loggers():
+    for logger in list(_open_loggers):
+        logger.close()
+
 class Logger:
-    def __init__(self, log_file):
+    """
+    Buffered logger. Messages are kept in an in-memory ring buffer and written to the
+    log file in batches by a background thread, so callers never block on file I/O.
+    Each process should log to its own file. close() stops the writer thread; logging
+    again afterwards starts a new one.
+    """
+    def __init__(self, log_file, level='INFO', quiet=False, buffer_size=1000, batch_size=256):
         self.log_file = log_file
+        self.level = LOG_LEVELS[level]
+        self.quiet = quiet  # Skip console output, e.g. for sweep workers
+        self.batch_size = batch_size
+        self.buffer = collections.deque(maxlen=buffer_size)  # Most recent messages
+
         # Clear the log file at the start
+        log_dir = os.path.dirname(self.log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
         with open(self.log_file, 'w') as f:
             f.write('')
 
-    def log(self, message):
-        print(message)
+        self._start_writer()
+        _open_loggers.add(self)
+
+    def _start_writer(self):
+        self._pid = os.getpid()
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
         with open(self.log_file, 'a') as f:
-            f.write(message + '\n')
+            while True:
+                # Block for the first item, then drain whatever else is pending into one batch
+                items = [self._queue.get()]
+                while len(items) < self.batch_size:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                lines = [item for item in items if isinstance(item, str)]
+                if lines:
+                    f.write(''.join(lines))
+                    f.flush()
+                for item in items:
+                    if isinstance(item, threading.Event):
+                        item.set()  # flush() barrier
+                if None in items:
+                    return
+
+    def log(self, message, level='INFO'):
+        if LOG_LEVELS[level] < self.level:
+            return
+        self.buffer.append(message)
+        if not self.quiet:
+            print(message)
+        if self._closed or os.getpid() != self._pid:
+            # Closed earlier, or forked into a new process where the writer thread did not survive
+            self._start_writer()
+        self._queue.put(message + '\n')
+
+    def debug(self, message):
+        self.log(message, 'DEBUG')
+
+    def info(self, message):
+        self.log(message, 'INFO')
+
+    def warning(self, message):
+        self.log(message, 'WARNING')
+
+    def error(self, message):
+        self.log(message, 'ERROR')
+
+    def recent(self):
+        return list(self.buffer)
+
+    def flush(self):
+        # Wait until everything logged so far has reached the file
+        if self._closed or os.getpid() != self._pid:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._closed or os.getpid() != self._pid:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()